@@ -8,6 +8,8 @@ from requests.exceptions import HTTPError
 from requests.exceptions import ConnectionError
 from requests.exceptions import RequestException
 
+from functions.profiling import profiler
+
 # header : 서버에 전달할 user-agent 정보(사용자 환경에 따라 달라짐)
 header = {
     "user-agent":
@@ -33,18 +35,26 @@ def get_download(url, params=None, headers=header, retries=base_retries):
     resp = None
 
     try:
-        resp = requests.get(url, params=params, headers=headers)
+        # 재시도(재귀 호출)는 요청 1건씩 따로 측정
+        with profiler.stage("get_download", documents=1) as stage:
+            resp = requests.get(url, params=params, headers=headers)
+            if stage.enabled:
+                stage.add(nbytes=len(resp.content))
         resp.raise_for_status()
     except HTTPError as e:
+        profiler.count("get_download.http_errors")
         if 500 <= resp.status_code < 600 and retries > 0:
+            profiler.count("get_download.retries")
             print("Retries: {0}".format(base_retries - retries + 1))
             return get_download(url, params, headers, retries - 1)
         else:
             print("HTTPError:[{}]:{}, {}".format(resp.status_code, resp.reason,
                                                  resp.headers))
     except ConnectionError as e:
+        profiler.count("get_download.connection_errors")
         print("ConnectionError:{}".format(e))
     except RequestException as e:
+        profiler.count("get_download.request_errors")
         print("UnexpectedError:{}".format(e))
 
     return resp
@@ -87,18 +97,25 @@ def post_download(url,
     resp = None
 
     try:
-        resp = requests.post(url, data=data, cookies=cookie, headers=headers)
+        with profiler.stage("post_download", documents=1) as stage:
+            resp = requests.post(url, data=data, cookies=cookie, headers=headers)
+            if stage.enabled:
+                stage.add(nbytes=len(resp.content))
         resp.raise_for_status()
     except HTTPError as e:
+        profiler.count("post_download.http_errors")
         if 500 <= resp.status_code < 600 and retries > 0:
+            profiler.count("post_download.retries")
             print("Retries: {0}".format(base_retries - retries + 1))
             return post_download(url, data, cookie, headers, retries - 1)
         else:
             print("HTTPError:[{}]:{}, {}".format(resp.status_code, resp.reason,
                                                  resp.headers))
     except ConnectionError as e:
+        profiler.count("post_download.connection_errors")
         print("ConnectionError:{}".format(e))
     except RequestException as e:
+        profiler.count("post_download.request_errors")
         print("UnexpectedError:{}".format(e))
 
     return resp
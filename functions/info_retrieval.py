@@ -7,7 +7,6 @@ Information Retrieval(정보검색) 관련 함수를 정의 합니다.
 '''
 import os
 import re
-from string import punctuation
 from collections import defaultdict
 from math import log10
 import pickle
@@ -23,6 +22,16 @@ from nltk.tokenize import word_tokenize
 from nltk.corpus import gutenberg
 
 from functions.nlp import ngram
+from functions.nlp.analyzer import get_analyzer
+from functions.nlp.corpus import iter_chunks, iter_documents
+from functions.nlp.normalizer import normalizer, remove_patterns
+from functions.ir.lexicon import TermDictionary
+from functions.ir.posting import PostingBuilder, PostingStore
+from functions.ir.compress import CompressedPostingStore
+from functions.ir.matrix import DocumentTermMatrix, MatrixView
+from functions.ir.results import DocumentStore, lookup_ids, make_snippet
+from functions.ir.term_stats import term_statistics
+from functions.profiling import document_bytes, profiler
 
 
 def raw_tf(freq):
@@ -105,24 +114,25 @@ def probability_idf(df, n):
         return None
 
 
-def get_lexicon(corpus=kobill):
+def get_lexicon(corpus=kobill, chunk_size=100):
     '''
     corpus 데이터를 인수로 받아서, 공백으로 분리한 lexicon을 numpy array 형태로 반환 합니다.
-    인수 corpus에는 corpus 객체를 전달 합니다.
+    인수 corpus에는 corpus 객체(또는 FolderCorpus)를 전달 합니다.
     default로 konlpy 패키지의 kobill(의안) 자료를 lexicon으로 반환 합니다.
 
+    문서는 chunk_size개씩 읽어서 chunk 별 array로 만든 후 마지막에 한 번만 합칩니다.
+
     사용예)
         from konlpy.corpus import kolaw
         from functions.info_retrieval import get_lexicon
 
         lexicon = get_lexicon(corpus=kolaw)
     '''
-    lexicon = np.array(list())
-    for document in corpus.fileids():
-        content = corpus.open(document).read()
-        lexicon = np.append(lexicon, np.array(content.split()))
-                
-    return lexicon
+    lexicon = [np.array(list())]
+    for chunk in iter_chunks(corpus, chunk_size):
+        lexicon.append(np.array([term for _, content in chunk for term in content.split()]))
+
+    return np.concatenate(lexicon)
 
 
 def get_tfidf_from_konlpy(corpus=kobill, k_morpheme=Kkma):
@@ -140,10 +150,7 @@ def get_tfidf_from_konlpy(corpus=kobill, k_morpheme=Kkma):
     morpheme = k_morpheme().morphs
 
     documents = np.array(corpus.fileids())
-    contents = np.array(list())
-
-    for document in documents:
-        contents = np.append(contents, [corpus.open(document).read()])
+    contents = (content for _, content in iter_documents(corpus, documents))    # 문서를 하나씩 읽어서 vectorize
     
     vectorizer = TfidfVectorizer(tokenizer=morpheme)
     tfidf = vectorizer.fit_transform(contents)
@@ -164,10 +171,7 @@ def get_tfidf_from_nltk(corpus=gutenberg, e_tokenize=None):
         lexicon_dict = vectorizer.vocabulary_
     '''
     documents = np.array(corpus.fileids())
-    contents = np.array(list())
-
-    for document in documents:
-        contents = np.append(contents, [corpus.open(document).read()])
+    contents = (content for _, content in iter_documents(corpus, documents))    # 문서를 하나씩 읽어서 vectorize
     
     vectorizer = TfidfVectorizer(tokenizer=e_tokenize, stop_words="english")
     tfidf = vectorizer.fit_transform(contents)
@@ -177,67 +181,58 @@ def get_tfidf_from_nltk(corpus=gutenberg, e_tokenize=None):
 
 def get_remove_pattern():
     '''
-    corpus에서 제거할 문자의 정규표현식이 dictionary로 작성 되어 있습니다.
+    corpus에서 제거할 문자의 정규표현식이 dictionary로 작성 되어 있습니다. (pattern 문자열은 normalizer.remove_patterns)
 
     사용예)
         corpus = get_remove_pattern()["email"].sub(" ", corpus)
     '''
     patterns = {}
-    patterns["email"] = re.compile(r"(\w+@[a-zA-Z0-9\-\_]{3,}(\.[a-zA-Z]{2,})+)")
-    patterns["url"] = re.compile(r"(https?:\/\/)?([\w\d-]{3,}(\.[a-zA-Z]{2,})+)")
-    patterns["max_length"] = re.compile(r"(\b[\w\d가-힣]{8,}\b)")
-    patterns["numeric_length"] = re.compile(r"(\b(\d{1}|\d{5,})\b)")
-    patterns["punctuation"] = re.compile(r"([%s]{2,})" % re.escape(punctuation))
-    patterns["invalid_korean"] = re.compile(r"([ㄱ-ㅎㅏ-ㅣ]+)")
-    patterns["whitespace"] = re.compile(r"((\s{2,})+|((\\n){2,})+)")
-    patterns["non_word"] = re.compile(r"([^\w\d가-힣])")
+    for name, pattern in remove_patterns.items():
+        patterns[name] = re.compile(pattern)
 
     return patterns
 
 
-def clean_collection(collection):
+def clean_collection(collection, processes=None):
     '''
     collection의 content에 포함된 email, url, 8자 이상의 글자, 숫자(1글자 또는 5자 이상), 
     Non_Word, white space 등을 제거하고 Cleaned collection을 반환 합니다.
 
     collection은 list [document이름, content]들의 리스트인 2차원 ndarray 입니다.
+    processes : 여러 process에서 전처리할 때의 process 수 (None이면 현재 process에서 실행)
+    정규표현식은 TextNormalizer에서 한 번만 compile 하고, 8개의 pattern을 5번의 치환으로 처리 합니다.
+    (문서를 하나씩 전처리하는 generator는 normalizer.iter_clean(collection))
     '''
-    cleaned_collection = list()
+    with profiler.stage("clean_collection") as stage:
+        return normalizer.clean(stage.track(collection, document_bytes), processes)
 
-    for filename, content in collection:
-        cleaned_content = get_remove_pattern()["email"].sub(" ", content)
-        cleaned_content = get_remove_pattern()["url"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["max_length"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["numeric_length"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["punctuation"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["invalid_korean"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["whitespace"].sub(" ", cleaned_content)
-        cleaned_content = get_remove_pattern()["non_word"].sub(" ", cleaned_content)
-        cleaned_collection.append([filename, cleaned_content])
 
-    return cleaned_collection
-
-
-def get_extended_lexicon(corpus, nouns=False):
+def get_extended_lexicon(corpus, nouns=False, pos=None):
     '''
     collection의 document별 content(전처리 된 content)를 받아서 token의 수를 늘려서 lexicon을 반환 합니다.
         --> token = 어절 + 형태소 + 바이그램(음절)
     
     nouns=True 이면, 명사, 명사구 만 lexicon으로 추출하여 반환 합니다.
+    pos : 품사 태깅 함수 (None이면 공유 Kkma 분석기(get_analyzer())의 pos, 형태소 분석 결과를 재사용하려면 MorphCache().pos를 전달)
     '''
-    kkma = Kkma().pos
+    kkma = get_analyzer().pos if pos is None else pos
     extended_lexicon = np.array(list())
 
-    if nouns == False:
-        term_list = np.array([term for term in np.array(corpus.split()) if len(term) > 1])
-        pos_list = np.array([morphs[0] for morphs in np.array(kkma(corpus)) if len(morphs[0]) > 1])
-        ngram_list = np.array([_ for token in term_list for _ in ngram.ngramUmjeol(token)])
-        extended_lexicon = np.append(extended_lexicon, term_list)
-        extended_lexicon = np.append(extended_lexicon, pos_list)
-        extended_lexicon = np.append(extended_lexicon, ngram_list)
-    else:
-        noun_list = np.array([morphs[0] for morphs in np.array(kkma(corpus)) if morphs[1].startswith("N") and len(morphs[0]) > 1])
-        extended_lexicon = np.append(extended_lexicon, noun_list)
+    with profiler.stage("get_extended_lexicon", documents=1) as stage:
+        if stage.enabled:
+            stage.add(nbytes=len(corpus.encode("utf-8")))
+
+        with profiler.stage("get_extended_lexicon.pos"):
+            tagged = np.array(kkma(corpus))
+
+        if nouns == False:
+            term_list = np.array([term for term in np.array(corpus.split()) if len(term) > 1])
+            pos_list = np.array([morphs[0] for morphs in tagged if len(morphs[0]) > 1])
+            ngram_list = np.array([_ for token in term_list for _ in ngram.ngramUmjeol(token)])
+            extended_lexicon = np.concatenate([extended_lexicon, term_list, pos_list, ngram_list])
+        else:
+            noun_list = np.array([morphs[0] for morphs in tagged if morphs[1].startswith("N") and len(morphs[0]) > 1])
+            extended_lexicon = np.append(extended_lexicon, noun_list)
 
     return extended_lexicon
 
@@ -249,10 +244,11 @@ def extend_lexicon(corpus):
     return get_extended_lexicon(corpus, nouns=False)
 
 
-def inverted_index_with_tf(collection):
+def inverted_index_with_tf(collection, build_dtm=True):
     '''
     lexicon으로 부터 document에 빠르게 access 할 수 있도록, posting file을 만들어 줍니다.
     (lexicon -> posting_file -> document)
+    build_dtm=False이면 dtm을 만들지 않고 None을 반환 합니다. (posting만 필요한 경우, 예: parallel.py의 shard 색인)
 
     # collection은 tuple(document이름, content)들의 리스트 입니다. content는 lexicon list 입니다.
     # collection = [
@@ -261,73 +257,68 @@ def inverted_index_with_tf(collection):
     #       ...
     #   ]
 
-    # global_lexicon => dictionary: {단어1:포스팅위치, 단어2:포스팅위치, ...}
-    #   -> 동일한 단어가 여러 번 나온 경우 마지막 나온 global_posting 위치
-    #   -> global_posting data를 생성 후 global_posting의 list index를 포스팅 위치로 저장
+    # global_lexicon => TermDictionary: {단어1:단어 idx, 단어2:단어 idx, ...} (functions/ir/lexicon.py 참고)
+    #   -> 단어가 처음 나온 순서대로 0부터 단어 idx를 O(1)에 부여
+    #   -> 단어 idx는 global_posting의 term 별 posting 위치(row)로 사용
+    #   -> global_lexicon.term(단어 idx)로 단어를 역방향 조회, freeze()로 정렬된 array 형태로 변환 후 저장
 
     # global_document => list: [0:문서1, 1:문서2, ...]
     #   -> document 목록이 순서대로 저장되어 있음(list의 저장된 위치를 index로 사용)
 
-    # global_posting => list: [0:[단어 idx, 문서 idx, 빈도, 다음주소],
-    #                          1:[단어 idx, 문서 idx, 빈도, 다음주소],
-    #                          ...
-    #                         ]
-    #   -> 동일한 term의 첫번째 posting_data에는 다음주소 부분에 "None" 값 할당
-    #   -> global_lexicon이 마지막 posting_data의 index 값을 저장하고 있음
-    #   -> global_posting의 빈도는 tf(Term Frequency) : max_tf 값
+    # global_posting => PostingStore (functions/ir/posting.py 참고)
+    #   -> term 별 posting을 CSR 형태의 numpy array(offsets, doc_ids, freqs, weights)로 저장
+    #   -> global_posting.postings(단어 idx)로 (문서 idx array, 빈도 array)를 조회
+    #   -> global_posting의 빈도(weights)는 tf(Term Frequency) : max_tf 값
+
+    # dtm => {문서: {단어: 빈도}} 형태로 조회하는 Mapping view (functions/ir/matrix.py 참고)
+    #   -> global_posting의 raw tf(freqs)를 복사 없이 DocumentTermMatrix로 사용 (dictionary를 따로 만들지 않음)
     '''
-    global_lexicon = dict()
+    global_lexicon = TermDictionary()
     global_document = list()
-    global_posting = list()
-    dtm = defaultdict(lambda: defaultdict(int))
-    dtm_dict = dict()
-    posting_idx = 0
-
-    for doc_idx, (document_name, lexicon) in enumerate(collection):
-        # pointer 대체용으로 doc_idx를 만든다. (document_name 이름은 절대로 겹치지 않는다는 가정)
-        # for 루프를 반복할 때마다, global_document의 크기와 doc_idx가 1씩 증가
-        global_document.append(document_name)
-
-        # 로컬 영역
-        # local_posting => {term1: 빈도, term2: 빈도, ...}
-        local_posting = defaultdict(int)
-
-        # if 문을 없애기 위해, 0으로 채워진 local_posting을 먼저 만든 후,
-        # term이 발생할 때 마다 1씩 더해주는 방식으로 for 문을 두번 반복
-        # dtm도 local_posting을 만들 때 같은 로직으로 생성
-        # for term in lexicon:    # defaultdict()로 선언하면 자동으로 초기화 해줌
-        #     local_posting[term] = 0
-        #     dtm[document_name][term] = 0
-
-        for term in lexicon:
-            local_posting[term] += 1
-            dtm[document_name][term] += 1
-
-        max_freq = max(local_posting.values())
-
-        for term, freq in local_posting.items():
-            before_idx = global_lexicon.get(term, None)    # lexicon이 마지막으로 추가된 posting 위치 가져오기
-            global_lexicon[term] = posting_idx    # 해당 lexicon이 마지막으로 추가될 global_posting 위치 저장
-            lexicon_idx = list(global_lexicon.keys()).index(term)
-            posting_data = [lexicon_idx, doc_idx, max_tf(freq, max_freq, 0), before_idx]   # 처음 추가되는 lexicon은 before_idx가 None
-            global_posting.append(posting_data)
-            posting_idx += 1
-        
-        if doc_idx % 50 == 49:
-            print("{0}개 뉴스 기사 indexing 완료".format(doc_idx+1))
-    
-    for i, posting_data in enumerate(global_posting):
-        if posting_data[3] is None:
-            global_posting[i][3] = -1
+    posting_builder = PostingBuilder()
+    n_tokens = 0
+
+    # collection이 generator이면 문서를 읽는 시간(전처리, 형태소 분석 등)도 포함해서 측정
+    with profiler.stage("inverted_index_with_tf.documents") as stage:
+        for doc_idx, (document_name, lexicon) in enumerate(stage.track(collection)):
+            # pointer 대체용으로 doc_idx를 만든다. (document_name 이름은 절대로 겹치지 않는다는 가정)
+            # for 루프를 반복할 때마다, global_document의 크기와 doc_idx가 1씩 증가
+            global_document.append(document_name)
+
+            # 로컬 영역
+            # local_posting => {term1: 빈도, term2: 빈도, ...}
+            local_posting = defaultdict(int)
+
+            # if 문을 없애기 위해, 0으로 채워진 local_posting을 먼저 만든 후,
+            # term이 발생할 때 마다 1씩 더해주는 방식으로 for 문을 두번 반복
+            # for term in lexicon:    # defaultdict()로 선언하면 자동으로 초기화 해줌
+            #     local_posting[term] = 0
+
+            for term in lexicon:
+                local_posting[term] += 1
+            n_tokens += len(lexicon)
+
+            term_ids = [global_lexicon.add(term) for term in local_posting.keys()]
+            freqs = np.fromiter(local_posting.values(), dtype=np.int32, count=len(local_posting))
+            posting_builder.add_document(doc_idx, term_ids, freqs, max_tf(freqs, freqs.max(), 0))
+
+            if doc_idx % 50 == 49:
+                print("{0}개 뉴스 기사 indexing 완료".format(doc_idx+1))
+
+    with profiler.stage("inverted_index_with_tf.build", documents=len(global_document)):
+        global_posting = posting_builder.build(len(global_lexicon))
+        dtm = DocumentTermMatrix.from_posting(global_lexicon, global_posting, global_document).dtm() \
+            if build_dtm else None
+
+    profiler.count("inverted_index_with_tf.tokens", n_tokens)
+    profiler.count("inverted_index_with_tf.terms", len(global_lexicon))
+    profiler.count("inverted_index_with_tf.postings", len(global_posting.doc_ids))
 
-    # defaultdict를 pickle로 저장 가능한 dict로 변환
-    for doc, tf in dtm.items():
-        dtm_dict[doc] = tf
-    
     print("전체 {0}개 뉴스 기사 indexing 완료".format(doc_idx+1))
-    return global_lexicon, global_posting, global_document, dtm_dict
+    return global_lexicon, global_posting, global_document, dtm
 
 
+@profiler.profiled()
 def get_tdm_from_dtm(dtm):
     '''
     # convert to Inverted Document
@@ -342,7 +333,12 @@ def get_tdm_from_dtm(dtm):
                   }
          ...
         }
+
+    inverted_index_with_tf()가 반환한 dtm(Mapping view)은 같은 행렬의 단어 기준 view를 반환 합니다. (복사 없음)
     '''
+    if isinstance(dtm, MatrixView):
+        return dtm.matrix.tdm()
+
     tdm = defaultdict(lambda: defaultdict(int))
     tdm_dict = dict()
     
@@ -359,23 +355,32 @@ def get_tdm_from_dtm(dtm):
     return tdm_dict
 
 
+@profiler.profiled()
 def tdm2twm(tdm, global_document):
     '''
     Term-Document Matrix로 부터 Term-Weight Matrix로 변환 합니다.
     TWM의 Weight는 TDM의 Frequancy인 max_tf(0, freq, max_freq)와 raw_idf(df, document_count)의 곱 입니다.
     함께 반환되는 DVL(Document Vector Length)은 TWM의 Weight ** 2의 값 입니다.
+    term 별 idf는 df array로 한 번에(vectorized) 계산 합니다.
+    tdm이 get_tdm_from_dtm()의 Mapping view이면 TWM, DTW도 같은 idx array를 공유하는 Mapping view로 반환 합니다.
     '''
     document_count = len(global_document)
+
+    if isinstance(tdm, MatrixView):
+        # idf = raw_idf(tdm.matrix.df(), document_count)
+        twm_matrix = tdm.matrix.scale_terms(smoothig_idf(tdm.matrix.df(), document_count))
+        return twm_matrix.tdm(), twm_matrix.square().dtm()
+
     twm = defaultdict(lambda: defaultdict(float))
     dtw = defaultdict(lambda: defaultdict(float))    # document vector weight
     twm_dict = dict()
     dtw_dict = dict()
 
-    for term, tf_list in tdm.items():
-        df = len(tf_list)
-        # idf = raw_idf(df, document_count)
-        idf = smoothig_idf(df, document_count)
-        
+    df = np.fromiter((len(tf_list) for tf_list in tdm.values()), dtype=np.int64, count=len(tdm))
+    # idf = raw_idf(df, document_count)
+    idf_list = smoothig_idf(df, document_count) if len(tdm) else ()
+
+    for (term, tf_list), idf in zip(tdm.items(), idf_list):
         for filename, tf in tf_list.items():
             twm[term][filename] = tf * idf       # weight
             dtw[filename][term] = twm[term][filename]  ** 2
@@ -390,62 +395,77 @@ def tdm2twm(tdm, global_document):
     return twm_dict, dtw_dict
 
 
+@profiler.profiled()
 def evaluate_idf(global_lexicon, global_posting, global_document):
     '''
-    idf 값을 산출하여, tf-idf 값을 계산하고,
-    global_posting의 posting_data[2] 빈도 부분에 포함하여 반환 합니다.
+    idf 값을 산출하여, term 별 idf와 document 별 tf-idf 제곱의 합(document weight)을 반환 합니다.
+
+    term 별 df는 색인 시 만든 단어 별 통계(global_posting.stats, functions/ir/term_stats.py)에서 바로 가져오고,
+    document weight는 posting 전체에 대해 한 번에(vectorized) 계산 합니다. (단어 수 + posting 수에 비례)
+    이전 형식(linked list)의 global_posting(pickle)도 그대로 사용할 수 있습니다.
     '''
-    global_lexicon_idf = dict()
-    global_document_weight = dict()
+    if isinstance(global_posting, list):
+        return _evaluate_idf_linked(global_lexicon, global_posting, global_document)
 
     document_count = len(global_document)
 
-    for term, posting_idx in global_lexicon.items():
-        df = 0
-        old_posting_idx = posting_idx
+    if isinstance(global_posting, CompressedPostingStore):
+        global_posting = global_posting.decompress()
+    df = term_statistics(global_posting).df
+
+    # idf = raw_idf(df, document_count)
+    idf = smoothig_idf(df, document_count)
+    global_lexicon_idf = {term: idf[term_idx] for term, term_idx in global_lexicon.items()}
 
-        while True:    # Posting Nexting: -1 
-            if posting_idx == -1:
-                break
+    # posting 별 (tf * idf) ** 2 를 문서 idx 별로 합산
+    posting_weight = (global_posting.weights * np.repeat(idf, df)) ** 2
+    document_weight = np.bincount(global_posting.doc_ids, weights=posting_weight, minlength=document_count)
+    indexed = np.bincount(global_posting.doc_ids, minlength=document_count) > 0
 
-            df += 1
-            posting_data = global_posting[posting_idx]
-            posting_idx = posting_data[3]
+    global_document_weight = {global_document[doc_idx]: document_weight[doc_idx] for doc_idx in np.flatnonzero(indexed)}
 
-        # idf = raw_idf(df, document_count)
-        idf = smoothig_idf(df, document_count)
-        global_lexicon_idf[term] = idf
-        posting_idx = old_posting_idx
+    return global_lexicon_idf, global_document_weight
 
-        #print("{0} / IDF-{1}".format(term, idf))
 
-        while True:
-            if posting_idx == -1:
-                break
+def _evaluate_idf_linked(global_lexicon, global_posting, global_document):
+    '''
+    이전 형식(linked list: [단어 idx, 문서 idx, 빈도, 다음주소])의 global_posting에 대한 evaluate_idf 입니다.
+    다음주소를 따라가지 않고, posting의 단어 idx로 df와 document weight를 한 번에(vectorized) 계산 합니다.
+    '''
+    document_count = len(global_document)
+    if len(global_posting) == 0:
+        return dict(), dict()
 
-            posting_data = global_posting[posting_idx]
+    term_ids = np.fromiter((posting_data[0] for posting_data in global_posting), dtype=np.int64, count=len(global_posting))
+    doc_ids = np.fromiter((posting_data[1] for posting_data in global_posting), dtype=np.int64, count=len(global_posting))
+    weights = np.fromiter((posting_data[2] for posting_data in global_posting), dtype=np.float64, count=len(global_posting))
 
-            # tf = posting_data[2]      # 아래 print 문에 사용 시 주석 해제
-            # print("    Documents:{0} / TF:{1} / TF-IDF:{2}".format(
-            #     global_document[posting_data[1]], tf, global_posting[posting_idx][2]))
+    df = np.bincount(term_ids)
+    # idf = raw_idf(df, document_count)
+    idf = smoothig_idf(df, document_count)
+    # global_lexicon의 값은 단어의 마지막 posting 위치
+    global_lexicon_idf = {term: idf[global_posting[posting_idx][0]] for term, posting_idx in global_lexicon.items()}
 
-            if global_document[posting_data[1]] not in global_document_weight.keys():
-                global_document_weight[global_document[posting_data[1]]] = (posting_data[2] * idf) ** 2
-            else:
-                global_document_weight[global_document[posting_data[1]]] += (posting_data[2] * idf) ** 2
+    # 단어 idx 순서로 누적 (기존처럼 문서 별로 단어 idx 순서대로 더함)
+    order = np.argsort(term_ids, kind="stable")
+    posting_weight = (weights[order] * idf[term_ids[order]]) ** 2
+    document_weight = np.bincount(doc_ids[order], weights=posting_weight, minlength=document_count)
+    indexed = np.bincount(doc_ids, minlength=document_count) > 0
 
-            posting_idx = posting_data[3]   # 다음 주소를 할당
+    global_document_weight = {global_document[doc_idx]: document_weight[doc_idx] for doc_idx in np.flatnonzero(indexed)}
 
     return global_lexicon_idf, global_document_weight
 
 
-def query_index(query):
+@profiler.profiled()
+def query_index(query, morphs=None):
     '''
     query에서 형태소를 분리하여, token과 frequency를 dictionary로 반환 합니다.
     query : 문자열
     query_repr : {"token": frequency}
+    morphs : 형태소 분석 함수 (None이면 공유 Kkma 분석기(get_analyzer())의 morphs)
     '''
-    kkma = Kkma().morphs
+    kkma = get_analyzer().morphs if morphs is None else morphs
     query_repr = defaultdict(int)
 
     for token in query.split():
@@ -491,6 +511,7 @@ def inner_product(x, y):    # x는 query_weight, y는 document_weight
     return x * y
 
 
+@profiler.profiled()
 def candidate_list_by_euclidian(query_weight, global_lexicon, twm):
     candidate_list = dict()
 
@@ -509,7 +530,49 @@ def candidate_list_by_euclidian(query_weight, global_lexicon, twm):
     return candidate_list
 
 
+@profiler.profiled()
 def candidate_list_by_cosine(query_weight, global_lexicon, global_posting, global_document, global_document_weight):
+    '''
+    query term의 posting 만 조회하여, 문서별 Cosine similarity를 dictionary로 반환 합니다.
+    candidate_list : {"document": similarity}
+
+    global_posting의 postings(단어 idx)로 term 별 posting을 numpy array 단위로 한 번에 누적 합니다.
+    (PostingStore, CompressedPostingStore, IncrementalIndex의 posting 모두 사용 가능)
+    '''
+    if isinstance(global_posting, list):
+        return _candidate_list_by_cosine_linked(query_weight, global_lexicon, global_posting, global_document, global_document_weight)
+
+    scores = np.zeros(len(global_document), dtype=np.float64)
+    matched = np.zeros(len(global_document), dtype=bool)
+
+    for index_term, q_weight in query_weight.items():
+        term_idx = global_lexicon.get(index_term, None)
+
+        if term_idx is not None:
+            doc_ids, document_weight = global_posting.postings(term_idx)
+            # 한 term의 posting 내에서 doc_ids는 중복되지 않으므로 fancy indexing으로 누적 가능
+            scores[doc_ids] += inner_product(q_weight, document_weight)
+            matched[doc_ids] = True
+
+    candidate_list = dict()
+    # load_index()로 읽은 global_document_weight는 문서 idx 순서의 array를 가지고 있으므로 바로 사용
+    document_weight_array = getattr(global_document_weight, "array", None)
+
+    for doc_idx in np.flatnonzero(matched):
+        document = global_document[doc_idx]
+
+        if document_weight_array is None:
+            candidate_list[document] = scores[doc_idx] / global_document_weight[document]
+        else:
+            candidate_list[document] = scores[doc_idx] / document_weight_array[doc_idx]
+
+    return candidate_list
+
+
+def _candidate_list_by_cosine_linked(query_weight, global_lexicon, global_posting, global_document, global_document_weight):
+    '''
+    이전 형식(linked list)의 global_posting에 대한 candidate_list_by_cosine 입니다.
+    '''
     candidate_list = dict()
 
     for index_term, q_weight in query_weight.items():
@@ -551,15 +614,28 @@ def cosine_sort(candidate_list):
     return result_list
 
 
-def result_print(query, result_list, global_document, collection, count=3):
+def result_print(query, result_list, global_document, collection, count=3, terms=None, max_chars=160, document_ids=None):
+    '''
+    상위 count개 결과의 순위, 문서, 유사도와 질의 단어 주변 max_chars 글자 이내의 snippet(질의 단어는 [ ]로 강조)을 출력 합니다.
+    collection이 DocumentStore(functions/ir/results.py)이면 문서 idx를 O(1)로 찾고 저장된 어절 offset으로 snippet을 만들고,
+    [(document이름, content), ...] list이면 상위 count개 문서의 idx를 lookup_ids()로 찾습니다.
+    document_ids : {문서 이름: 문서 idx} (IncrementalIndex.doc_ids 등, None이면 DocumentTable의 ids 또는 global_document를 훑어서 찾음)
+    terms : 강조할 질의 단어 (None이면 query의 어절, query_index()의 query_repr.keys()를 전달하면 형태소)
+    '''
     print("query: ", query)
+    terms = query.split() if terms is None else list(terms)
+
+    if isinstance(collection, DocumentStore):
+        for result in collection.results(result_list, terms, count, max_chars=max_chars):
+            print("순위:{rank} / 문서:{document} / 유사도:{score}".format(**result))
+            print("   document:{0}".format(result["snippet"]))
+        return None
 
-    if count > len(result_list):
-        count = len(result_list)
+    doc_ids = lookup_ids(global_document, [document for document, _ in result_list[:count]], document_ids)
 
     for i, (document, distance) in enumerate(result_list[:count]):
         print("순위:{0} / 문서:{1} / 유사도:{2}".format((i+1), document, distance))
-        print("   document:{0}".format(collection[global_document.index(document)]))
+        print("   document:{0}".format(make_snippet(collection[doc_ids[document]][1], terms, max_chars)))
     
     return None
 
@@ -0,0 +1,350 @@
+'''
+bench_suite.py : 전처리 -> 색인 -> 질의 전체 과정(end-to-end)의 성능을 corpus 별로 측정하고 JSON으로 저장/비교 합니다.
+
+benchmark.py의 bench_*() 함수는 기능 하나를 이전 구현과 비교하는 용도이고,
+bench_suite는 commit 사이의 성능 변화(regression)를 찾기 위해 같은 항목을 항상 같은 방식으로 측정 합니다.
+    corpus     => naver_news(누적된 뉴스 기사), synthetic-1k/10k/100k(합성 한글 corpus, 문서 1천/1만/10만건)
+    stages     => 단계 별 시간 (clean_collection, lexicon, inverted_index_with_tf, evaluate_idf, tdm2twm,
+                  ScoringEngine/ranking model 준비(fit))
+    indexing   => 색인 throughput (문서/초, token/초)
+    index_size => posting memory bytes (PostingStore, CompressedPostingStore), write_index() 파일 크기
+    peak_rss_mb => corpus 별 process의 최대 RSS (corpus 마다 새 process(spawn)에서 측정)
+    queries    => ranking 함수 별, 질의 종류(common: df 상위 단어, random: 임의의 단어) 별 latency p50/p95/p99
+
+사용예)
+    python -m functions.ir.bench_suite                                   # 전체 corpus, 결과는 화면에만 출력
+    python -m functions.ir.bench_suite naver_news synthetic-1k -o bench/new.json
+    python -m functions.ir.bench_suite --compare bench/old.json bench/new.json
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+
+import numpy as np
+
+from functions import info_retrieval
+from functions.ir.benchmark import (_percentiles, _timeit, naver_news_documents, simple_lexicon,
+                                    synthetic_collection)
+from functions.ir.compress import CompressedPostingStore
+from functions.ir.index_file import write_index
+from functions.ir.ranking import BM25, BM25Plus, TfIdf
+from functions.ir.scoring import ScoringEngine
+from functions.ir.topk import cosine_upper_bounds, top_k_by_cosine
+
+try:
+    import resource
+except ImportError:    # Windows
+    resource = None
+
+CORPORA = {
+    "naver_news": None,
+    "synthetic-1k": 1000,
+    "synthetic-10k": 10000,
+    "synthetic-100k": 100000,
+}
+
+# corpus 크기(측정값이 아님) 항목, compare_results()에서 제외
+COUNTS = ("documents", "tokens", "terms", "postings")
+
+# candidate_list_by_euclidian()은 질의 마다 TWM 전체를 훑으므로, posting 수가 이보다 많으면 측정하지 않고
+# 측정하는 경우에도 질의 종류 별 앞의 SLOW_QUERIES개 질의만 사용
+EUCLIDEAN_MAX_POSTINGS = 2000000
+SLOW_QUERIES = {"euclidean": 10}
+
+
+def _peak_rss_mb():
+    '''
+    현재 process의 최대 RSS(MB)를 반환 합니다. (ru_maxrss : Linux는 KB, macOS는 bytes 단위)
+    '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_corpus(name, doc_length=100, analyzer="simple"):
+    '''
+    corpus 이름으로 [(document이름, lexicon list), ...] collection을 만들고, 전처리 단계 별 시간(초)과 함께 반환 합니다.
+    naver_news는 clean_collection() 후 analyzer("simple": simple_lexicon(), "kkma": get_extended_lexicon())로
+    lexicon을 만들고, synthetic-*은 lexicon을 바로 만듭니다. (합성 시간은 측정하지 않음)
+    '''
+    if name not in CORPORA:
+        raise ValueError("지원하지 않는 corpus 입니다: {0} (지원: {1})".format(name, ", ".join(CORPORA)))
+
+    if CORPORA[name] is not None:
+        return synthetic_collection(CORPORA[name], doc_length=doc_length), dict()
+
+    lexicon = simple_lexicon if analyzer == "simple" \
+        else lambda content: info_retrieval.get_extended_lexicon(content).tolist()
+    documents = naver_news_documents()
+    clean_seconds, documents = _timeit(info_retrieval.clean_collection, documents)
+    lexicon_seconds, collection = _timeit(lambda: [(filename, lexicon(content)) for filename, content in documents])
+
+    return collection, {"clean": clean_seconds, "lexicon": lexicon_seconds}
+
+
+def _index_size(global_lexicon, global_posting, global_document, global_lexicon_idf, global_document_weight):
+    '''
+    posting의 memory bytes와 write_index()로 저장한 색인 파일 크기(bytes)를 반환 합니다.
+    '''
+    sizes = {"posting_bytes": global_posting.nbytes,
+             "compressed_posting_bytes": CompressedPostingStore.from_store(global_posting).nbytes}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for key, compress in (("file_bytes", False), ("compressed_file_bytes", True)):
+            file_path = os.path.join(directory, "index.idx")
+            _timeit(write_index, file_path, global_lexicon, global_posting, global_document,
+                    global_lexicon_idf, global_document_weight, compress=compress)
+            sizes[key] = os.path.getsize(file_path)
+
+    return sizes
+
+
+def query_sets(global_lexicon, global_posting, n_queries=100, seed=0):
+    '''
+    query_repr({"token": frequency}) 목록을 질의 종류 별로 만듭니다.
+        common => df 상위 50개 단어 중 3개
+        random => 임의의 단어 2~3개 (대부분 df가 작은 단어)
+    '''
+    rng = np.random.default_rng(seed)
+    terms = list(global_lexicon)
+    common = np.argsort(-global_posting.df(), kind="stable")[:50]
+
+    return {
+        "common": [{terms[term_idx]: 1 for term_idx in rng.choice(common, size=min(3, len(common)), replace=False)}
+                   for _ in range(n_queries)],
+        "random": [{terms[term_idx]: 1 for term_idx in rng.choice(len(terms), size=rng.integers(2, 4), replace=False)}
+                   for _ in range(n_queries)],
+    }
+
+
+def ranking_functions(global_lexicon, global_posting, global_document, global_lexicon_idf, global_document_weight,
+                      twm=None, k=3):
+    '''
+    {ranking 함수 이름: search(query_repr)}와 색인 후 준비 시간 {이름: 초}(ScoringEngine, ranking model의 fit)를 반환 합니다.
+    search는 모두 질의 가중치 계산부터 상위 k개 정렬까지 포함 합니다. twm을 전달하면 candidate_list_by_euclidian()도 포함 합니다.
+    '''
+    def query_weight(query_repr):
+        return info_retrieval.eval_query_weight(query_repr, global_lexicon_idf)
+
+    def cosine(query_repr):
+        return info_retrieval.cosine_sort(info_retrieval.candidate_list_by_cosine(
+            query_weight(query_repr), global_lexicon, global_posting, global_document, global_document_weight))[:k]
+
+    def euclidean(query_repr):
+        return info_retrieval.euclidian_sort(info_retrieval.candidate_list_by_euclidian(
+            query_weight(query_repr), global_lexicon, twm))[:k]
+
+    fit_seconds = dict()
+    fit_seconds["fit.top_k_by_cosine"], upper_bounds = \
+        _timeit(cosine_upper_bounds, global_posting, global_document, global_document_weight)
+
+    def top_k(query_repr):
+        return top_k_by_cosine(query_weight(query_repr), global_lexicon, global_posting, global_document,
+                               global_document_weight, k=k, upper_bounds=upper_bounds)
+
+    functions = {"cosine": cosine}
+    if twm is not None:
+        functions["euclidean"] = euclidean
+    functions["top_k_by_cosine"] = top_k
+
+    fit_seconds["fit.engine"], engine = _timeit(ScoringEngine.from_posting, global_lexicon, global_posting,
+                                                global_document, global_document_weight)
+    for metric in ("cosine", "dot", "euclidean"):
+        functions["engine." + metric] = \
+            lambda query_repr, metric=metric: engine.search(query_weight(query_repr), k, metric)
+
+    for model_class in (TfIdf, BM25, BM25Plus):
+        seconds, model = _timeit(model_class().fit, global_lexicon, global_posting, global_document)
+        fit_seconds["fit." + model_class.__name__] = seconds
+        functions[model.name] = lambda query_repr, model=model: model.search(query_repr, k)
+
+    return functions, fit_seconds
+
+
+def run_corpus(name, n_queries=100, k=3, doc_length=100, analyzer="simple", seed=0):
+    '''
+    corpus 1개의 전처리, 색인, 색인 크기, 질의 latency, 최대 RSS를 측정한 dictionary를 반환 합니다.
+    '''
+    collection, stages = load_corpus(name, doc_length, analyzer)
+    n_tokens = sum(len(lexicon) for _, lexicon in collection)
+
+    stages["index"], (global_lexicon, global_posting, global_document, dtm) = \
+        _timeit(info_retrieval.inverted_index_with_tf, collection)
+    del collection
+    stages["idf"], (global_lexicon_idf, global_document_weight) = \
+        _timeit(info_retrieval.evaluate_idf, global_lexicon, global_posting, global_document)
+    stages["twm"], (twm, _) = _timeit(lambda: info_retrieval.tdm2twm(info_retrieval.get_tdm_from_dtm(dtm),
+                                                                     global_document))
+
+    result = {
+        "corpus": name,
+        "documents": len(global_document),
+        "tokens": n_tokens,
+        "terms": len(global_lexicon),
+        "postings": len(global_posting.doc_ids),
+        "stages": stages,
+        "indexing": {"seconds": stages["index"],
+                     "docs_per_sec": len(global_document) / stages["index"],
+                     "tokens_per_sec": n_tokens / stages["index"]},
+        "index_size": _index_size(global_lexicon, global_posting, global_document,
+                                  global_lexicon_idf, global_document_weight),
+        "queries": dict(),
+    }
+
+    functions, fit_seconds = ranking_functions(global_lexicon, global_posting, global_document, global_lexicon_idf,
+                                               global_document_weight,
+                                               twm if result["postings"] <= EUCLIDEAN_MAX_POSTINGS else None, k)
+    stages.update(fit_seconds)
+
+    for query_set, query_reprs in query_sets(global_lexicon, global_posting, n_queries, seed).items():
+        for function_name, search in functions.items():
+            latency = _percentiles([_timeit(search, query_repr)[0]
+                                    for query_repr in query_reprs[:SLOW_QUERIES.get(function_name, None)]])
+            result["queries"].setdefault(function_name, dict())[query_set] = latency
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def print_corpus(result):
+    print("[{corpus}] 문서 {documents} / token {tokens} / 단어 {terms} / posting {postings}".format(**result))
+    print("  stages     : " + " / ".join("{0} {1:.3f}s".format(stage, seconds)
+                                         for stage, seconds in result["stages"].items()))
+    print("  indexing   : {docs_per_sec:,.0f} 문서/s / {tokens_per_sec:,.0f} token/s".format(**result["indexing"]))
+    print("  index_size : " + " / ".join("{0} {1:.1f}MB".format(key, size / 2**20)
+                                         for key, size in result["index_size"].items()))
+    if result["peak_rss_mb"] is not None:
+        print("  peak_rss   : {0:.1f}MB".format(result["peak_rss_mb"]))
+
+    for function_name, latencies in result["queries"].items():
+        print("  {0:<34}".format(function_name) + " / ".join(
+            "{0} p50 {p50_ms:8.3f}ms p95 {p95_ms:8.3f}ms p99 {p99_ms:8.3f}ms".format(query_set, **latency)
+            for query_set, latency in latencies.items()))
+
+
+def run_suite(corpora=tuple(CORPORA), n_queries=100, k=3, doc_length=100, analyzer="simple", seed=0,
+              output=None, isolate=True):
+    '''
+    corpus 별로 run_corpus()를 실행하고, 실행 환경(commit, Python/numpy version 등)과 함께 dictionary로 반환 합니다.
+    output을 지정하면 JSON 파일로 저장 합니다.
+    isolate=True 이면 corpus 마다 새 process(spawn)에서 측정하므로, 앞 corpus의 memory가 peak_rss_mb에 섞이지 않습니다.
+    '''
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"n_queries": n_queries, "k": k, "doc_length": doc_length, "analyzer": analyzer, "seed": seed},
+        },
+        "corpora": dict(),
+    }
+    run = partial(run_corpus, n_queries=n_queries, k=k, doc_length=doc_length, analyzer=analyzer, seed=seed)
+
+    for name in corpora:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run, name).result()
+        else:
+            result = run(name)
+
+        results["corpora"][name] = result
+        print_corpus(result)
+
+    if output is not None:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, default=lambda value: value.item())
+        print("{0} is saved.".format(output))
+
+    return results
+
+
+def _flatten(result, prefix=""):
+    '''
+    중첩된 dictionary의 숫자 값을 {"a/b/c": 값} 형태로 펼칩니다.
+    '''
+    values = dict()
+    for key, value in result.items():
+        if isinstance(value, dict):
+            values.update(_flatten(value, prefix + key + "/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[prefix + key] = value
+    return values
+
+
+def compare_results(baseline, current, threshold=0.1):
+    '''
+    두 run_suite() 결과(또는 JSON 파일 경로)의 같은 항목을 비교해서 출력하고, threshold 보다 나빠진 항목 목록을 반환 합니다.
+    시간, 크기, memory는 작을수록, *_per_sec(throughput)은 클수록 좋은 값으로 봅니다.
+    '''
+    def load(results):
+        if isinstance(results, str):
+            with open(results, encoding="utf-8") as f:
+                return json.load(f)
+        return results
+
+    baseline, current = load(baseline), load(current)
+    print("baseline {0} -> current {1}".format(baseline["meta"]["commit"], current["meta"]["commit"]))
+
+    regressions = list()
+    baseline_values, current_values = _flatten(baseline["corpora"]), _flatten(current["corpora"])
+
+    for key, before in baseline_values.items():
+        after = current_values.get(key, None)
+        if after is None or before == 0 or key.rsplit("/", 1)[-1] in COUNTS:
+            continue
+
+        ratio = after / before
+        worse = ratio < 1 - threshold if key.endswith("_per_sec") else ratio > 1 + threshold
+        if worse:
+            regressions.append(key)
+        print("{0}{1:<60} {2:>14.3f} -> {3:>14.3f} ({4:6.2f}x)".format("! " if worse else "  ", key, before, after, ratio))
+
+    print("regression {0}건 (threshold {1:.0%})".format(len(regressions), threshold))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="색인/질의 end-to-end benchmark")
+    parser.add_argument("corpora", nargs="*", default=list(CORPORA), help="측정할 corpus ({0})".format(", ".join(CORPORA)))
+    parser.add_argument("-o", "--output", help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("-n", "--queries", type=int, default=100, help="질의 종류 별 질의 수")
+    parser.add_argument("-k", type=int, default=3, help="질의 결과 수")
+    parser.add_argument("--doc-length", type=int, default=100, help="합성 corpus 문서의 token 수")
+    parser.add_argument("--analyzer", choices=("simple", "kkma"), default="simple",
+                        help="naver_news lexicon 추출 방식 (kkma는 JVM 필요)")
+    parser.add_argument("--no-isolate", action="store_true", help="corpus를 같은 process에서 측정")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="두 JSON 결과를 비교")
+    parser.add_argument("--threshold", type=float, default=0.1, help="regression으로 볼 변화율")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare_results(*args.compare, threshold=args.threshold) else 0
+
+    run_suite(args.corpora, args.queries, args.k, args.doc_length, args.analyzer, output=args.output,
+              isolate=not args.no_isolate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
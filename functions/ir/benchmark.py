@@ -0,0 +1,876 @@
+'''
+benchmark.py : 정보검색(info_retrieval) 색인/질의 함수의 성능을 측정 합니다.
+
+Kkma(JVM) 없이도 실행할 수 있도록, 한글 음절로 만든 합성(synthetic) corpus를 사용 합니다.
+
+사용예)
+    python -m functions.ir.benchmark indexing
+    python -m functions.ir.benchmark parallel
+'''
+import os
+import sys
+import io
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from functions import info_retrieval
+from functions.ir.boolean import BooleanQueryEngine, positive_terms
+from functions.ir.cache import QueryCache
+from functions.ir.compress import CompressedPostingStore
+from functions.ir.matrix import DocumentTermMatrix
+from functions.ir.ngram_index import SyllableNgramIndex
+from functions.ir.parallel import parallel_inverted_index
+from functions.ir.positional import PositionalIndex
+from functions.ir.ranking import BM25, BM25Plus, TfIdf
+from functions.ir.results import DocumentStore
+from functions.ir.scoring import ScoringEngine
+from functions.ir.term_stats import TermStatistics
+from functions.ir.topk import cosine_upper_bounds, top_k_by_cosine
+from functions.nlp.corpus import FolderCorpus, iter_documents
+from functions.nlp.analyzer import AnalyzerService, taggers as analyzer_taggers
+from functions.nlp.morph_cache import MorphCache
+from functions.profiling import profiler
+
+
+def synthetic_vocabulary(vocab_size=50000, seed=0):
+    '''
+    한글 음절(가~힣) 2~4개로 구성된 단어 vocab_size개를 반환 합니다.
+    '''
+    rng = np.random.default_rng(seed)
+    vocabulary = set()
+
+    while len(vocabulary) < vocab_size:
+        syllables = rng.integers(0xAC00, 0xD7A4, size=rng.integers(2, 5))
+        vocabulary.add("".join(chr(code) for code in syllables))
+
+    return sorted(vocabulary)
+
+
+def synthetic_collection(n_docs, doc_length=200, vocab_size=50000, zipf_s=1.1, seed=0):
+    '''
+    Zipf 분포를 따르는 단어 빈도로 합성 collection을 만듭니다.
+    inverted_index_with_tf()에 바로 전달할 수 있는 [(document이름, lexicon list), ...] 형태 입니다.
+    '''
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(synthetic_vocabulary(vocab_size, seed))
+    probability = 1.0 / np.arange(1, vocab_size + 1) ** zipf_s
+    probability /= probability.sum()
+
+    # 문서별로 나누어 뽑은 것과 같은 난수열을 한 번에 뽑음
+    term_ids = rng.choice(vocab_size, size=(n_docs, doc_length), p=probability)
+
+    return [("doc-{0:07d}".format(doc_idx), vocabulary[term_ids[doc_idx]].tolist()) for doc_idx in range(n_docs)]
+
+
+def naver_news_documents(default_path="naver_news", limit=None):
+    '''
+    naver_news 폴더 아래에 누적된 뉴스 기사를 [(document이름, content), ...] 형태로 반환 합니다.
+    '''
+    corpus = FolderCorpus(default_path)
+
+    return list(iter_documents(corpus, corpus.fileids()[:limit]))
+
+
+def simple_lexicon(content):
+    '''
+    JVM 없이 실행할 수 있도록 Kkma 형태소 분석은 제외하고,
+    get_extended_lexicon()과 같은 방식으로 어절 + 바이그램(음절)을 lexicon으로 반환 합니다.
+    '''
+    terms = [term for term in content.split() if len(term) > 1]
+    bigrams = [term[i:i+2] for term in terms for i in range(len(term) - 1)]
+    return terms + bigrams
+
+
+def naver_news_collection(default_path="naver_news", limit=None):
+    '''
+    naver_news 뉴스 기사를 clean_collection()으로 전처리 한 후, simple_lexicon()으로
+    [(document이름, lexicon list), ...] 형태로 반환 합니다.
+    '''
+    collection = naver_news_documents(default_path, limit)
+
+    return [(filename, simple_lexicon(content))
+            for filename, content in info_retrieval.clean_collection(collection)]
+
+
+def _timeit(func, *args, **kwargs):
+    '''
+    func의 실행 시간(초)과 반환값을 반환 합니다. (func의 print 출력은 숨김)
+    '''
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+    return elapsed, result
+
+
+def bench_indexing(sizes=(500, 1000, 2000, 4000), doc_length=200):
+    '''
+    문서 수를 늘려가며 inverted_index_with_tf()의 실행 시간을 측정 합니다.
+    문서 1건당 indexing 시간(ms/doc)이 일정하면 indexing 시간은 corpus 크기에 선형으로 증가 합니다.
+    '''
+    results = list()
+    collection = synthetic_collection(max(sizes), doc_length=doc_length)
+
+    for n_docs in sizes:
+        elapsed, (global_lexicon, global_posting, _, _) = _timeit(
+            info_retrieval.inverted_index_with_tf, collection[:n_docs])
+        results.append({"documents": n_docs,
+                        "terms": len(global_lexicon),
+                        "postings": len(global_posting),
+                        "seconds": elapsed,
+                        "ms_per_doc": elapsed * 1000 / n_docs})
+        print("문서:{documents:>7} / 단어:{terms:>7} / posting:{postings:>9} / "
+              "{seconds:.3f}초 / {ms_per_doc:.3f}ms/doc".format(**results[-1]))
+
+    return results
+
+
+def bench_compression(collection=None, repeat=3):
+    '''
+    PostingStore와 CompressedPostingStore(정확한 weight / 8bit weight)의 크기와 decode 속도를 비교 합니다.
+    collection을 지정하지 않으면 naver_news 뉴스 기사를 사용 합니다.
+        - bytes/posting : posting 1건당 메모리(디스크) 사용량
+        - decode ns/posting : 전체 term의 posting을 term 단위로 풀 때 posting 1건당 시간
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (_, global_posting, _, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    stores = [("PostingStore", global_posting),
+              ("Compressed", CompressedPostingStore.from_store(global_posting)),
+              ("Compressed(8bit)", CompressedPostingStore.from_store(global_posting, quantize=True))]
+    results = list()
+
+    for name, store in stores:
+        elapsed = min(_timeit(lambda: [store.postings(term_idx) for term_idx in range(store.n_terms)])[0]
+                      for _ in range(repeat))
+        results.append({"store": name,
+                        "bytes": store.nbytes,
+                        "bytes_per_posting": store.nbytes / len(store),
+                        "decode_ns_per_posting": elapsed * 1e9 / len(store)})
+        print("{store:<18} / {bytes:>11,} bytes / {bytes_per_posting:6.2f} bytes/posting / "
+              "decode {decode_ns_per_posting:8.1f} ns/posting".format(**results[-1]))
+
+    return results
+
+
+def bench_parallel(workers=(1, 2, 4, 8), collection=None, repeat=1):
+    '''
+    process 수 별로 parallel_inverted_index()의 실행 시간과 1 process 대비 speedup을 측정 합니다.
+    collection을 지정하지 않으면 naver_news 뉴스 기사 원문을 worker에서 전처리(clean_collection) 및
+    simple_lexicon()으로 분석하여 색인 합니다. (CPU 수 보다 많은 process는 speedup이 늘지 않음)
+    '''
+    if collection is None:
+        collection = naver_news_documents()
+
+    results = list()
+
+    for n_workers in workers:
+        elapsed = min(_timeit(parallel_inverted_index, collection, workers=n_workers,
+                              analyzer=simple_lexicon, clean=True)[0] for _ in range(repeat))
+        results.append({"workers": n_workers,
+                        "documents": len(collection),
+                        "seconds": elapsed,
+                        "speedup": results[0]["seconds"] / elapsed if results else 1.0})
+        print("process:{workers:>3} / 문서:{documents:>7} / {seconds:.3f}초 / "
+              "speedup {speedup:.2f}x".format(**results[-1]))
+
+    return results
+
+
+def _percentiles(seconds):
+    '''
+    실행 시간(초) list의 p50, p95, p99를 ms 단위로 반환 합니다.
+    '''
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def common_term_queries(global_lexicon, global_posting, global_lexicon_idf, n_queries=200, top_terms=50, seed=0):
+    '''
+    df 상위 top_terms개 중 2개 + 임의의 단어 1개로 구성된 query_weight 목록을 만듭니다.
+    '''
+    rng = np.random.default_rng(seed)
+    terms = list(global_lexicon)
+    common = np.argsort(-global_posting.df(), kind="stable")[:top_terms]
+    queries = list()
+
+    for _ in range(n_queries):
+        query_terms = [terms[term_idx] for term_idx in rng.choice(common, size=2, replace=False)]
+        query_terms.append(terms[rng.integers(len(terms))])
+        queries.append({term: global_lexicon_idf[term] for term in query_terms})
+
+    return queries
+
+
+def bench_topk(collection=None, k=3, n_queries=200):
+    '''
+    흔한 단어가 포함된 query의 latency(p50/p95/p99)를 전체 정렬(candidate_list_by_cosine + cosine_sort)과
+    top_k_by_cosine() 사이에 비교 합니다. collection을 지정하지 않으면 합성 corpus 20,000건을 사용 합니다.
+    '''
+    if collection is None:
+        collection = synthetic_collection(20000)
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+    upper_bounds = cosine_upper_bounds(global_posting, global_document, global_document_weight)
+    queries = common_term_queries(global_lexicon, global_posting, global_lexicon_idf, n_queries)
+
+    def exhaustive(query_weight):
+        return info_retrieval.cosine_sort(info_retrieval.candidate_list_by_cosine(
+            query_weight, global_lexicon, global_posting, global_document, global_document_weight))[:k]
+
+    def top_k(query_weight):
+        return top_k_by_cosine(query_weight, global_lexicon, global_posting, global_document,
+                               global_document_weight, k=k, upper_bounds=upper_bounds)
+
+    results = list()
+
+    for name, search in (("exhaustive", exhaustive), ("top_k", top_k)):
+        results.append({"method": name, **_percentiles([_timeit(search, query_weight)[0] for query_weight in queries])})
+        print("{method:<11} / p50 {p50_ms:7.3f}ms / p95 {p95_ms:7.3f}ms / p99 {p99_ms:7.3f}ms".format(**results[-1]))
+
+    return results
+
+
+def bench_scoring(n_docs=100000, doc_length=100, k=3, n_queries=100):
+    '''
+    합성 corpus(n_docs건)에서 흔한 단어가 포함된 query의 latency를
+    candidate_list_by_cosine() + cosine_sort()와 ScoringEngine(cosine, dot, euclidean) 사이에 비교 합니다.
+    '''
+    collection = synthetic_collection(n_docs, doc_length=doc_length)
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    del collection
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+    engine = ScoringEngine.from_posting(global_lexicon, global_posting, global_document, global_document_weight)
+    queries = common_term_queries(global_lexicon, global_posting, global_lexicon_idf, n_queries)
+
+    def exhaustive(query_weight):
+        return info_retrieval.cosine_sort(info_retrieval.candidate_list_by_cosine(
+            query_weight, global_lexicon, global_posting, global_document, global_document_weight))[:k]
+
+    methods = [("candidate_list", exhaustive)]
+    methods += [("engine." + metric, lambda query_weight, metric=metric: engine.search(query_weight, k, metric))
+                for metric in ("cosine", "dot", "euclidean")]
+    results = list()
+
+    for name, search in methods:
+        results.append({"method": name, **_percentiles([_timeit(search, query_weight)[0] for query_weight in queries])})
+        results[-1]["speedup"] = results[0]["p50_ms"] / results[-1]["p50_ms"]
+        print("{method:<16} / p50 {p50_ms:8.3f}ms / p95 {p95_ms:8.3f}ms / p99 {p99_ms:8.3f}ms / "
+              "speedup(p50) {speedup:6.1f}x".format(**results[-1]))
+
+    return results
+
+
+def random_term_queries(global_lexicon, global_lexicon_idf, n_queries=2000, n_terms=3, seed=0):
+    '''
+    임의의 단어 n_terms개로 구성된 query_weight 목록을 만듭니다. (대부분 df가 작은 단어)
+    '''
+    rng = np.random.default_rng(seed)
+    terms = list(global_lexicon)
+
+    return [{terms[term_idx]: global_lexicon_idf[terms[term_idx]]
+             for term_idx in rng.choice(len(terms), size=n_terms, replace=False)} for _ in range(n_queries)]
+
+
+def bench_batch(n_docs=100000, doc_length=100, k=3, n_queries=2000):
+    '''
+    query 1건씩 ScoringEngine.search()를 반복 호출할 때와 search_many()로 한 번에 채점할 때의
+    throughput(query/초)을 흔한 단어 query, 임의의 단어 query로 나누어 비교 합니다.
+    '''
+    collection = synthetic_collection(n_docs, doc_length=doc_length)
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    del collection
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+    engine = ScoringEngine.from_posting(global_lexicon, global_posting, global_document, global_document_weight)
+
+    query_sets = [("common", common_term_queries(global_lexicon, global_posting, global_lexicon_idf, n_queries)),
+                  ("random", random_term_queries(global_lexicon, global_lexicon_idf, n_queries))]
+    results = list()
+
+    for name, queries in query_sets:
+        loop_seconds, _ = _timeit(lambda: [engine.search(query_weight, k) for query_weight in queries])
+        batch_seconds, _ = _timeit(engine.search_many, queries, k)
+        results.append({"queries": name,
+                        "loop_qps": len(queries) / loop_seconds,
+                        "batch_qps": len(queries) / batch_seconds,
+                        "speedup": loop_seconds / batch_seconds})
+        print("{queries:<7} / search() {loop_qps:9.1f} query/s / search_many() {batch_qps:9.1f} query/s / "
+              "speedup {speedup:5.1f}x".format(**results[-1]))
+
+    return results
+
+
+def bench_ranking(collection=None, k=3, n_queries=500, seed=0):
+    '''
+    naver_news 뉴스 기사에서 기존 Cosine similarity 질의(eval_query_weight + candidate_list_by_cosine + cosine_sort)와
+    ranking model(TF-IDF, BM25, BM25+)의 query latency를 비교 합니다.
+    query는 query_repr({"token": frequency})이고, 임의의 단어 2~3개(random)와 df 상위 50개 중 3개(common)로 나누어 측정 합니다.
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+
+    rng = np.random.default_rng(seed)
+    terms = list(global_lexicon)
+    common = np.argsort(-global_posting.df(), kind="stable")[:50]
+    query_sets = [("random", [{terms[term_idx]: 1 for term_idx in rng.choice(len(terms), size=rng.integers(2, 4), replace=False)}
+                              for _ in range(n_queries)]),
+                  ("common", [{terms[term_idx]: 1 for term_idx in rng.choice(common, size=3, replace=False)}
+                              for _ in range(n_queries)])]
+
+    def cosine(query_repr):
+        query_weight = info_retrieval.eval_query_weight(query_repr, global_lexicon_idf)
+        return info_retrieval.cosine_sort(info_retrieval.candidate_list_by_cosine(
+            query_weight, global_lexicon, global_posting, global_document, global_document_weight))[:k]
+
+    methods = [("candidate_list", cosine, 0.0)]
+
+    for model_class in (TfIdf, BM25, BM25Plus):
+        fit_seconds, model = _timeit(model_class().fit, global_lexicon, global_posting, global_document)
+        methods.append((model.name, lambda query_repr, model=model: model.search(query_repr, k), fit_seconds))
+
+    results = list()
+
+    for query_set, query_reprs in query_sets:
+        for name, search, fit_seconds in methods:
+            results.append({"queries": query_set, "method": name, "fit_ms": fit_seconds * 1000,
+                            **_percentiles([_timeit(search, query_repr)[0] for query_repr in query_reprs])})
+            print("{queries:<6} / {method:<36} / fit {fit_ms:6.1f}ms / p50 {p50_ms:7.3f}ms / p95 {p95_ms:7.3f}ms / "
+                  "p99 {p99_ms:7.3f}ms".format(**results[-1]))
+
+    return results
+
+
+def bench_cache(collection=None, k=3, n_queries=20000, n_distinct=200, zipf_s=1.2, seed=0):
+    '''
+    인기 질의가 반복되는 경우(질의문을 Zipf 분포로 선택)의 query latency를
+    cache 없이 query_index() + BM25.search() 할 때와 QueryCache.search() 할 때로 비교 합니다.
+    (JVM 없이 실행할 수 있도록 형태소 분석은 어절을 그대로 반환하는 함수로 대신함)
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    model = BM25().fit(global_lexicon, global_posting, global_document)
+
+    def morphs(token):
+        return [token]
+
+    rng = np.random.default_rng(seed)
+    terms = [term for term in global_lexicon if " " not in term]
+    distinct = [" ".join(terms[term_idx] for term_idx in rng.choice(len(terms), size=rng.integers(2, 4), replace=False))
+                for _ in range(n_distinct)]
+    ranks = np.minimum(rng.zipf(zipf_s, size=n_queries), n_distinct) - 1
+    queries = [distinct[rank] for rank in ranks]
+
+    cache = QueryCache(maxsize=n_distinct // 2, morphs=morphs)
+    results = list()
+
+    for name, search in (("no cache", lambda query: model.search(info_retrieval.query_index(query, morphs), k)),
+                         ("QueryCache", lambda query: cache.search(model, query, k))):
+        seconds = [_timeit(search, query)[0] for query in queries]
+        results.append({"method": name, "mean_ms": float(np.mean(seconds)) * 1000, **_percentiles(seconds)})
+        print("{method:<10} / mean {mean_ms:7.4f}ms / p50 {p50_ms:7.4f}ms / p95 {p95_ms:7.4f}ms / "
+              "p99 {p99_ms:7.4f}ms".format(**results[-1]))
+
+    print("hit rate {0:.1%} (maxsize {1}, distinct queries {2})".format(
+        cache.results.stats()["hit_rate"], cache.results.maxsize, n_distinct))
+
+    return results
+
+
+def bench_morph_cache(analyzer=None, limit=None):
+    '''
+    naver_news 뉴스 기사를 get_extended_lexicon()으로 다시 분석할 때, MorphCache의 적중률과 시간을 측정 합니다.
+        no cache : 형태소 분석기의 pos()로 기사 전체를 분석
+        cold     : 빈 MorphCache (처음 나온 어절만 분석하고 sqlite에 저장)
+        disk     : 새 MorphCache로 같은 sqlite 파일을 사용 (다음 실행, 다른 worker process)
+        memory   : 같은 MorphCache로 다시 분석 (LRU cache)
+    analyzer : pos() 함수를 가진 형태소 분석기 (None이면 Kkma(), JVM 필요)
+    '''
+    if analyzer is None:
+        analyzer = info_retrieval.Kkma()
+
+    collection = info_retrieval.clean_collection(naver_news_documents(limit=limit))
+
+    def reindex(pos):
+        return [info_retrieval.get_extended_lexicon(content, pos=pos) for _, content in collection]
+
+    results = list()
+    baseline, _ = _timeit(reindex, analyzer.pos)
+    results.append({"method": "no cache", "seconds": baseline})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "morph_cache.sqlite")
+
+        with MorphCache(analyzer, path=path) as morph_cache:
+            results.append({"method": "cold", "seconds": _timeit(reindex, morph_cache.pos)[0], **morph_cache.stats()})
+        with MorphCache(analyzer, path=path) as morph_cache:
+            results.append({"method": "disk", "seconds": _timeit(reindex, morph_cache.pos)[0], **morph_cache.stats()})
+            morph_cache.memory.hits = morph_cache.memory.misses = morph_cache.disk_hits = morph_cache.analyzed = 0
+            results.append({"method": "memory", "seconds": _timeit(reindex, morph_cache.pos)[0], **morph_cache.stats()})
+
+    for result in results:
+        print("{0:<8} / {1:8.2f}s / x{2:6.1f} / hit rate {3:6.1%} (memory {4:6.1%}) / 분석한 어절 {5}".format(
+            result["method"], result["seconds"], baseline / result["seconds"], result.get("hit_rate", 0.0),
+            result.get("memory_hit_rate", 0.0), result.get("analyzed", "-")))
+
+    return results
+
+
+def bench_analyzer(taggers=("kkma", "okt", "hannanum", "komoran"), pool_sizes=(1, 2), limit=200):
+    '''
+    naver_news 뉴스 기사를 형태소 분석기 별로 pos 분석할 때의 처리량(문서/초, 어절/초)을 측정 합니다. (JVM 필요)
+        taggers    : analyzer.taggers의 이름 또는 분석기 class
+        pool_sizes : AnalyzerService의 pool_size (pos_many()를 여러 thread에서 분석)
+    첫 줄(per call)은 기존처럼 문서마다 분석기를 새로 만드는 경우 입니다.
+    '''
+    collection = info_retrieval.clean_collection(naver_news_documents(limit=limit))
+    contents = [content for _, content in collection]
+    n_eojeol = sum(len(content.split()) for content in contents)
+    results = list()
+
+    for tagger in taggers:
+        factory = analyzer_taggers[tagger.lower()] if isinstance(tagger, str) else tagger
+        startup, service = _timeit(AnalyzerService, tagger, 1)
+
+        runs = [("per call", lambda: [factory().pos(content) for content in contents])]
+        for pool_size in pool_sizes:
+            if pool_size != service.pool_size:
+                startup, service = _timeit(AnalyzerService, tagger, pool_size)
+            runs.append(("pool {0}".format(pool_size), lambda service=service: service.pos_many(contents)))
+
+        for run, analyze in runs:
+            seconds, _ = _timeit(analyze)
+            results.append({"tagger": service.name, "run": run, "startup_s": startup, "seconds": seconds,
+                            "docs_per_s": len(contents) / seconds, "eojeol_per_s": n_eojeol / seconds})
+            print("{tagger:<10} / {run:<8} / 준비 {startup_s:6.2f}s / {seconds:7.2f}s / "
+                  "{docs_per_s:8.1f} 문서/s / {eojeol_per_s:9.1f} 어절/s".format(**results[-1]))
+
+    return results
+
+
+def _get_remove_pattern_clean(collection):
+    '''
+    기존 clean_collection() (문서마다 get_remove_pattern()을 8번 호출하고 8번 치환)
+    '''
+    names = ("email", "url", "max_length", "numeric_length", "punctuation", "invalid_korean", "whitespace", "non_word")
+    cleaned_collection = list()
+
+    for filename, content in collection:
+        for name in names:
+            content = info_retrieval.get_remove_pattern()[name].sub(" ", content)
+        cleaned_collection.append([filename, content])
+
+    return cleaned_collection
+
+
+def bench_clean(corpora=("naver_news", "spam_mail"), processes=(1, 4), repeat=3):
+    '''
+    naver_news, spam_mail 문서의 전처리 시간을 기존 방식과 clean_collection()(TextNormalizer)으로 비교 합니다.
+    '''
+    results = list()
+
+    for corpus in corpora:
+        collection = naver_news_documents(corpus)
+        expected = _get_remove_pattern_clean(collection)
+        runs = [("8 pass", _get_remove_pattern_clean)]
+        runs += [("process {0}".format(n), lambda collection, n=n: info_retrieval.clean_collection(collection, n))
+                 for n in processes]
+
+        for name, clean in runs:
+            seconds = min(_timeit(clean, collection)[0] for _ in range(repeat))
+            assert clean(collection) == expected
+            results.append({"corpus": corpus, "method": name, "documents": len(collection), "seconds": seconds,
+                            "mb_per_s": sum(len(content.encode("utf-8")) for _, content in collection) / seconds / 2**20})
+            print("{corpus:<10} / {method:<10} / 문서 {documents:5d} / {seconds:6.3f}s / {mb_per_s:6.2f} MB/s".format(
+                **results[-1]))
+
+    return results
+
+
+def _np_append_lexicon(corpus):
+    '''
+    기존 get_lexicon() (문서마다 np.append()로 lexicon 전체를 복사)
+    '''
+    lexicon = np.array(list())
+    for document in corpus.fileids():
+        content = corpus.open(document).read()
+        lexicon = np.append(lexicon, np.array(content.split()))
+
+    return lexicon
+
+
+def bench_lexicon(corpora=("naver_news", "spam_mail"), chunk_size=100):
+    '''
+    폴더 corpus의 get_lexicon() 실행 시간과 최대 memory 사용량(tracemalloc)을 기존 np.append() 방식과 비교 합니다.
+    '''
+    results = list()
+
+    for root in corpora:
+        corpus = FolderCorpus(root)
+
+        for name, get_lexicon in (("np.append", _np_append_lexicon),
+                                  ("get_lexicon", lambda corpus: info_retrieval.get_lexicon(corpus, chunk_size))):
+            tracemalloc.start()
+            seconds, lexicon = _timeit(get_lexicon, corpus)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results.append({"corpus": root, "method": name, "terms": len(lexicon), "seconds": seconds,
+                            "peak_mb": peak / 2**20, "lexicon_mb": lexicon.nbytes / 2**20})
+            print("{corpus:<10} / {method:<11} / 단어 {terms:7d} / {seconds:6.2f}s / peak {peak_mb:6.1f}MB "
+                  "(lexicon {lexicon_mb:6.1f}MB)".format(**results[-1]))
+
+    return results
+
+
+def _linked_posting(global_lexicon, global_posting):
+    '''
+    PostingStore를 이전 형식(linked list: [단어 idx, 문서 idx, weight, 다음주소])의 global_lexicon, global_posting으로 변환 합니다.
+    '''
+    term_ids = global_posting.term_ids().tolist()
+    doc_ids = global_posting.doc_ids.tolist()
+    weights = global_posting.weights.tolist()
+    ends = set(global_posting.offsets[1:].tolist())
+
+    linked_posting = [[term_idx, doc_idx, weight, -1 if posting_idx + 1 in ends else posting_idx + 1]
+                      for posting_idx, (term_idx, doc_idx, weight) in enumerate(zip(term_ids, doc_ids, weights))]
+    linked_lexicon = {term: int(global_posting.offsets[term_idx]) for term, term_idx in global_lexicon.items()}
+
+    return linked_lexicon, linked_posting
+
+
+def _pointer_chasing_idf(global_lexicon, global_posting, global_document):
+    '''
+    기존 evaluate_idf() (단어 별 linked list를 두 번 따라가며 df, document weight를 계산)
+    '''
+    global_lexicon_idf = dict()
+    global_document_weight = dict()
+    document_count = len(global_document)
+
+    for term, posting_idx in global_lexicon.items():
+        df = 0
+        head = posting_idx
+        while posting_idx != -1:
+            df += 1
+            posting_idx = global_posting[posting_idx][3]
+
+        idf = info_retrieval.smoothig_idf(df, document_count)
+        global_lexicon_idf[term] = idf
+        posting_idx = head
+
+        while posting_idx != -1:
+            posting_data = global_posting[posting_idx]
+            document = global_document[posting_data[1]]
+            global_document_weight[document] = global_document_weight.get(document, 0.0) + (posting_data[2] * idf) ** 2
+            posting_idx = posting_data[3]
+
+    return global_lexicon_idf, global_document_weight
+
+
+def bench_idf(collection=None, repeat=3):
+    '''
+    단어 별 통계(TermStatistics) 계산 시간/크기와, evaluate_idf() 실행 시간을
+    기존 linked list를 따라가는 방식과 비교 합니다.
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    linked_lexicon, linked_posting = _linked_posting(global_lexicon, global_posting)
+    stats_seconds = min(_timeit(TermStatistics.from_store, global_posting)[0] for _ in range(repeat))
+    print("단어 {0} / posting {1} / TermStatistics {2:.2f}ms ({3:.2f}MB)".format(
+        len(global_lexicon), len(global_posting), stats_seconds * 1000, global_posting.stats.nbytes / 2**20))
+
+    results = list()
+    for name, evaluate, lexicon, posting in (
+            ("pointer chasing", _pointer_chasing_idf, linked_lexicon, linked_posting),
+            ("linked (vectorized)", info_retrieval.evaluate_idf, linked_lexicon, linked_posting),
+            ("PostingStore + stats", info_retrieval.evaluate_idf, global_lexicon, global_posting)):
+        seconds = min(_timeit(evaluate, lexicon, posting, global_document)[0] for _ in range(repeat))
+        results.append({"method": name, "seconds": seconds})
+        print("{method:<20} / {seconds:8.4f}s".format(**results[-1]))
+
+    return results
+
+
+def _dict_dtm(collection):
+    '''
+    기존 inverted_index_with_tf()의 dtm_dict ({문서: {단어: 빈도}} dictionary)
+    '''
+    dtm_dict = dict()
+    for document_name, lexicon in collection:
+        term_freq = defaultdict(int)
+        for term in lexicon:
+            term_freq[term] += 1
+        dtm_dict[document_name] = term_freq
+
+    return dtm_dict
+
+
+def bench_matrix(collection=None):
+    '''
+    DTM, TDM, TWM, DTW를 만드는 시간과 memory 사용량(tracemalloc)을 기존 dictionary 방식과
+    DocumentTermMatrix(Mapping view) 방식으로 비교 합니다. (색인의 posting array는 공유하므로 제외)
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+
+    def dictionaries():
+        dtm = _dict_dtm(collection)
+        tdm = info_retrieval.get_tdm_from_dtm(dtm)
+        twm, dtw = info_retrieval.tdm2twm(tdm, global_document)
+        return dtm, tdm, twm, dtw
+
+    def matrix_views():
+        dtm = DocumentTermMatrix.from_posting(global_lexicon, global_posting, global_document).dtm()
+        tdm = info_retrieval.get_tdm_from_dtm(dtm)
+        twm, dtw = info_retrieval.tdm2twm(tdm, global_document)
+        len(dtm), len(dtw)    # 문서 기준 배치와 값 array 생성
+        return dtm, tdm, twm, dtw
+
+    results = list()
+    for name, build in (("dict", dictionaries), ("DocumentTermMatrix", matrix_views)):
+        seconds, _ = _timeit(build)
+
+        tracemalloc.start()
+        matrices = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        results.append({"method": name, "values": sum(len(row) for row in matrices[0].values()),
+                        "seconds": seconds, "memory_mb": current / 2**20})
+        print("{method:<18} / 값 {values} x 4 / {seconds:6.2f}s / {memory_mb:8.1f}MB".format(**results[-1]))
+        del matrices
+
+    return results
+
+
+def bench_profiling(n_docs=20000, doc_length=100, repeat=3):
+    '''
+    profiler(functions/profiling.py)를 끈 경우와 켠 경우의 inverted_index_with_tf() + evaluate_idf() 실행 시간을 비교 합니다.
+    '''
+    collection = synthetic_collection(n_docs, doc_length=doc_length)
+    enabled, log, json_path = profiler.enabled, profiler.log, profiler.json_path
+
+    def index():
+        global_lexicon, global_posting, global_document, _ = info_retrieval.inverted_index_with_tf(collection)
+        return info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+
+    results = list()
+    try:
+        for name, switch in (("disabled", profiler.disable), ("enabled", profiler.enable)):
+            switch()
+            results.append({"profiler": name, "seconds": min(_timeit(index)[0] for _ in range(repeat))})
+            results[-1]["overhead"] = results[-1]["seconds"] / results[0]["seconds"] - 1
+            print("{profiler:<8} / {seconds:6.3f}s / overhead {overhead:6.2%}".format(**results[-1]))
+    finally:
+        profiler.reset().disable()
+        if enabled:
+            profiler.enable(log, json_path)
+
+    return results
+
+
+def bench_positional(n_queries=300, seed=0):
+    '''
+    naver_news 뉴스 기사의 위치 색인 크기와, 구문(2~3 어절) 질의 latency를
+    문서를 다시 읽어서 걸러내는 방식(모든 문서의 어절 list에서 구문 검색)과 비교 합니다.
+    '''
+    collection = info_retrieval.clean_collection(naver_news_documents())
+    build_seconds, positional_index = _timeit(PositionalIndex.build, collection)
+    tokens = [content.split() for _, content in collection]
+
+    n_positions = int(positional_index.tfs.sum())
+    print("build {0:.2f}s / 위치 {1} / 위치 data {2:.2f}MB ({3:.2f} bytes/위치) / 전체 {4:.2f}MB".format(
+        build_seconds, n_positions, positional_index.pos_data.nbytes / 2**20,
+        positional_index.pos_data.nbytes / max(n_positions, 1), positional_index.nbytes / 2**20))
+
+    rng = np.random.default_rng(seed)
+    phrases = list()
+    while len(phrases) < n_queries:
+        document = tokens[rng.integers(len(tokens))]
+        n = int(rng.integers(2, 4))
+        if len(document) > n:
+            start = int(rng.integers(len(document) - n))
+            phrases.append(document[start:start + n])
+
+    def rescan(phrase):
+        n = len(phrase)
+        return [doc_idx for doc_idx, document in enumerate(tokens)
+                if any(document[i:i + n] == phrase for i in range(len(document) - n + 1))]
+
+    results = list()
+    for name, search in (("rescan", rescan), ("PositionalIndex", positional_index.phrase)):
+        results.append({"method": name, **_percentiles([_timeit(search, phrase)[0] for phrase in phrases])})
+        print("{method:<16} / p50 {p50_ms:8.3f}ms / p95 {p95_ms:8.3f}ms / p99 {p99_ms:8.3f}ms".format(**results[-1]))
+
+    return results
+
+
+def bench_substring(collection=None, n_queries=500, seed=0):
+    '''
+    부분 문자열(1~4 음절) 질의로 단어/문서를 찾는 latency를 lexicon 전체를 훑는 방식과 SyllableNgramIndex로 비교 합니다.
+    '''
+    if collection is None:
+        collection = naver_news_collection()
+
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    build_seconds, ngram_index = _timeit(SyllableNgramIndex, global_lexicon)
+    print("단어 {0} / bigram {1} / build {2:.2f}s / {3:.2f}MB".format(
+        len(global_lexicon), len(ngram_index.grams), build_seconds, ngram_index.nbytes / 2**20))
+
+    rng = np.random.default_rng(seed)
+    terms = list(global_lexicon)
+    substrings = list()
+    while len(substrings) < n_queries:
+        term = terms[rng.integers(len(terms))]
+        length = int(rng.integers(1, 5))
+        if len(term) >= length:
+            start = int(rng.integers(len(term) - length + 1))
+            substrings.append(term[start:start + length])
+
+    def scan(substring):
+        postings = [global_posting.postings(term_idx)[0] for term, term_idx in global_lexicon.items() if substring in term]
+        return np.unique(np.concatenate(postings))
+
+    results = list()
+    for name, search in (("lexicon scan", scan),
+                         ("SyllableNgramIndex", lambda substring: ngram_index.documents(substring, global_posting))):
+        for short in (True, False):
+            queries = [substring for substring in substrings if (len(substring) < ngram_index.n) == short]
+            results.append({"method": name, "queries": "1 음절" if short else "2~4 음절",
+                            **_percentiles([_timeit(search, substring)[0] for substring in queries])})
+            print("{method:<18} / {queries:<7} / p50 {p50_ms:8.3f}ms / p95 {p95_ms:8.3f}ms / p99 {p99_ms:8.3f}ms".format(
+                **results[-1]))
+
+    return results
+
+
+def bench_boolean(n_docs=100000, doc_length=100, n_queries=200, seed=0):
+    '''
+    "드문단어 AND 흔한단어 NOT 흔한단어" 질의의 문서 필터 + Cosine 점수 latency를
+    candidate_list_by_cosine()으로 모든 후보 dictionary를 만든 후 걸러내는 방식과 BooleanQueryEngine으로 비교 합니다.
+    '''
+    collection = synthetic_collection(n_docs, doc_length)
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+
+    df = global_posting.df()
+    order = np.argsort(-df, kind="stable")
+    terms = np.array(list(global_lexicon))
+    common_terms = terms[order[:50]]
+    rare_terms = terms[(df >= 10) & (df <= 1000)]
+
+    rng = np.random.default_rng(seed)
+    queries = ["{0} AND {1} NOT {2}".format(rng.choice(rare_terms), *rng.choice(common_terms, size=2, replace=False))
+               for _ in range(n_queries)]
+
+    def materialize(query):
+        # 단어 별 후보 dictionary를 만들어서 집합 연산 후, 전체 Cosine 후보에서 걸러냄
+        rare, common, excluded = query.replace(" AND ", " ").replace(" NOT ", " ").split()
+        documents = [info_retrieval.candidate_list_by_cosine({term: 1.0}, global_lexicon, global_posting,
+                                                             global_document, global_document_weight).keys()
+                     for term in (rare, common, excluded)]
+        names = (documents[0] & documents[1]) - documents[2]
+        query_weight = {term: global_lexicon_idf[term] for term in positive_terms(query)}
+        candidate_list = info_retrieval.candidate_list_by_cosine(query_weight, global_lexicon, global_posting,
+                                                                 global_document, global_document_weight)
+        return {document: score for document, score in candidate_list.items() if document in names}
+
+    results = list()
+    for name, store in (("PostingStore", global_posting),
+                        ("CompressedPostingStore", CompressedPostingStore.from_store(global_posting))):
+        engine = BooleanQueryEngine(global_lexicon, store, len(global_document))
+
+        def boolean(query):
+            query_weight = {term: global_lexicon_idf[term] for term in positive_terms(query)}
+            return engine.candidate_list(query, query_weight, global_document, global_document_weight)
+
+        methods = [("BooleanQueryEngine", boolean)]
+        if store is global_posting:
+            methods.insert(0, ("materialize", materialize))
+        for method, search in methods:
+            results.append({"method": method, "store": name, **_percentiles([_timeit(search, query)[0] for query in queries])})
+            print("{method:<18} / {store:<22} / p50 {p50_ms:8.3f}ms / p95 {p95_ms:8.3f}ms / p99 {p99_ms:8.3f}ms".format(
+                **results[-1]))
+
+    return results
+
+
+def bench_snippet(k=10, n_queries=200, max_chars=160, seed=0):
+    '''
+    naver_news 뉴스 기사의 결과 화면(상위 k개) 생성 latency를
+    이전 result_print() 방식(global_document.index() + 원문 전체), DocumentStore.results()(강조 snippet)와
+    ScoringEngine 채점 latency 사이에 비교 합니다.
+    '''
+    documents = info_retrieval.clean_collection(naver_news_documents())
+    collection = [(filename, simple_lexicon(content)) for filename, content in documents]
+    _, (global_lexicon, global_posting, global_document, _) = _timeit(info_retrieval.inverted_index_with_tf, collection)
+    global_lexicon_idf, global_document_weight = info_retrieval.evaluate_idf(global_lexicon, global_posting, global_document)
+    engine = ScoringEngine.from_posting(global_lexicon, global_posting, global_document, global_document_weight)
+    build_seconds, store = _timeit(DocumentStore.build, documents)
+    print("문서 {0} / build {1:.3f}s / 어절 offset {2:.2f}MB".format(len(store), build_seconds, store.nbytes / 2**20))
+
+    queries = common_term_queries(global_lexicon, global_posting, global_lexicon_idf, n_queries, seed=seed)
+    pages = [(query_weight, engine.search(query_weight, k, "cosine")) for query_weight in queries]
+    names = list(global_document)
+
+    def legacy(query_weight, result_list):
+        return [(document, score, documents[names.index(document)]) for document, score in result_list]
+
+    def snippet(query_weight, result_list):
+        return store.results(result_list, query_weight.keys(), k, max_chars=max_chars)
+
+    results = [{"method": "scoring", **_percentiles([_timeit(engine.search, query_weight, k, "cosine")[0]
+                                                      for query_weight, _ in pages])}]
+    for name, render in (("legacy", legacy), ("DocumentStore", snippet)):
+        results.append({"method": name, **_percentiles([_timeit(render, *page)[0] for page in pages])})
+    for result in results:
+        print("{method:<13} / p50 {p50_ms:8.3f}ms / p95 {p95_ms:8.3f}ms / p99 {p99_ms:8.3f}ms".format(**result))
+
+    return results
+
+
+benchmarks = {
+    "indexing": bench_indexing,
+    "compression": bench_compression,
+    "parallel": bench_parallel,
+    "topk": bench_topk,
+    "scoring": bench_scoring,
+    "batch": bench_batch,
+    "ranking": bench_ranking,
+    "cache": bench_cache,
+    "morph_cache": bench_morph_cache,
+    "analyzer": bench_analyzer,
+    "clean": bench_clean,
+    "lexicon": bench_lexicon,
+    "idf": bench_idf,
+    "matrix": bench_matrix,
+    "positional": bench_positional,
+    "substring": bench_substring,
+    "boolean": bench_boolean,
+    "profiling": bench_profiling,
+    "snippet": bench_snippet,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(benchmarks.keys())
+
+    for name in names:
+        print("[{0}]".format(name))
+        benchmarks[name]()
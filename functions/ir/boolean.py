@@ -0,0 +1,327 @@
+'''
+boolean.py : "부동산 AND (아파트 OR 주택) NOT 전세" 형태의 boolean 질의를 posting list 위에서 처리하는 BooleanQueryEngine을 정의 합니다.
+
+ranking 전에 조건으로 문서를 거르려면 지금은 candidate_list_by_cosine()으로 모든 후보 문서의 dictionary를 만든 후
+다시 걸러야 합니다. BooleanQueryEngine은 문서 idx(오름차순 numpy array) 단위로
+    - AND : posting이 가장 짧은 단어부터 시작해서, 남은 후보 문서만 다음 posting에서 binary search (galloping)
+            CompressedPostingStore는 block table(block_first, block_last)을 skip pointer로 사용해서
+            후보 문서가 있는 block만 풀어서 확인
+    - OR  : 정렬된 posting들을 이어 붙인 후 안정 정렬(timsort가 정렬된 구간(run)들을 병합)과 중복 제거
+    - NOT : 후보 문서 중 posting에 없는 문서만 남김 (차집합, AND 안에서는 후보 문서 수에 비례)
+로 처리하므로, AND 질의의 처리 시간은 가장 긴 posting이 아니라 가장 짧은 posting 길이에 비례 합니다.
+
+질의 문법 (연산자는 대문자, 우선순위 NOT > AND > OR, 연산자 없이 이어진 단어는 AND)
+    query := and ("OR" and)*
+    and   := not ("AND"? not)*
+    not   := "NOT" not | "(" query ")" | 단어
+
+질의의 단어는 형태소 분석 없이 색인 단어(global_lexicon의 단어)로 그대로 사용 합니다.
+
+사용예)
+    engine = BooleanQueryEngine(global_lexicon, global_posting, len(global_document))
+    doc_ids = engine.evaluate("부동산 AND (아파트 OR 주택) NOT 전세")
+    query_weight = {term: global_lexicon_idf[term] for term in positive_terms(query) if term in global_lexicon_idf}
+    candidate_list = engine.candidate_list(query, query_weight, global_document, global_document_weight)
+'''
+import re
+
+import numpy as np
+
+from functions.ir.compress import CompressedPostingStore
+from functions.ir.posting import PostingStore
+
+OPERATORS = ("AND", "OR", "NOT")
+
+_token_pattern = re.compile(r"\(|\)|[^\s()]+")
+
+
+def tokenize_boolean_query(query):
+    '''
+    질의를 괄호, 연산자, 단어 token list로 나눕니다.
+    '''
+    return _token_pattern.findall(query)
+
+
+def parse_boolean_query(query):
+    '''
+    질의를 tuple 형태의 구문 트리로 변환 합니다.
+        ("term", 단어), ("and", [자식, ...]), ("or", [자식, ...]), ("not", 자식)
+    '''
+    tokens = tokenize_boolean_query(query) if isinstance(query, str) else list(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def advance():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        children = [parse_and()]
+        while peek() == "OR":
+            advance()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and():
+        children = [parse_not()]
+        while peek() is not None and peek() not in ("OR", ")"):
+            if peek() == "AND":
+                advance()
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not():
+        token = peek()
+        if token is None:
+            raise ValueError("질의가 연산자로 끝났습니다: {0!r}".format(query))
+        if token == "NOT":
+            advance()
+            return ("not", parse_not())
+        if token == "(":
+            advance()
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError("괄호가 닫히지 않았습니다: {0!r}".format(query))
+            advance()
+            return node
+        if token in OPERATORS or token == ")":
+            raise ValueError("{0!r} 위치에 단어가 필요합니다: {1!r}".format(token, query))
+        return ("term", advance())
+
+    if len(tokens) == 0:
+        raise ValueError("빈 질의 입니다.")
+
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError("{0!r} 이후를 해석할 수 없습니다: {1!r}".format(tokens[position], query))
+    return node
+
+
+def positive_terms(query):
+    '''
+    NOT 아래에 있지 않은 단어 list를 반환 합니다. (ranking의 query_weight를 만들 때 사용)
+    '''
+    node = parse_boolean_query(query) if isinstance(query, str) else query
+    if node[0] == "term":
+        return [node[1]]
+    if node[0] == "not":
+        return list()
+
+    terms = list()
+    for child in node[1]:
+        terms.extend(term for term in positive_terms(child) if term not in terms)
+    return terms
+
+
+def intersect(a, b):
+    '''
+    정렬된 문서 idx array의 교집합 입니다. 짧은 array의 원소를 긴 array에서 binary search 합니다.
+    '''
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[positions] == a]
+
+
+def difference(a, b):
+    '''
+    정렬된 문서 idx array a에서 b의 문서를 뺀 차집합 입니다. (a의 길이에 비례)
+    '''
+    if len(a) == 0 or len(b) == 0:
+        return a
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[positions] != a]
+
+
+def union(arrays):
+    '''
+    정렬된 문서 idx array들의 합집합 입니다.
+    '''
+    arrays = [array for array in arrays if len(array)]
+    if len(arrays) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(arrays) == 1:
+        return arrays[0]
+
+    # 안정 정렬(timsort)은 이미 정렬된 array들을 run으로 인식해서 병합(k-way merge) 합니다.
+    merged = np.sort(np.concatenate(arrays), kind="stable")
+    keep = np.empty(len(merged), dtype=bool)
+    keep[0] = True
+    np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+    return merged[keep]
+
+
+class BooleanQueryEngine():
+    '''
+    global_posting(PostingStore, CompressedPostingStore, IncrementalIndex의 posting)에 대해 boolean 질의를 처리 합니다.
+        n_documents : 전체 문서 수 ("NOT 전세" 처럼 NOT 만 있는 질의의 전체 문서 집합)
+                      (IncrementalIndex의 posting은 삭제되지 않은 문서(live_doc_ids())를 전체 문서 집합으로 사용)
+    '''
+
+    def __init__(self, global_lexicon, global_posting, n_documents):
+        self.global_lexicon = global_lexicon
+        self.global_posting = global_posting
+        self.n_documents = n_documents
+
+    def _length(self, term_idx):
+        offsets = getattr(self.global_posting, "offsets", None)
+        if offsets is not None:
+            return int(offsets[term_idx + 1] - offsets[term_idx])
+        return len(self.global_posting.postings(term_idx)[0])
+
+    def estimate(self, node):
+        '''
+        node 결과 문서 수의 추정치(상한)를 반환 합니다. (AND에서 처리 순서를 정할 때 사용)
+        '''
+        if node[0] == "term":
+            term_idx = self.global_lexicon.get(node[1], None)
+            return 0 if term_idx is None else self._length(term_idx)
+        if node[0] == "not":
+            return self.n_documents - self.estimate(node[1])
+        if node[0] == "and":
+            return min(self.estimate(child) for child in node[1])
+        return min(self.n_documents, sum(self.estimate(child) for child in node[1]))
+
+    def _universe(self):
+        '''
+        NOT으로 시작하는 질의의 전체 문서 idx array(오름차순) 입니다.
+        '''
+        live_doc_ids = getattr(self.global_posting, "live_doc_ids", None)
+        if live_doc_ids is not None:
+            return np.asarray(live_doc_ids(), dtype=np.int64)
+        return np.arange(self.n_documents, dtype=np.int64)
+
+    def _posting_doc_ids(self, term_idx):
+        if isinstance(self.global_posting, PostingStore):
+            offsets = self.global_posting.offsets
+            return self.global_posting.doc_ids[offsets[term_idx]:offsets[term_idx + 1]]
+        return self.global_posting.postings(term_idx)[0]
+
+    def lookup(self, term_idx, candidates):
+        '''
+        정렬된 후보 문서 idx 중 term_idx의 posting에 있는 문서의 (mask, weights)를 반환 합니다.
+        '''
+        store = self.global_posting
+        mask = np.zeros(len(candidates), dtype=bool)
+        weights = np.empty(0, dtype=np.float64)
+        if len(candidates) == 0:
+            return mask, weights
+
+        if isinstance(store, CompressedPostingStore):
+            # skip pointer : 후보 문서가 들어갈 수 있는 block(block_first <= 문서 <= block_last)만 풀어서 확인
+            start, end = store.term_blocks[term_idx], store.term_blocks[term_idx + 1]
+            block_ids = start + np.searchsorted(store.block_last[start:end], candidates)
+            inside = block_ids < end
+            inside[inside] = store.block_first[block_ids[inside]] <= candidates[inside]
+
+            weight_list = list()
+            for block_idx in np.unique(block_ids[inside]):
+                selected = np.flatnonzero(inside & (block_ids == block_idx))
+                doc_ids, _, block_weights = store._decode_block(term_idx, block_idx)
+                positions = np.minimum(np.searchsorted(doc_ids, candidates[selected]), len(doc_ids) - 1)
+                found = doc_ids[positions] == candidates[selected]
+                mask[selected[found]] = True
+                weight_list.append(block_weights[positions[found]])
+            if weight_list:
+                weights = np.concatenate(weight_list)
+            return mask, weights
+
+        if isinstance(store, PostingStore):
+            offsets = store.offsets
+            doc_ids = store.doc_ids[offsets[term_idx]:offsets[term_idx + 1]]
+            posting_weights = store.weights[offsets[term_idx]:offsets[term_idx + 1]]
+        else:
+            doc_ids, posting_weights = store.postings(term_idx)
+
+        if len(doc_ids) == 0:
+            return mask, weights
+        positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+        mask = doc_ids[positions] == candidates
+        return mask, posting_weights[positions[mask]]
+
+    def _filter(self, candidates, node, keep):
+        '''
+        후보 문서 중 node의 결과에 있는(keep=True) 또는 없는(keep=False) 문서만 남깁니다.
+        '''
+        if node[0] == "term":
+            term_idx = self.global_lexicon.get(node[1], None)
+            if term_idx is None:
+                return candidates[:0] if keep else candidates
+            mask, _ = self.lookup(term_idx, candidates)
+            return candidates[mask if keep else ~mask]
+        if node[0] == "not":
+            return self._filter(candidates, node[1], not keep)
+
+        result = self._evaluate(node)
+        return intersect(candidates, result) if keep else difference(candidates, result)
+
+    def _evaluate(self, node):
+        if node[0] == "term":
+            term_idx = self.global_lexicon.get(node[1], None)
+            if term_idx is None:
+                return np.empty(0, dtype=np.int64)
+            return np.asarray(self._posting_doc_ids(term_idx), dtype=np.int64)
+
+        if node[0] == "not":
+            return self._filter(self._universe(), node[1], False)
+
+        if node[0] == "or":
+            return union([self._evaluate(child) for child in node[1]])
+
+        # AND : NOT이 아닌 자식 중 결과가 가장 작은 것부터 후보를 만들고, 나머지는 후보만 확인
+        children = sorted(node[1], key=lambda child: (child[0] == "not", self.estimate(child)))
+        if children[0][0] == "not":
+            candidates = self._universe()
+        else:
+            candidates = self._evaluate(children[0])
+            children = children[1:]
+
+        for child in children:
+            if len(candidates) == 0:
+                break
+            candidates = self._filter(candidates, child, True)
+
+        return candidates
+
+    def evaluate(self, query):
+        '''
+        질의(문자열 또는 구문 트리)를 만족하는 문서 idx array(오름차순)를 반환 합니다.
+        '''
+        node = parse_boolean_query(query) if isinstance(query, str) else query
+        return self._evaluate(node)
+
+    def candidate_list(self, query, query_weight, global_document, global_document_weight):
+        '''
+        질의를 만족하는 문서만으로 candidate_list_by_cosine()과 같은 {"document": similarity}를 반환 합니다.
+        후보 문서의 점수는 query term의 posting 전체가 아니라 후보 문서만 binary search로 찾아서 누적 합니다.
+        '''
+        candidates = self.evaluate(query)
+        scores = np.zeros(len(candidates), dtype=np.float64)
+        matched = np.zeros(len(candidates), dtype=bool)
+
+        for index_term, q_weight in query_weight.items():
+            term_idx = self.global_lexicon.get(index_term, None)
+
+            if term_idx is not None:
+                mask, document_weight = self.lookup(term_idx, candidates)
+                scores[mask] += q_weight * document_weight
+                matched |= mask
+
+        candidate_list = dict()
+        document_weight_array = getattr(global_document_weight, "array", None)
+
+        for position in np.flatnonzero(matched):
+            doc_idx = candidates[position]
+            document = global_document[doc_idx]
+
+            if document_weight_array is None:
+                candidate_list[document] = scores[position] / global_document_weight[document]
+            else:
+                candidate_list[document] = scores[position] / document_weight_array[doc_idx]
+
+        return candidate_list
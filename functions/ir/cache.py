@@ -0,0 +1,192 @@
+'''
+cache.py : 자주 반복되는 질의의 검색 결과를 저장하는 질의 결과 cache(QueryCache)를 정의 합니다.
+
+같은 질의가 반복되어도 query_index()(Kkma 형태소 분석)와 채점(candidate_list_by_cosine 등)을 매번 다시 수행 합니다.
+QueryCache는
+    1. 질의문(공백 정규화) -> query_repr({"token": frequency}) 결과를 저장하여 형태소 분석을 건너뛰고
+    2. (model 이름, k, 정렬된 query_repr) -> 검색 결과를 저장하여 채점을 건너뜁니다.
+두 저장소 모두 maxsize를 넘으면 가장 오래 사용하지 않은 항목부터 삭제(LRU)하고, ttl(초)이 지나면 만료 됩니다.
+색인의 generation(IncrementalIndex.generation 등)이 바뀌면 저장된 검색 결과를 모두 삭제 합니다.
+ranking model은 fit() 시점의 색인으로 채점하므로, generation이 바뀌어도 model은 그대로 이전 색인의 결과를 반환 합니다.
+색인이 바뀌는 경우에는 refresh에 model을 다시 fit() 하는 함수를 전달해서, 결과를 삭제하기 전에 다시 fit() 합니다.
+
+사용예)
+    model = BM25().fit(global_lexicon, global_posting, global_document)      # 바뀌지 않는 색인
+    cache = QueryCache(maxsize=1024, ttl=600)
+    result_list = cache.search(model, "서울 부동산 가격", k=3)
+    print(cache.stats())
+
+    model = BM25().fit(*incremental_index.as_tuple()[:3])                    # IncrementalIndex (functions/ir/segment.py)
+    cache = QueryCache(maxsize=1024, ttl=600, generation=incremental_index,
+                       refresh=lambda: model.fit(*incremental_index.as_tuple()[:3]))
+    incremental_index.add_documents(extended_collection)
+    result_list = cache.search(model, "서울 부동산 가격", k=3)                 # model을 다시 fit() 한 후 채점
+'''
+import threading
+import time
+from collections import OrderedDict
+
+from functions.info_retrieval import query_index
+
+
+def normalize_query(query):
+    '''
+    질의문의 앞뒤 공백을 없애고, 연속된 공백을 하나로 바꿉니다.
+    '''
+    return " ".join(query.split())
+
+
+def query_key(query_repr, k, model_name):
+    '''
+    검색 결과 cache의 key를 만듭니다. query_repr의 단어 순서가 달라도 같은 key가 됩니다.
+    '''
+    return model_name, k, tuple(sorted(query_repr.items()))
+
+
+class LRUCache():
+    '''
+    maxsize개 까지 저장하는 LRU cache 입니다. (thread-safe)
+        maxsize : 최대 항목 수 (None이면 제한 없음)
+        ttl     : 항목의 유효 시간(초) (None이면 만료 없음)
+    hits, misses, evictions, expirations => 조회 성공/실패, LRU 삭제, ttl 만료 횟수
+    '''
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+        self._items = OrderedDict()    # key -> (저장 시각, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key, None)
+
+            if item is not None and self.ttl is not None and self.timer() - item[0] > self.ttl:
+                del self._items[key]
+                self.expirations += 1
+                item = None
+
+            if item is None:
+                self.misses += 1
+                return default
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (self.timer(), value)
+            self._items.move_to_end(key)
+
+            while self.maxsize is not None and len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._items), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "expirations": self.expirations}
+
+
+class QueryCache():
+    '''
+    질의 결과 cache 입니다.
+        maxsize    : 검색 결과 / query_repr 저장소 각각의 최대 항목 수
+        ttl        : 검색 결과의 유효 시간(초) (None이면 만료 없음)
+        generation : 색인 generation을 반환하는 함수, 또는 generation 속성을 가진 객체(IncrementalIndex)
+                     (None이면 invalidate()를 직접 호출할 때만 삭제)
+        refresh    : generation이 바뀐 후 첫 검색에서, 검색 결과를 삭제하기 전에 호출하는 함수
+                     (색인 snapshot으로 fit() 한 ranking model을 다시 fit() 하는 등, 채점 함수가 바뀐 색인을 사용하도록 갱신)
+        morphs     : query_index()에 전달할 형태소 분석 함수 (None이면 공유 Kkma 분석기의 morphs)
+    '''
+
+    def __init__(self, maxsize=1024, ttl=None, generation=None, morphs=None, refresh=None):
+        self.results = LRUCache(maxsize, ttl)
+        self.query_reprs = LRUCache(maxsize)
+        self.generation = generation
+        self.morphs = morphs
+        self.refresh = refresh
+        self.invalidations = 0
+
+        self._generation = self.current_generation()
+        self._lock = threading.Lock()
+
+    def current_generation(self):
+        if self.generation is None:
+            return None
+        if callable(self.generation):
+            return self.generation()
+        return self.generation.generation
+
+    def invalidate(self):
+        '''
+        저장된 검색 결과를 모두 삭제 합니다. (query_repr는 색인과 무관하므로 유지)
+        '''
+        self.results.clear()
+        self.invalidations += 1
+
+    def _check_generation(self):
+        generation = self.current_generation()
+
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    if self.refresh is not None:
+                        self.refresh()
+                    self.invalidate()
+                    self._generation = generation
+
+    def query_repr(self, query):
+        '''
+        질의문의 query_repr를 반환 합니다. 같은 질의문은 형태소 분석을 다시 하지 않습니다.
+        '''
+        query = normalize_query(query)
+        query_repr = self.query_reprs.get(query, None)
+
+        if query_repr is None:
+            query_repr = query_index(query, self.morphs)
+            self.query_reprs.put(query, query_repr)
+
+        return query_repr
+
+    def search(self, model, query, k=3):
+        '''
+        model.search(query_repr, k)의 결과를 cache 합니다.
+            model : name 속성과 search(query_repr, k) 함수를 가진 ranking model (ranking.py)
+            query : 질의문(str) 또는 query_repr({"token": frequency})
+        '''
+        self._check_generation()
+        generation = self._generation
+
+        if isinstance(query, str):
+            query = self.query_repr(query)
+
+        key = query_key(query, k, model.name)
+        result_list = self.results.get(key, None)
+
+        if result_list is None:
+            result_list = model.search(query, k)
+            # 채점 중에 색인이 바뀌었으면 이전 색인의 결과이므로 저장하지 않음
+            if generation == self.current_generation():
+                self.results.put(key, result_list)
+
+        return list(result_list)
+
+    def stats(self):
+        return {"results": self.results.stats(), "query_reprs": self.query_reprs.stats(),
+                "invalidations": self.invalidations}
@@ -0,0 +1,297 @@
+'''
+compress.py : posting list를 압축해서 저장하는 CompressedPostingStore를 정의 합니다.
+
+term 별 posting을 BLOCK_SIZE(128)개 단위의 block으로 나누고, block 마다
+    - 문서 idx : 첫 문서 idx는 block table(block_first)에 저장, 나머지는 앞 문서와의 차이(gap)
+    - 빈도     : raw tf
+를 variable-byte(varint, LEB128) 형식으로 이어서 저장 합니다.
+
+weight(max_tf)는 freq / 문서 내 최대 빈도로 정확히 복원할 수 있으므로 문서 별 최대 빈도 만 저장 합니다.
+max_tf가 아닌 weight(BM25 등)는 quantize=True로 term 별 최대 weight 기준 8bit 값으로 양자화 해서 저장 합니다.
+
+질의 시에는 필요한 term의 block 만 그때그때(lazily) 풀어서 사용 합니다.
+    doc_ids, weights = compressed_posting.postings(term_idx)
+    for doc_ids, weights in compressed_posting.iter_blocks(term_idx): ...
+'''
+from itertools import accumulate
+
+import numpy as np
+
+from functions.ir.posting import PostingStore
+from functions.ir.term_stats import term_statistics
+
+BLOCK_SIZE = 128
+
+# 이 크기(bytes) 이하의 block은 numpy 대신 Python loop로 풀어서 numpy 호출 overhead를 줄임
+_SMALL_BLOCK_BYTES = 64
+
+
+def varint_encode(values):
+    '''
+    0 이상의 정수 array를 variable-byte(LEB128) 형식의 uint8 array로 변환 합니다.
+    각 byte의 하위 7bit에 값을, 최상위 bit에 다음 byte가 이어지는지(1) 여부를 저장 합니다.
+    return: 인코딩된 uint8 array, 값 별 byte 수
+    '''
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+
+    while rest.any():
+        n_bytes += rest > 0
+        rest >>= np.uint64(7)
+
+    encoded = np.empty(int(n_bytes.sum()), dtype=np.uint8)
+    starts = np.cumsum(n_bytes) - n_bytes
+
+    for k in range(int(n_bytes.max()) if len(values) > 0 else 0):
+        mask = n_bytes > k
+        payload = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (n_bytes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        encoded[starts[mask] + k] = payload | more
+
+    return encoded, n_bytes
+
+
+def varint_decode(encoded):
+    '''
+    varint_encode()로 인코딩된 uint8 array를 정수(int64) array로 복원 합니다.
+    '''
+    encoded = np.asarray(encoded, dtype=np.uint8)
+    ends = np.flatnonzero(encoded < 0x80)    # 값의 마지막 byte는 최상위 bit가 0
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+
+    values = np.zeros(len(ends), dtype=np.int64)
+
+    for k in range(int(lengths.max()) if len(ends) > 0 else 0):
+        mask = lengths > k
+        values[mask] |= (encoded[starts[mask] + k] & 0x7F).astype(np.int64) << (7 * k)
+
+    return values
+
+
+def _varint_decode_small(encoded):
+    '''
+    작은 block의 varint bytes를 Python loop로 풀어서 정수 list로 반환 합니다.
+    '''
+    values = list()
+    value = shift = 0
+
+    for byte in encoded:
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            values.append(value)
+            value = shift = 0
+        else:
+            shift += 7
+
+    return values
+
+
+def _term_blocks(df):
+    '''
+    term 별 block 수(df / BLOCK_SIZE 올림)의 누적합으로 term idx 별 첫 block 위치를 계산 합니다.
+    '''
+    term_blocks = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(-(-df // BLOCK_SIZE), out=term_blocks[1:])
+    return term_blocks
+
+
+class CompressedPostingStore():
+    '''
+    PostingStore를 block 단위 delta + varint 형식으로 압축 합니다.
+
+    data          => 전체 block의 varint bytes (uint8)
+    block_offsets => block 별 data 시작 위치 (길이: block 수 + 1)
+    block_first   => block 별 첫 문서 idx
+    block_last    => block 별 마지막 문서 idx (block 건너뛰기에 사용)
+    offsets       => term idx 별 posting 시작 위치 (PostingStore.offsets와 같음)
+    term_blocks   => term idx 별 첫 block 위치 (길이: term 수 + 1, offsets로 부터 계산)
+    max_freq      => 문서 idx 별 최대 빈도 (weight = freq / max_freq)
+    weight_codes  => quantize=True인 경우 posting 별 8bit weight, weight_scale => term 별 최대 weight
+    stats         => 압축 전 PostingStore의 단어 별 통계 (TermStatistics, block_max는 압축 block과 같은 단위)
+    '''
+
+    def __init__(self, data, block_offsets, block_first, block_last, offsets,
+                 max_freq=None, weight_codes=None, weight_scale=None, stats=None):
+        self.data = np.asarray(data, dtype=np.uint8)
+        self.block_offsets = np.asarray(block_offsets, dtype=np.int64)
+        self.block_first = np.asarray(block_first, dtype=np.int32)
+        self.block_last = np.asarray(block_last, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.term_blocks = _term_blocks(self.df())
+        self.max_freq = None if max_freq is None else np.asarray(max_freq, dtype=np.int32)
+        self.weight_codes = None if weight_codes is None else np.asarray(weight_codes, dtype=np.uint8)
+        self.weight_scale = None if weight_scale is None else np.asarray(weight_scale, dtype=np.float64)
+        self.stats = stats
+
+    @classmethod
+    def from_store(cls, global_posting, quantize=False):
+        '''
+        PostingStore를 압축 합니다.
+        quantize=False이면 weight를 freq / 문서 내 최대 빈도로 정확히 복원할 수 있어야 합니다. (max_tf weight)
+        '''
+        doc_ids = global_posting.doc_ids.astype(np.int64)
+        freqs = global_posting.freqs.astype(np.int64)
+        df = global_posting.df()
+        n_postings = len(doc_ids)
+
+        # posting 별 block 번호와 block 내 위치
+        term_blocks = _term_blocks(df)
+        n_blocks = int(term_blocks[-1])
+
+        position_in_term = np.arange(n_postings) - np.repeat(global_posting.offsets[:-1], df)
+        block_ids = np.repeat(term_blocks[:-1], df) + position_in_term // BLOCK_SIZE
+        position_in_block = position_in_term % BLOCK_SIZE
+        is_first = position_in_block == 0
+
+        block_first = doc_ids[is_first]
+        block_last = doc_ids[np.r_[is_first[1:], True]] if n_postings > 0 else doc_ids
+
+        # block 내 value 순서 : [gap(첫 posting 제외)..., freq...]
+        gaps = np.diff(doc_ids, prepend=0)[~is_first]
+        values = np.concatenate([gaps, freqs])
+        value_blocks = np.concatenate([block_ids[~is_first], block_ids])
+        value_kinds = np.concatenate([np.zeros(len(gaps), dtype=np.int8), np.ones(n_postings, dtype=np.int8)])
+        value_positions = np.concatenate([position_in_block[~is_first], position_in_block])
+        order = np.lexsort((value_positions, value_kinds, value_blocks))
+
+        data, n_bytes = varint_encode(values[order])
+        block_offsets = np.zeros(n_blocks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(value_blocks[order], weights=n_bytes, minlength=n_blocks).astype(np.int64),
+                  out=block_offsets[1:])
+
+        n_docs = int(doc_ids.max()) + 1 if n_postings > 0 else 0
+        max_freq = np.zeros(n_docs, dtype=np.int64)
+        np.maximum.at(max_freq, doc_ids, freqs)
+        stats = term_statistics(global_posting)
+
+        if not quantize:
+            if not np.array_equal(freqs / max_freq[doc_ids], global_posting.weights):
+                raise ValueError("weight를 freq / 최대 빈도로 복원할 수 없습니다. quantize=True를 사용하세요.")
+            return cls(data, block_offsets, block_first, block_last, global_posting.offsets,
+                       max_freq=max_freq, stats=stats)
+
+        # term 별 최대 weight를 기준으로 0~255로 양자화
+        weight_scale = np.zeros(len(df), dtype=np.float64)
+        term_ids = np.repeat(np.arange(len(df)), df)
+        np.maximum.at(weight_scale, term_ids, global_posting.weights)
+        scale = np.where(weight_scale > 0, weight_scale, 1.0)[term_ids]
+        weight_codes = np.rint(global_posting.weights / scale * 255).astype(np.uint8)
+
+        return cls(data, block_offsets, block_first, block_last, global_posting.offsets,
+                   weight_codes=weight_codes, weight_scale=weight_scale, stats=stats)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def n_terms(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        arrays = [self.data, self.block_offsets, self.block_first, self.block_last, self.offsets,
+                  self.term_blocks, self.max_freq, self.weight_codes, self.weight_scale]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def df(self):
+        return np.diff(self.offsets)
+
+    def _decode_block(self, term_idx, block_idx):
+        '''
+        block 하나를 풀어서 (doc_ids, freqs, weights)를 반환 합니다.
+        '''
+        term_start = self.term_blocks[term_idx]
+        start = self.offsets[term_idx] + (block_idx - term_start) * BLOCK_SIZE
+        count = min(BLOCK_SIZE, self.offsets[term_idx + 1] - start)
+
+        encoded = self.data[self.block_offsets[block_idx]:self.block_offsets[block_idx + 1]]
+
+        if len(encoded) <= _SMALL_BLOCK_BYTES:
+            values = _varint_decode_small(encoded.tobytes())
+            doc_ids = np.fromiter(accumulate(values[:count - 1], initial=int(self.block_first[block_idx])),
+                                  dtype=np.int64, count=count)
+            freqs = np.array(values[count - 1:], dtype=np.int64)
+        else:
+            values = varint_decode(encoded)
+            doc_ids = np.empty(count, dtype=np.int64)
+            doc_ids[0] = self.block_first[block_idx]
+            np.cumsum(values[:count - 1], out=doc_ids[1:])
+            doc_ids[1:] += doc_ids[0]
+            freqs = values[count - 1:]
+
+        if self.weight_codes is None:
+            weights = freqs / self.max_freq[doc_ids]
+        else:
+            weights = self.weight_codes[start:start + count] * (self.weight_scale[term_idx] / 255)
+
+        return doc_ids, freqs, weights
+
+    def iter_blocks(self, term_idx, min_doc=0):
+        '''
+        term_idx의 posting을 block 단위로 풀어서 (doc_ids, weights)로 반환 합니다.
+        min_doc 보다 작은 문서만 있는 block은 풀지 않고 건너뜁니다.
+        '''
+        for block_idx in range(self.term_blocks[term_idx], self.term_blocks[term_idx + 1]):
+            if self.block_last[block_idx] < min_doc:
+                continue
+            doc_ids, _, weights = self._decode_block(term_idx, block_idx)
+            yield doc_ids, weights
+
+    def postings(self, term_idx):
+        '''
+        term_idx의 posting을 (doc_ids, weights)로 반환 합니다. (PostingStore.postings()와 같음)
+        '''
+        blocks = list(self.iter_blocks(term_idx))
+
+        if len(blocks) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        if len(blocks) == 1:
+            return blocks[0]
+        return np.concatenate([block[0] for block in blocks]), np.concatenate([block[1] for block in blocks])
+
+    def freq_postings(self, term_idx):
+        blocks = [self._decode_block(term_idx, block_idx)
+                  for block_idx in range(self.term_blocks[term_idx], self.term_blocks[term_idx + 1])]
+
+        if len(blocks) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate([block[0] for block in blocks]), np.concatenate([block[1] for block in blocks])
+
+    def decompress(self):
+        '''
+        전체 posting을 풀어서 PostingStore로 반환 합니다.
+        '''
+        values = varint_decode(self.data)
+        df = self.df()
+        n_postings = len(self)
+
+        # block 별 value 수 : gap(count-1) + freq(count)
+        block_counts = np.zeros(len(self.block_first), dtype=np.int64)
+        term_n_blocks = np.diff(self.term_blocks)
+        term_of_block = np.repeat(np.arange(self.n_terms), term_n_blocks)
+        block_in_term = np.arange(len(block_counts)) - np.repeat(self.term_blocks[:-1], term_n_blocks)
+        block_counts[:] = np.minimum(BLOCK_SIZE, df[term_of_block] - block_in_term * BLOCK_SIZE)
+
+        value_starts = np.cumsum(2 * block_counts - 1) - (2 * block_counts - 1)
+        posting_starts = np.cumsum(block_counts) - block_counts
+        block_of_posting = np.repeat(np.arange(len(block_counts)), block_counts)
+        position_in_block = np.arange(n_postings) - posting_starts[block_of_posting]
+
+        freqs = values[value_starts[block_of_posting] + block_counts[block_of_posting] - 1 + position_in_block]
+        gaps = np.where(position_in_block == 0, 0,
+                        values[value_starts[block_of_posting] + np.maximum(position_in_block - 1, 0)])
+        gaps[position_in_block == 0] = self.block_first
+        doc_ids = np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[posting_starts] - self.block_first, block_counts)
+
+        if self.weight_codes is None:
+            weights = freqs / self.max_freq[doc_ids]
+        else:
+            weights = self.weight_codes * (np.repeat(self.weight_scale, df) / 255)
+
+        # 양자화 한 weight는 원래 weight와 다르므로 max_weight, block_max를 그대로 사용할 수 없음
+        stats = self.stats if self.weight_codes is None else None
+        return PostingStore(self.offsets, doc_ids, freqs, weights, stats)
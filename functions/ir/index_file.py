@@ -0,0 +1,325 @@
+'''
+index_file.py : 색인을 memory-map(mmap)으로 열 수 있는 binary 파일 형식으로 저장/로드 합니다.
+
+save_pickle()로 저장한 색인은 검색 process 마다 전체를 unpickle 해서 Python 객체로 만들어야 하므로,
+시작이 느리고 worker process 수 만큼 메모리를 중복해서 사용 합니다.
+write_index()로 저장한 색인은 load_index()가 파일을 mmap으로 열고 numpy array를 그대로 참조하므로,
+로드가 거의 즉시 끝나고 같은 파일을 연 process 끼리 page cache를 공유 합니다.
+
+# 파일 구조 (little endian)
+    header        => magic(8 bytes: b"NLPIDX\\0\\0"), version(uint32), section 수(uint32)
+    section table => section 별 [이름(16 bytes), dtype(8 bytes), 시작 위치(uint64), 원소 수(uint64)]
+    sections      => 64 bytes 단위로 정렬된 numpy array 데이터
+        lexicon.*  : 단어 사전 (FrozenTermDictionary), lexicon.idf : 단어 idx 별 idf
+        posting.*  : PostingStore (offsets, doc_ids, freqs, weights)
+        cpost.*    : CompressedPostingStore (write_index(compress=True)로 저장한 경우, version 2 부터)
+        stats.*    : 색인 시 만든 단어 별 통계 (TermStatistics의 cf, max_weight, block_max, 없으면 로드 후 필요할 때 계산)
+        document.* : 문서 이름 table, document.weight : 문서 idx 별 document weight(norm)
+'''
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from functions.info_retrieval import evaluate_idf
+from functions.ir.lexicon import FrozenTermDictionary
+from functions.ir.posting import PostingStore
+from functions.ir.compress import CompressedPostingStore
+from functions.ir.term_stats import TermStatistics
+
+MAGIC = b"NLPIDX\0\0"
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16s8sQQ")
+_ALIGN = 64
+
+
+class DocumentTable(Sequence):
+    '''
+    문서 이름을 UTF-8 bytes로 이어 붙여 저장한 읽기 전용 문서 목록 입니다. (기존 global_document list 대체)
+    index(document)는 처음 호출 시 {문서 이름: 문서 idx} dictionary(DocumentIds)를 만들어 O(1)로 조회 합니다.
+    '''
+
+    def __init__(self, blob, offsets):
+        self.blob = np.asarray(blob, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = DocumentIds(self)
+
+    @classmethod
+    def from_names(cls, names):
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __getitem__(self, doc_idx):
+        if isinstance(doc_idx, slice):
+            return [self[i] for i in range(*doc_idx.indices(len(self)))]
+        if doc_idx < 0:
+            doc_idx += len(self)
+        return self.blob[self.offsets[doc_idx]:self.offsets[doc_idx + 1]].tobytes().decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def index(self, document, *args):
+        try:
+            return self.ids[document]
+        except KeyError:
+            raise ValueError("{0} is not in DocumentTable".format(document))
+
+    def __contains__(self, document):
+        return document in self.ids
+
+
+class DocumentIds(Mapping):
+    '''
+    DocumentTable의 {문서 이름: 문서 idx} Mapping 입니다.
+    이름으로 처음 조회할 때 dictionary를 만들기 때문에, 색인 로드 시에는 비용이 들지 않습니다.
+    '''
+
+    def __init__(self, table):
+        self._table = table
+        self._ids = None
+
+    def _dict(self):
+        if self._ids is None:
+            self._ids = {document: doc_idx for doc_idx, document in enumerate(self._table)}
+        return self._ids
+
+    def __getitem__(self, document):
+        return self._dict()[document]
+
+    def __contains__(self, document):
+        return document in self._dict()
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+
+class ArrayMapping(Mapping):
+    '''
+    key -> idx Mapping과 idx 별 값 array를 묶어서 {key: 값} dictionary처럼 사용 합니다.
+    global_lexicon_idf({단어: idf}), global_document_weight({문서: weight})를 array로 대체할 때 사용 합니다.
+    값이 nan인 항목은 없는 key로 취급 합니다.
+    '''
+
+    def __init__(self, ids, array):
+        self.ids = ids
+        self.array = array
+
+    def __getitem__(self, key):
+        value = self.array[self.ids[key]]
+
+        if np.isnan(value):
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for key in self.ids:
+            if not np.isnan(self.array[self.ids[key]]):
+                yield key
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.array)))
+
+
+def _freeze_lexicon(global_lexicon):
+    if isinstance(global_lexicon, FrozenTermDictionary):
+        return global_lexicon
+
+    terms = [term for term, _ in sorted(global_lexicon.items(), key=lambda item: item[1])]
+    return FrozenTermDictionary.from_terms(terms)
+
+
+def _values_by_idx(weights, names, dtype=np.float64):
+    '''
+    {key: 값} dictionary를 names 순서의 array로 변환 합니다. 값이 없는 key는 nan 입니다.
+    '''
+    if isinstance(weights, ArrayMapping):
+        return np.asarray(weights.array, dtype=dtype)
+    return np.array([weights.get(name, np.nan) for name in names], dtype=dtype)
+
+
+def _posting_sections(global_posting, compress=False):
+    '''
+    global_posting을 저장할 section 목록을 반환 합니다.
+    compress=True이면 CompressedPostingStore로 압축해서 저장 합니다.
+    '''
+    if compress and not isinstance(global_posting, CompressedPostingStore):
+        global_posting = CompressedPostingStore.from_store(global_posting)
+
+    if not isinstance(global_posting, CompressedPostingStore):
+        sections = [("posting.offsets", global_posting.offsets),
+                    ("posting.doc_ids", global_posting.doc_ids),
+                    ("posting.freqs", global_posting.freqs),
+                    ("posting.weights", global_posting.weights)]
+    else:
+        sections = [("posting.offsets", global_posting.offsets),
+                    ("cpost.data", global_posting.data),
+                    ("cpost.boffsets", global_posting.block_offsets),
+                    ("cpost.bfirst", global_posting.block_first),
+                    ("cpost.blast", global_posting.block_last)]
+
+        if global_posting.weight_codes is None:
+            sections.append(("cpost.maxfreq", global_posting.max_freq))
+        else:
+            sections.append(("cpost.wcodes", global_posting.weight_codes))
+            sections.append(("cpost.wscale", global_posting.weight_scale))
+
+    stats = getattr(global_posting, "stats", None)
+    if stats is not None:
+        sections += [("stats.cf", stats.cf),
+                     ("stats.maxw", stats.max_weight),
+                     ("stats.blockmax", stats.block_max)]
+
+    return sections
+
+
+def _load_posting(sections):
+    stats = None
+    if "stats.cf" in sections:
+        stats = TermStatistics(np.diff(sections["posting.offsets"]), sections["stats.cf"],
+                               sections["stats.maxw"], sections["stats.blockmax"])
+
+    if "cpost.data" not in sections:
+        return PostingStore(sections["posting.offsets"], sections["posting.doc_ids"],
+                            sections["posting.freqs"], sections["posting.weights"], stats)
+
+    return CompressedPostingStore(sections["cpost.data"], sections["cpost.boffsets"],
+                                  sections["cpost.bfirst"], sections["cpost.blast"],
+                                  sections["posting.offsets"],
+                                  max_freq=sections.get("cpost.maxfreq", None),
+                                  weight_codes=sections.get("cpost.wcodes", None),
+                                  weight_scale=sections.get("cpost.wscale", None),
+                                  stats=stats)
+
+
+def write_index(file_path, global_lexicon, global_posting, global_document,
+                global_lexicon_idf=None, global_document_weight=None, compress=False):
+    '''
+    inverted_index_with_tf()/evaluate_idf()의 결과를 binary 색인 파일로 저장 합니다.
+    global_lexicon_idf, global_document_weight를 전달하지 않으면 evaluate_idf()로 계산해서 저장 합니다.
+    compress=True이면 posting을 delta + varint 형식(CompressedPostingStore)으로 압축해서 저장 합니다.
+
+    사용예)
+        write_index("naver_news/index/news.idx", global_lexicon, global_posting, global_document)
+    '''
+    if global_lexicon_idf is None or global_document_weight is None:
+        global_lexicon_idf, global_document_weight = evaluate_idf(global_lexicon, global_posting, global_document)
+
+    lexicon = _freeze_lexicon(global_lexicon)
+    terms = list(lexicon)
+    documents = global_document if isinstance(global_document, DocumentTable) \
+        else DocumentTable.from_names(global_document)
+
+    sections = [
+        ("lexicon.blob", lexicon.blob),
+        ("lexicon.offsets", lexicon.offsets),
+        ("lexicon.ids", lexicon.ids),
+        ("lexicon.ranks", lexicon.ranks),
+        ("lexicon.idf", _values_by_idx(global_lexicon_idf, terms)),
+        ("document.blob", documents.blob),
+        ("document.offsets", documents.offsets),
+        ("document.weight", _values_by_idx(global_document_weight, documents)),
+    ] + _posting_sections(global_posting, compress)
+
+    write_sections(file_path, sections)
+    print("{0} is saved.".format(file_path))
+
+
+def write_sections(file_path, sections):
+    '''
+    [(section 이름, numpy array), ...]를 색인 파일 형식(header, section table, 64 bytes 정렬된 data)으로 저장 합니다.
+    저장한 파일은 read_sections()로 mmap 해서 읽습니다.
+    '''
+    # section 시작 위치 계산 (header + section table 이후부터 _ALIGN 단위로 정렬)
+    position = _HEADER.size + _SECTION.size * len(sections)
+    table = list()
+
+    for name, array in sections:
+        array = np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder("<"))
+        position = -(-position // _ALIGN) * _ALIGN
+        table.append((name, array, position))
+        position += array.nbytes
+
+    with open(file_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+
+        for name, array, offset in table:
+            f.write(_SECTION.pack(name.encode("ascii"), array.dtype.str.encode("ascii"), offset, len(array)))
+
+        for name, array, offset in table:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.tobytes())
+
+        f.write(b"\0" * (position - f.tell()))
+
+
+def read_sections(file_path):
+    '''
+    색인 파일을 mmap으로 열고 {section 이름: numpy array(복사 없음)} dictionary를 반환 합니다.
+    '''
+    with open(file_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, n_sections = _HEADER.unpack_from(buffer, 0)
+
+    if magic != MAGIC:
+        raise ValueError("{0} is not an index file.".format(file_path))
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError("{0}: unsupported index version {1} (expected {2})".format(file_path, version, SUPPORTED_VERSIONS))
+
+    sections = dict()
+
+    for i in range(n_sections):
+        name, dtype, offset, count = _SECTION.unpack_from(buffer, _HEADER.size + _SECTION.size * i)
+        name = name.rstrip(b"\0").decode("ascii")
+        sections[name] = np.frombuffer(buffer, dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                                       count=count, offset=offset)
+
+    return sections
+
+
+def load_index(file_path):
+    '''
+    write_index()로 저장한 색인 파일을 mmap으로 열어서 질의 함수에 필요한 객체들을 반환 합니다.
+        return: global_lexicon, global_posting, global_document, global_lexicon_idf, global_document_weight
+
+    반환되는 객체는 기존 dict/list와 같은 방식으로 사용할 수 있습니다.
+        global_lexicon         => FrozenTermDictionary ({단어: 단어 idx})
+        global_posting         => PostingStore (압축해서 저장한 경우 CompressedPostingStore)
+        global_document        => DocumentTable ([문서 이름, ...])
+        global_lexicon_idf     => ArrayMapping ({단어: idf})
+        global_document_weight => ArrayMapping ({문서 이름: weight})
+
+    사용예)
+        global_lexicon, global_posting, global_document, global_lexicon_idf, global_document_weight = \\
+            load_index("naver_news/index/news.idx")
+        query_weight = eval_query_weight(query_index(query), global_lexicon_idf)
+        candidate_list = candidate_list_by_cosine(query_weight, global_lexicon, global_posting,
+                                                  global_document, global_document_weight)
+    '''
+    sections = read_sections(file_path)
+
+    global_lexicon = FrozenTermDictionary(sections["lexicon.blob"], sections["lexicon.offsets"],
+                                          sections["lexicon.ids"], sections["lexicon.ranks"])
+    global_posting = _load_posting(sections)
+    global_document = DocumentTable(sections["document.blob"], sections["document.offsets"])
+    global_lexicon_idf = ArrayMapping(global_lexicon, sections["lexicon.idf"])
+    global_document_weight = ArrayMapping(global_document.ids, sections["document.weight"])
+
+    return global_lexicon, global_posting, global_document, global_lexicon_idf, global_document_weight
@@ -0,0 +1,177 @@
+'''
+lexicon.py : 색인의 단어(term) 사전을 정의 합니다.
+
+TermDictionary는 indexing 중에 단어가 처음 나온 순서대로 단어 idx를 O(1)에 부여하고,
+단어 idx -> 단어 역방향 조회를 지원 합니다.
+indexing이 끝나면 freeze()로 정렬된 array 기반의 FrozenTermDictionary로 변환해서
+색인 파일과 함께 저장할 수 있습니다.
+
+두 클래스 모두 dictionary(Mapping) 인터페이스({단어: 단어 idx})를 제공하므로,
+기존 global_lexicon(dict) 대신 그대로 사용할 수 있습니다.
+'''
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class TermDictionary(Mapping):
+    '''
+    단어 -> 단어 idx (dict), 단어 idx -> 단어 (list)를 함께 유지 합니다.
+
+    사용예)
+        lexicon = TermDictionary()
+        term_idx = lexicon.add("아파트")    # 처음 나온 단어는 새로운 idx, 이미 있으면 기존 idx
+        lexicon.term(term_idx)             # "아파트"
+    '''
+
+    def __init__(self, terms=()):
+        self._ids = dict()
+        self._terms = list()
+
+        for term in terms:
+            self.add(term)
+
+    def __getitem__(self, term):
+        return self._ids[term]
+
+    def __contains__(self, term):
+        return term in self._ids
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def add(self, term):
+        '''
+        단어의 idx를 반환 합니다. 처음 나온 단어는 현재 사전 크기를 idx로 부여 합니다.
+        '''
+        term_idx = self._ids.get(term, None)
+
+        if term_idx is None:
+            term_idx = len(self._terms)
+            self._ids[term] = term_idx
+            self._terms.append(term)
+
+        return term_idx
+
+    def term(self, term_idx):
+        '''
+        단어 idx에 해당하는 단어를 반환 합니다.
+        '''
+        return self._terms[term_idx]
+
+    def freeze(self):
+        '''
+        정렬된 array 기반의 FrozenTermDictionary로 변환 합니다. (단어 idx는 그대로 유지)
+        '''
+        return FrozenTermDictionary.from_terms(self._terms)
+
+
+class FrozenTermDictionary(Mapping):
+    '''
+    단어를 UTF-8 bytes로 정렬하여 하나의 buffer에 이어 붙여 저장하는 읽기 전용 단어 사전 입니다.
+    단어 조회는 binary search(O(log V))로, 단어 idx -> 단어 조회는 O(1)로 처리 합니다.
+
+    blob    => 정렬된 단어들의 UTF-8 bytes를 이어 붙인 uint8 array
+    offsets => 정렬 순서 별 단어의 시작 위치 (길이: 단어 수 + 1)
+    ids     => 정렬 순서 별 단어 idx
+    ranks   => 단어 idx 별 정렬 순서 (ids의 역순열)
+    '''
+
+    def __init__(self, blob, offsets, ids, ranks=None):
+        self.blob = np.asarray(blob, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = np.asarray(ids, dtype=np.int32)
+
+        if ranks is None:
+            ranks = np.empty_like(self.ids)
+            ranks[self.ids] = np.arange(len(self.ids), dtype=np.int32)
+        self.ranks = np.asarray(ranks, dtype=np.int32)
+
+    @classmethod
+    def from_terms(cls, terms):
+        '''
+        단어 idx 순서의 단어 list로 부터 FrozenTermDictionary를 만듭니다.
+        '''
+        encoded = [term.encode("utf-8") for term in terms]
+        # UTF-8 bytes의 정렬 순서는 unicode code point의 정렬 순서와 같음
+        ids = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int32)
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(encoded[term_idx]) for term_idx in ids], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded[term_idx] for term_idx in ids), dtype=np.uint8)
+
+        return cls(blob, offsets, ids)
+
+    def _key(self, rank):
+        return self.blob[self.offsets[rank]:self.offsets[rank + 1]].tobytes()
+
+    def _find(self, term):
+        '''
+        단어의 정렬 순서를 binary search로 찾습니다. 없으면 -1을 반환 합니다.
+        '''
+        if not isinstance(term, str):
+            return -1
+
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.ids)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < len(self.ids) and self._key(lo) == key:
+            return lo
+        return -1
+
+    def __getitem__(self, term):
+        rank = self._find(term)
+
+        if rank == -1:
+            raise KeyError(term)
+        return int(self.ids[rank])
+
+    def __contains__(self, term):
+        return self._find(term) != -1
+
+    def __iter__(self):
+        '''
+        단어 idx 순서로 단어를 반환 합니다. (TermDictionary와 같은 순서)
+        '''
+        for rank in self.ranks:
+            yield self._key(rank).decode("utf-8")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def term(self, term_idx):
+        '''
+        단어 idx에 해당하는 단어를 반환 합니다.
+        '''
+        return self._key(self.ranks[term_idx]).decode("utf-8")
+
+    def thaw(self):
+        '''
+        단어를 추가할 수 있는 TermDictionary로 변환 합니다. (단어 idx는 그대로 유지)
+        '''
+        return TermDictionary(self)
+
+    @property
+    def nbytes(self):
+        return self.blob.nbytes + self.offsets.nbytes + self.ids.nbytes + self.ranks.nbytes
+
+    def save(self, file_path):
+        '''
+        색인 파일과 함께 저장할 수 있도록 numpy 형식(.npz)으로 저장 합니다.
+        '''
+        np.savez(file_path, blob=self.blob, offsets=self.offsets, ids=self.ids)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as data:
+            return cls(data["blob"], data["offsets"], data["ids"])
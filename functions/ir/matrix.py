@@ -0,0 +1,294 @@
+'''
+matrix.py : DTM, TDM, TWM, DTW를 하나의 sparse 행렬(DocumentTermMatrix)과 그 Mapping view로 표현 합니다.
+
+inverted_index_with_tf()의 dtm_dict, get_tdm_from_dtm()의 tdm_dict, tdm2twm()의 twm_dict, dtw_dict는
+문서 이름, 단어 문자열을 key로 하는 dictionary 안의 dictionary 이므로, 같은 (문서, 단어) 쌍을 Python 객체로 4번 저장 합니다.
+DocumentTermMatrix는 문서 x 단어 행렬을 정수 idx와 numpy array로 저장 합니다.
+    - 단어 기준(term-major, CSC) : term_indptr(단어 idx 별 시작 위치), doc_ids(문서 idx), data
+        -> inverted_index_with_tf()의 global_posting(offsets, doc_ids, freqs)을 복사 없이 그대로 사용
+    - 문서 기준(document-major, CSR) : 처음 필요할 때 한 번 만들고, 같은 색인에서 만든 행렬끼리 공유
+dtm(), tdm()은 {문서: {단어: 값}}, {단어: {문서: 값}} 형태로 조회하는 읽기 전용 Mapping view를 반환하고,
+(행 안의 조회는 이전 defaultdict(int), defaultdict(float)와 같이 값이 없는 단어/문서에 0을, 값은 Python int/float를 반환)
+TWM, DTW는 indptr, idx array를 공유하고 값(data) array만 새로 만듭니다. (scale_terms(), square())
+
+사용예)
+    matrix = DocumentTermMatrix.from_posting(global_lexicon, global_posting, global_document)
+    dtm, tdm = matrix.dtm(), matrix.tdm()
+    dtm["문서1"]["아파트"]        # 문서1의 "아파트" 빈도 (문서1에 없는 단어이면 0)
+    matrix.csr                    # scipy.sparse.csr_matrix (문서 수 x 단어 수)
+'''
+from collections.abc import ItemsView, Mapping, ValuesView
+
+import numpy as np
+from scipy import sparse
+
+
+class DocumentTermMatrix():
+    '''
+    문서 x 단어 sparse 행렬 입니다.
+        terms       => {단어: 단어 idx} (global_lexicon, 단어 idx 순서로 iterate)
+        documents   => 문서 idx 별 문서 이름 (global_document)
+        term_indptr => 단어 idx 별 값의 시작 위치 (길이: 단어 수 + 1)
+        doc_ids     => 값 별 문서 idx (단어 별로 오름차순)
+        data        => 값 (빈도, weight 등)
+    '''
+
+    def __init__(self, terms, documents, term_indptr, doc_ids, data, layout=None):
+        self.terms = terms
+        self.documents = documents
+        self.term_indptr = np.asarray(term_indptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.data = np.asarray(data)
+        # 같은 색인에서 만든 행렬(TDM, TWM, DTW)이 공유하는 문서 기준 배치와 단어/문서 이름 목록
+        self._layout = dict() if layout is None else layout
+        self._document_data = None
+
+    @classmethod
+    def from_posting(cls, global_lexicon, global_posting, global_document):
+        '''
+        global_posting의 raw tf(freqs)로 DTM을 만듭니다. (global_posting의 array를 복사 없이 사용)
+        '''
+        if hasattr(global_posting, "decompress"):
+            global_posting = global_posting.decompress()
+        return cls(global_lexicon, global_document, global_posting.offsets, global_posting.doc_ids,
+                   global_posting.freqs)
+
+    @property
+    def shape(self):
+        return len(self.documents), len(self.term_indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.doc_ids)
+
+    @property
+    def nbytes(self):
+        '''
+        이 행렬의 값 array와 (공유하는) idx array의 bytes 수 입니다.
+        '''
+        arrays = [self.term_indptr, self.doc_ids, self.data, self._document_data]
+        arrays += [self._layout.get(name) for name in ("document_indptr", "term_ids", "order")]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def df(self):
+        '''
+        단어 idx 별 값이 있는 문서 수 입니다.
+        '''
+        return np.diff(self.term_indptr)
+
+    def _term_names(self):
+        if "term_names" not in self._layout:
+            self._layout["term_names"] = list(self.terms)    # 단어 idx -> 단어
+        return self._layout["term_names"]
+
+    def _document_ids(self):
+        if "document_ids" not in self._layout:
+            document_ids = getattr(self.documents, "ids", None)    # DocumentTable의 {문서 이름: 문서 idx}
+            if not isinstance(document_ids, Mapping):
+                document_ids = {document: doc_idx for doc_idx, document in enumerate(self.documents)}
+            self._layout["document_ids"] = document_ids
+        return self._layout["document_ids"]
+
+    def _document_layout(self):
+        '''
+        문서 기준(CSR) 배치 (document_indptr, term_ids, order)를 반환 합니다.
+        order는 단어 기준 값 위치 -> 문서 기준 값 위치 이므로, 값 array는 data[order]로 변환 합니다.
+        '''
+        if "order" not in self._layout:
+            n_documents, n_terms = self.shape
+            # 안정 정렬이므로 문서 안에서는 단어 idx 오름차순을 유지
+            order = np.argsort(self.doc_ids, kind="stable")
+            term_ids = np.repeat(np.arange(n_terms, dtype=np.int32), self.df())[order]
+            document_indptr = np.zeros(n_documents + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.doc_ids, minlength=n_documents), out=document_indptr[1:])
+            self._layout.update(document_indptr=document_indptr, term_ids=term_ids, order=order)
+
+        return self._layout["document_indptr"], self._layout["term_ids"], self._layout["order"]
+
+    def document_data(self):
+        '''
+        문서 기준 순서의 값 array 입니다.
+        '''
+        if self._document_data is None:
+            self._document_data = self.data[self._document_layout()[2]]
+        return self._document_data
+
+    @property
+    def csr(self):
+        '''
+        문서 기준 scipy.sparse.csr_matrix (문서 수 x 단어 수)
+        '''
+        document_indptr, term_ids, _ = self._document_layout()
+        return sparse.csr_matrix((self.document_data(), term_ids, document_indptr), shape=self.shape)
+
+    @property
+    def csc(self):
+        '''
+        단어 기준 scipy.sparse.csc_matrix (문서 수 x 단어 수, array 복사 없음)
+        '''
+        return sparse.csc_matrix((self.data, self.doc_ids, self.term_indptr), shape=self.shape)
+
+    def _derive(self, data):
+        return DocumentTermMatrix(self.terms, self.documents, self.term_indptr, self.doc_ids, data, self._layout)
+
+    def scale_terms(self, term_weights):
+        '''
+        값에 단어 idx 별 weight를 곱한 행렬을 반환 합니다. (TDM x idf -> TWM)
+        '''
+        term_weights = np.asarray(term_weights, dtype=np.float64)
+        return self._derive(self.data * np.repeat(term_weights, self.df()))
+
+    def square(self):
+        '''
+        값을 제곱한 행렬을 반환 합니다. (TWM -> DTW)
+        '''
+        return self._derive(self.data ** 2)
+
+    def dtm(self):
+        '''
+        {문서: {단어: 값}} Mapping view (값이 있는 문서만)
+        '''
+        return MatrixView(self, "document")
+
+    def tdm(self):
+        '''
+        {단어: {문서: 값}} Mapping view (값이 있는 단어만)
+        '''
+        return MatrixView(self, "term")
+
+
+class MatrixView(Mapping):
+    '''
+    DocumentTermMatrix를 행(axis: "document" 또는 "term") -> {열 이름: 값} 형태로 조회하는 읽기 전용 Mapping 입니다.
+    '''
+
+    def __init__(self, matrix, axis):
+        self.matrix = matrix
+        self.axis = axis
+        self._rows = None
+
+    def _arrays(self):
+        if self.axis == "document":
+            document_indptr, term_ids, _ = self.matrix._document_layout()
+            return document_indptr, term_ids, self.matrix.document_data()
+        return self.matrix.term_indptr, self.matrix.doc_ids, self.matrix.data
+
+    def _names(self):
+        return self.matrix.documents if self.axis == "document" else self.matrix._term_names()
+
+    def _ids(self):
+        return self.matrix._document_ids() if self.axis == "document" else self.matrix.terms
+
+    def _columns(self):
+        if self.axis == "document":
+            return self.matrix._term_names(), self.matrix.terms
+        return self.matrix.documents, self.matrix._document_ids()
+
+    def _non_empty(self):
+        if self._rows is None:
+            self._rows = np.flatnonzero(np.diff(self._arrays()[0]))
+        return self._rows
+
+    def _row(self, row_idx, arrays, columns):
+        indptr, indices, data = arrays
+        start, end = indptr[row_idx], indptr[row_idx + 1]
+        return VectorView(indices[start:end], data[start:end], *columns)
+
+    def __getitem__(self, name):
+        row_idx = self._ids().get(name, None)
+        arrays = self._arrays()
+        if row_idx is None or arrays[0][row_idx] == arrays[0][row_idx + 1]:
+            raise KeyError(name)
+        return self._row(row_idx, arrays, self._columns())
+
+    def __contains__(self, name):
+        row_idx = self._ids().get(name, None)
+        indptr = self._arrays()[0]
+        return row_idx is not None and indptr[row_idx] != indptr[row_idx + 1]
+
+    def __iter__(self):
+        names = self._names()
+        for row_idx in self._non_empty():
+            yield names[row_idx]
+
+    def __len__(self):
+        return len(self._non_empty())
+
+    def items(self):
+        return _MatrixItems(self)
+
+    def __repr__(self):
+        return "<{0}({1}): 행 {2}개, 값 {3}개>".format(type(self).__name__, self.axis, len(self), self.matrix.nnz)
+
+
+class _MatrixItems(ItemsView):
+    def __iter__(self):
+        view = self._mapping
+        names, arrays, columns = view._names(), view._arrays(), view._columns()
+        for row_idx in view._non_empty():
+            yield names[row_idx], view._row(row_idx, arrays, columns)
+
+
+class VectorView(Mapping):
+    '''
+    행 1개의 {열 이름: 값} Mapping 입니다. 열 idx가 오름차순이므로 binary search로 조회 합니다.
+    이전 defaultdict(int), defaultdict(float) 행과 같이
+        - 색인에 있지만 이 행에 값이 없는 열은 0 (데이터 type의 0)을 반환하고, 색인에 없는 열 이름은 KeyError
+        - 값은 numpy scalar가 아닌 Python int, float로 반환
+    "in", len(), iterate는 값이 있는 열만 대상으로 합니다. (defaultdict와 달리 조회해도 열이 추가되지 않음)
+    '''
+
+    def __init__(self, indices, data, names, ids):
+        self._indices = indices
+        self._data = data
+        self._names = names
+        self._ids = ids
+
+    def _position(self, column_idx):
+        position = np.searchsorted(self._indices, column_idx)
+        if position < len(self._indices) and self._indices[position] == column_idx:
+            return position
+        return None
+
+    def __getitem__(self, name):
+        column_idx = self._ids.get(name, None)
+        if column_idx is None:
+            raise KeyError(name)
+
+        position = self._position(column_idx)
+        if position is None:
+            return self._data.dtype.type(0).item()
+        return self._data[position].item()
+
+    def __contains__(self, name):
+        column_idx = self._ids.get(name, None)
+        return column_idx is not None and self._position(column_idx) is not None
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def __iter__(self):
+        for column_idx in self._indices.tolist():
+            yield self._names[column_idx]
+
+    def __len__(self):
+        return len(self._indices)
+
+    def items(self):
+        return _VectorItems(self)
+
+    def values(self):
+        return _VectorValues(self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _VectorItems(ItemsView):
+    def __iter__(self):
+        return zip(iter(self._mapping), self._mapping._data.tolist())
+
+
+class _VectorValues(ValuesView):
+    def __iter__(self):
+        return iter(self._mapping._data.tolist())
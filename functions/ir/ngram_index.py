@@ -0,0 +1,140 @@
+'''
+ngram_index.py : 단어의 일부(부분 문자열)로 단어를 찾는 음절 n-gram 색인(SyllableNgramIndex)을 정의 합니다.
+
+get_extended_lexicon()은 ngramUmjeol()의 음절 bigram을 lexicon에 섞어서 일반 단어처럼 색인할 뿐,
+"부동" 처럼 단어의 일부로 검색하려면 전체 lexicon을 훑어서(substring in term) 단어를 찾아야 합니다.
+SyllableNgramIndex는 음절 n-gram(기본 bigram) -> 그 n-gram을 포함한 단어 idx 목록을 CSR 형태로 저장하고,
+    1. 질의 문자열의 n-gram 별 단어 idx 목록을 짧은 것 부터 교집합 (binary search)
+    2. 교집합의 단어 중 질의 문자열을 실제로 포함한 단어만 남김 (n-gram 순서/중복 확인)
+    3. 남은 단어들의 posting을 합쳐서 문서 idx 목록을 만듭니다.
+질의 문자열이 n 음절 보다 짧으면 그 문자열을 포함한 n-gram들(음절 -> n-gram 목록으로 조회)의 단어 목록을 합칩니다.
+
+사용예)
+    ngram_index = SyllableNgramIndex(global_lexicon)
+    terms = ngram_index.terms("부동")                    # ["부동산", "부동산시장", ...]
+    doc_ids = ngram_index.documents("부동", global_posting)
+'''
+import numpy as np
+
+from functions.ir.lexicon import FrozenTermDictionary, TermDictionary
+
+
+def syllable_ngrams(term, n=2):
+    '''
+    단어의 음절 n-gram 목록을 반환 합니다. (중복 제거, ngramUmjeol()과 달리 구두점을 지우지 않음)
+    '''
+    return {term[i:i + n] for i in range(len(term) - n + 1)}
+
+
+class SyllableNgramIndex():
+    '''
+    음절 n-gram -> 단어 idx 색인 입니다.
+        grams        => {n-gram: n-gram idx}
+        offsets      => n-gram idx 별 단어 목록 시작 위치 (n-gram 수 + 1)
+        term_ids     => n-gram 별 단어 idx (오름차순)
+        terms_by_idx => 단어 idx 별 단어
+        short_terms  => n 음절 보다 짧은 단어의 idx
+        syllable_grams => {음절: 그 음절을 포함한 n-gram idx list}
+    '''
+
+    def __init__(self, global_lexicon, n=2):
+        self.n = n
+        self.grams = TermDictionary()
+        gram_ids, term_ids = list(), list()
+
+        if isinstance(global_lexicon, (TermDictionary, FrozenTermDictionary)):
+            self.terms_by_idx = list(global_lexicon)    # 단어 idx 순서로 반환
+        else:
+            self.terms_by_idx = [None] * (max(global_lexicon.values(), default=-1) + 1)
+            for term, term_idx in global_lexicon.items():
+                self.terms_by_idx[term_idx] = term
+
+        for term_idx, term in enumerate(self.terms_by_idx):
+            if term is None:
+                continue
+            for gram in syllable_ngrams(term, n):
+                gram_ids.append(self.grams.add(gram))
+                term_ids.append(term_idx)
+
+        gram_ids = np.array(gram_ids, dtype=np.int64)
+        term_ids = np.array(term_ids, dtype=np.int32)
+        order = np.lexsort((term_ids, gram_ids))
+
+        self.term_ids = term_ids[order]
+        self.offsets = np.zeros(len(self.grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(self.grams)), out=self.offsets[1:])
+
+        # 음절 -> 그 음절을 포함한 n-gram idx 목록 (n 음절 보다 짧은 질의에 사용)
+        self.syllable_grams = dict()
+        for gram_idx, gram in enumerate(self.grams):
+            for syllable in set(gram):
+                self.syllable_grams.setdefault(syllable, list()).append(gram_idx)
+
+        # n 음절 보다 짧은 단어 (짧은 질의에서 n-gram으로 찾을 수 없는 단어)
+        self.short_terms = np.array(sorted(term_idx for term_idx, term in enumerate(self.terms_by_idx)
+                                           if term is not None and len(term) < n), dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return self.term_ids.nbytes + self.offsets.nbytes + self.short_terms.nbytes
+
+    def _gram_terms(self, gram_idx):
+        return self.term_ids[self.offsets[gram_idx]:self.offsets[gram_idx + 1]]
+
+    def term_ids_of(self, substring):
+        '''
+        substring을 포함한 단어 idx array(오름차순)를 반환 합니다.
+        '''
+        if len(substring) == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        if len(substring) < self.n:
+            # 짧은 질의 : substring을 포함한 n-gram들의 단어 목록 + 짧은 단어 중 substring을 포함한 단어
+            gram_ids = set.intersection(*(set(self.syllable_grams.get(syllable, ())) for syllable in substring))
+            candidates = [self._gram_terms(gram_idx) for gram_idx in gram_ids if substring in self.grams.term(gram_idx)]
+            candidates.append(np.array([term_idx for term_idx in self.short_terms.tolist()
+                                        if substring in self.terms_by_idx[term_idx]], dtype=np.int32))
+            candidates = np.unique(np.concatenate(candidates))
+        else:
+            gram_ids = [self.grams.get(gram, None) for gram in syllable_ngrams(substring, self.n)]
+            if None in gram_ids:
+                return np.zeros(0, dtype=np.int32)
+
+            candidates = None
+            for gram_idx in sorted(gram_ids, key=lambda gram_idx: self.offsets[gram_idx + 1] - self.offsets[gram_idx]):
+                term_ids = self._gram_terms(gram_idx)
+                if candidates is None:
+                    candidates = term_ids
+                else:
+                    positions = np.minimum(np.searchsorted(term_ids, candidates), len(term_ids) - 1)
+                    candidates = candidates[term_ids[positions] == candidates]
+                if len(candidates) == 0:
+                    break
+
+            # n-gram을 모두 포함해도 순서가 다를 수 있으므로 (예: "가나"+"나다" in "나다가나") 실제 포함 여부를 확인
+            if len(substring) > self.n:
+                candidates = np.array([term_idx for term_idx in candidates
+                                       if substring in self.terms_by_idx[term_idx]], dtype=np.int32)
+
+        return np.asarray(candidates, dtype=np.int32)
+
+    def terms(self, substring):
+        '''
+        substring을 포함한 단어 list를 반환 합니다.
+        '''
+        return [self.terms_by_idx[term_idx] for term_idx in self.term_ids_of(substring)]
+
+    def documents(self, substring, global_posting):
+        '''
+        substring을 포함한 단어가 나온 문서 idx array(오름차순, 중복 없음)를 반환 합니다.
+        '''
+        postings = [global_posting.postings(term_idx)[0] for term_idx in self.term_ids_of(substring)]
+        if len(postings) == 0:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate(postings))
+
+    def query_weight(self, substring, global_lexicon_idf):
+        '''
+        substring을 포함한 단어들로 {단어: idf} query_weight를 만듭니다. (candidate_list_by_cosine() 등에 사용)
+        '''
+        return {term: global_lexicon_idf[term] for term in self.terms(substring) if term in global_lexicon_idf}
@@ -0,0 +1,124 @@
+'''
+parallel.py : collection을 여러 process에서 나누어 색인(multi-process indexing) 합니다.
+
+inverted_index_with_tf()는 전처리(clean_collection), 형태소 분석(get_extended_lexicon의 Kkma),
+posting 생성을 하나의 process에서 순서대로 처리 합니다.
+parallel_inverted_index()는
+    1. collection을 연속된 shard(문서 묶음)로 나누고
+    2. process pool의 worker가 shard 별로 전처리, 형태소 분석, 부분 색인(inverted_index_with_tf)을 만든 후
+    3. shard 순서대로 부분 색인을 병합 합니다.
+shard가 연속된 문서 묶음이고 shard 순서대로 병합하므로, 단어 idx(처음 나온 순서), 문서 idx, df가
+inverted_index_with_tf()로 한 번에 색인한 결과와 같습니다.
+
+사용예)
+    from functools import partial
+    global_lexicon, global_posting, global_document, dtm = parallel_inverted_index(
+        collection, workers=4, clean=True, analyzer=partial(get_extended_lexicon, nouns=False))
+'''
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import islice, repeat
+
+import numpy as np
+
+from functions.info_retrieval import clean_collection, inverted_index_with_tf
+from functions.ir.lexicon import TermDictionary
+from functions.ir.matrix import DocumentTermMatrix
+from functions.ir.posting import PostingStore
+
+
+def _iter_shards(collection, shard_size):
+    '''
+    collection을 shard_size 개씩 연속된 shard(list)로 나누어 반환 합니다. (generator도 가능)
+    '''
+    iterator = iter(collection)
+
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if len(shard) == 0:
+            return
+        yield shard
+
+
+def index_shard(shard, analyzer=None, clean=False):
+    '''
+    shard 1개의 부분 색인을 만듭니다. (worker process에서 실행)
+        clean    : True이면 clean_collection()으로 content를 전처리
+        analyzer : content(str) -> lexicon list 함수. None이면 content가 이미 lexicon list라고 가정
+    return: 단어 list(단어 idx 순서), PostingStore, 문서 이름 list, None (dtm은 만들지 않고, 병합한 posting으로 만듦)
+    '''
+    if clean:
+        shard = clean_collection(shard)
+    if analyzer is not None:
+        shard = [(document_name, analyzer(content)) for document_name, content in shard]
+
+    with redirect_stdout(io.StringIO()):
+        global_lexicon, global_posting, global_document, _ = inverted_index_with_tf(shard, build_dtm=False)
+
+    return list(global_lexicon), global_posting, global_document, None
+
+
+def merge_shards(shards):
+    '''
+    index_shard()의 결과들을 shard 순서대로 병합하여 하나의 색인을 만듭니다.
+        - 단어 idx : shard 순서대로 단어를 global_lexicon에 추가하여 처음 나온 순서를 유지
+        - 문서 idx : 앞선 shard들의 문서 수 만큼 더함
+    '''
+    global_lexicon = TermDictionary()
+    global_document = list()
+    term_ids, doc_ids, freqs, weights = list(), list(), list(), list()
+
+    for terms, posting, documents, _ in shards:
+        # shard의 단어 idx -> 전체 색인의 단어 idx
+        remap = np.fromiter((global_lexicon.add(term) for term in terms), dtype=np.int32, count=len(terms))
+
+        term_ids.append(remap[posting.term_ids()])
+        doc_ids.append(posting.doc_ids + len(global_document))
+        freqs.append(posting.freqs)
+        weights.append(posting.weights)
+        global_document.extend(documents)
+
+    if len(global_document) == 0:
+        global_posting = PostingStore(np.zeros(1), [], [], [])
+    else:
+        global_posting = PostingStore.from_postings(np.concatenate(term_ids), np.concatenate(doc_ids),
+                                                    np.concatenate(freqs), np.concatenate(weights),
+                                                    len(global_lexicon))
+
+    dtm = DocumentTermMatrix.from_posting(global_lexicon, global_posting, global_document).dtm()
+    return global_lexicon, global_posting, global_document, dtm
+
+
+def parallel_inverted_index(collection, workers=None, analyzer=None, clean=False, shard_size=None, mp_context=None):
+    '''
+    collection을 shard로 나누어 workers개의 process에서 색인한 후 병합 합니다.
+    반환값은 inverted_index_with_tf()와 같습니다. (global_lexicon, global_posting, global_document, dtm)
+
+        workers    : process 수 (None이면 CPU 수, 1이면 process pool 없이 현재 process에서 실행)
+        analyzer   : content(str) -> lexicon list 함수 (예: partial(get_extended_lexicon, nouns=False))
+                     worker process로 전달되므로 module 수준의 함수(또는 partial)여야 합니다.
+        clean      : True이면 worker에서 clean_collection()을 먼저 수행
+        shard_size : shard 1개의 문서 수 (None이면 worker 별로 약 4개의 shard가 되도록 나눔)
+        mp_context : multiprocessing context (Kkma(JVM)를 사용할 때는 get_context("spawn") 권장)
+    '''
+    workers = workers or os.cpu_count() or 1
+
+    if shard_size is None:
+        collection = list(collection)
+        shard_size = max(1, -(-len(collection) // (workers * 4)))
+
+    shards = _iter_shards(collection, shard_size)
+
+    if workers == 1:
+        results = [index_shard(shard, analyzer, clean) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            # map()은 입력 순서대로 결과를 반환하므로 병합 결과가 항상 같음
+            results = list(executor.map(index_shard, shards, repeat(analyzer), repeat(clean)))
+
+    index = merge_shards(results)
+    print("전체 {0}개 뉴스 기사 indexing 완료 (process: {1})".format(len(index[2]), workers))
+
+    return index
@@ -0,0 +1,272 @@
+'''
+positional.py : 단어의 문서 내 위치(position)를 저장하는 위치 색인(PositionalIndex)과 구문(phrase), 근접(proximity) 질의를 정의 합니다.
+
+inverted_index_with_tf()의 posting에는 max_tf로 정규화한 빈도만 있어서, "정확히 이어진 단어(구문)"나
+"N 단어 이내에 함께 나온 단어" 질의는 문서를 다시 읽어서 걸러내야 합니다.
+PositionalIndex는 (단어, 문서) posting 마다 단어가 나온 위치(어절 순번) 목록을 저장 합니다.
+    - 위치 목록은 앞 위치와의 차이(gap)를 variable-byte(varint)로 압축해서 이어 붙여 저장 (compress.py와 같은 형식)
+    - 질의에 필요한 posting의 위치 목록만 그때그때 풀어서 사용
+    - write_positional_index()로 저장한 파일은 load_positional_index()가 mmap으로 열기 때문에,
+      위치 data는 질의가 접근한 부분만 disk에서 읽힙니다.
+기존 색인(global_posting)과는 별도의 파일/객체이므로, 일반 단어 질의의 속도에는 영향이 없습니다.
+
+# 질의
+    phrase(["서울", "부동산"])              : "서울 부동산"이 순서대로 이어서 나온 문서
+    proximity(["서울", "아파트"], window=5) : 모든 단어가 5 어절 이내(처음 위치 ~ 마지막 위치의 차이)에 나온 문서
+    filter_candidates()                     : candidate_list_by_cosine()의 결과에서 구문/근접 조건을 만족하는 문서만 남김
+
+사용예)
+    positional_index = PositionalIndex.build(clean_collection(collection))
+    write_positional_index("naver_news/index/news.pos", positional_index)
+
+    positional_index = load_positional_index("naver_news/index/news.pos")
+    doc_ids = positional_index.phrase_query("서울 부동산")
+    candidate_list = filter_candidates(candidate_list, doc_ids, global_document)
+'''
+import numpy as np
+
+from functions.ir.compress import _varint_decode_small, varint_encode
+from functions.ir.index_file import DocumentTable, read_sections, write_sections
+from functions.ir.lexicon import FrozenTermDictionary, TermDictionary
+
+
+class PositionalIndex():
+    '''
+    단어 별 posting(문서 idx)과 posting 별 위치 목록을 CSR 형태로 저장 합니다.
+        lexicon     => {단어: 단어 idx}
+        documents   => 문서 idx 별 문서 이름 (build()에 전달한 collection 순서 = global_document 순서)
+        offsets     => 단어 idx 별 posting 시작 위치 (n_terms + 1)
+        doc_ids     => posting 별 문서 idx (단어 내에서 오름차순)
+        tfs         => posting 별 위치 수 (문서 내 단어 빈도)
+        pos_offsets => posting 별 위치 목록의 시작 byte (n_postings + 1)
+        pos_data    => 위치 gap의 varint bytes
+    '''
+
+    def __init__(self, lexicon, documents, offsets, doc_ids, tfs, pos_offsets, pos_data, tokenize=str.split):
+        self.lexicon = lexicon
+        self.documents = documents
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.pos_offsets = pos_offsets
+        self.pos_data = pos_data
+        self.tokenize = tokenize
+
+    @classmethod
+    def build(cls, collection, tokenize=str.split):
+        '''
+        [(document이름, content), ...]로 위치 색인을 만듭니다.
+        content가 문자열이면 tokenize(기본값: 공백 분리)로 어절을 나누고, list이면 그대로 위치 순서로 사용 합니다.
+        (clean_collection()의 결과를 사용하면 질의문과 같은 방식으로 어절이 나뉩니다.)
+        '''
+        lexicon = TermDictionary()
+        documents = list()
+        term_ids, doc_ids, positions = list(), list(), list()
+
+        for doc_idx, (document, content) in enumerate(collection):
+            tokens = tokenize(content) if isinstance(content, str) else content
+            documents.append(document)
+            term_ids.append(np.fromiter((lexicon.add(token) for token in tokens), dtype=np.int64, count=len(tokens)))
+            doc_ids.append(np.full(len(tokens), doc_idx, dtype=np.int64))
+            positions.append(np.arange(len(tokens), dtype=np.int64))
+
+        if len(documents) == 0 or sum(len(ids) for ids in term_ids) == 0:
+            return cls(lexicon, documents, np.zeros(len(lexicon) + 1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                       np.zeros(0, dtype=np.int32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint8), tokenize)
+
+        term_ids, doc_ids, positions = np.concatenate(term_ids), np.concatenate(doc_ids), np.concatenate(positions)
+
+        # (단어, 문서, 위치) 순서로 정렬 (문서와 위치는 이미 오름차순이므로 단어 idx로 stable sort)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, doc_ids, positions = term_ids[order], doc_ids[order], positions[order]
+
+        # (단어, 문서)가 바뀌는 위치가 posting의 시작
+        starts = np.flatnonzero(np.r_[True, (term_ids[1:] != term_ids[:-1]) | (doc_ids[1:] != doc_ids[:-1])])
+        gaps = positions.copy()
+        gaps[1:] -= positions[:-1]
+        gaps[starts] = positions[starts]    # posting의 첫 위치는 그대로 저장
+
+        pos_data, n_bytes = varint_encode(gaps)
+        pos_offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum(np.add.reduceat(n_bytes, starts), out=pos_offsets[1:])
+
+        offsets = np.zeros(len(lexicon) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids[starts], minlength=len(lexicon)), out=offsets[1:])
+
+        return cls(lexicon, documents, offsets, doc_ids[starts].astype(np.int32),
+                   np.diff(np.r_[starts, len(term_ids)]).astype(np.int32), pos_offsets, pos_data, tokenize)
+
+    @property
+    def n_terms(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.offsets, self.doc_ids, self.tfs, self.pos_offsets, self.pos_data))
+
+    def postings(self, term_idx):
+        '''
+        단어의 posting(문서 idx array)을 반환 합니다.
+        '''
+        return self.doc_ids[self.offsets[term_idx]:self.offsets[term_idx + 1]]
+
+    def _positions(self, posting_idx):
+        gaps = _varint_decode_small(self.pos_data[self.pos_offsets[posting_idx]:self.pos_offsets[posting_idx + 1]].tobytes())
+        position, positions = 0, list()
+
+        for gap in gaps:
+            position += gap
+            positions.append(position)
+
+        return positions
+
+    def positions(self, term, doc_idx):
+        '''
+        문서에서 단어가 나온 위치(어절 순번) list를 반환 합니다.
+        '''
+        term_idx = self.lexicon.get(term, None)
+        if term_idx is None:
+            return list()
+
+        start = self.offsets[term_idx]
+        doc_ids = self.postings(term_idx)
+        idx = np.searchsorted(doc_ids, doc_idx)
+
+        if idx == len(doc_ids) or doc_ids[idx] != doc_idx:
+            return list()
+        return self._positions(start + idx)
+
+    def _candidates(self, terms):
+        '''
+        모든 단어를 포함한 문서 idx array와, 단어 별 그 문서들의 posting idx array를 반환 합니다.
+        posting이 가장 짧은 단어 부터 교집합을 구하므로, 비용이 가장 짧은 posting에 비례 합니다.
+        '''
+        term_ids = [self.lexicon.get(term, None) for term in terms]
+        if len(terms) == 0 or None in term_ids:
+            return np.zeros(0, dtype=np.int32), list()
+
+        candidates = None
+        for term_idx in sorted(set(term_ids), key=lambda term_idx: self.offsets[term_idx + 1] - self.offsets[term_idx]):
+            doc_ids = self.postings(term_idx)
+            if candidates is None:
+                candidates = doc_ids
+            else:
+                # 짧은 candidates의 문서를 긴 posting에서 binary search로 찾음
+                positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+                candidates = candidates[doc_ids[positions] == candidates]
+            if len(candidates) == 0:
+                return candidates, list()
+
+        return candidates, [self.offsets[term_idx] + np.searchsorted(self.postings(term_idx), candidates)
+                            for term_idx in term_ids]
+
+    def phrase(self, terms):
+        '''
+        terms가 순서대로 이어서 나온 문서 idx array를 반환 합니다.
+        '''
+        candidates, posting_ids = self._candidates(terms)
+        matched = list()
+
+        for i, doc_idx in enumerate(candidates):
+            # i번째 단어의 위치 - i가 모든 단어에 공통으로 있으면 구문이 시작하는 위치
+            starts = set(self._positions(posting_ids[0][i]))
+
+            for offset in range(1, len(terms)):
+                starts.intersection_update(position - offset for position in self._positions(posting_ids[offset][i]))
+                if len(starts) == 0:
+                    break
+
+            if starts:
+                matched.append(doc_idx)
+
+        return np.array(matched, dtype=np.int32)
+
+    def proximity(self, terms, window):
+        '''
+        모든 단어가 window 어절 이내(처음 위치와 마지막 위치의 차이가 window 이하)에 나온 문서 idx array를 반환 합니다.
+        '''
+        terms = list(dict.fromkeys(terms))
+        candidates, posting_ids = self._candidates(terms)
+        matched = list()
+
+        for i, doc_idx in enumerate(candidates):
+            # (위치, 단어 순번)을 위치 순서로 정렬한 후, 모든 단어를 포함하는 가장 짧은 구간을 찾음
+            events = sorted((position, term_order) for term_order in range(len(terms))
+                            for position in self._positions(posting_ids[term_order][i]))
+            counts = [0] * len(terms)
+            covered = left = 0
+
+            for position, term_order in events:
+                counts[term_order] += 1
+                covered += counts[term_order] == 1
+
+                while covered == len(terms):
+                    if position - events[left][0] <= window:
+                        break
+                    counts[events[left][1]] -= 1
+                    covered -= counts[events[left][1]] == 0
+                    left += 1
+
+                if covered == len(terms):
+                    matched.append(doc_idx)
+                    break
+
+        return np.array(matched, dtype=np.int32)
+
+    def phrase_query(self, query):
+        '''
+        질의문을 build()와 같은 방식으로 어절로 나누어 phrase()를 실행 합니다.
+        '''
+        return self.phrase(self.tokenize(query))
+
+    def proximity_query(self, query, window):
+        return self.proximity(self.tokenize(query), window)
+
+
+def filter_candidates(candidate_list, doc_ids, global_document):
+    '''
+    candidate_list({"document": score})에서 doc_ids(문서 idx)에 포함된 문서만 남깁니다.
+    '''
+    documents = {global_document[doc_idx] for doc_idx in doc_ids}
+    return {document: score for document, score in candidate_list.items() if document in documents}
+
+
+def write_positional_index(file_path, positional_index):
+    '''
+    위치 색인을 index_file.py와 같은 형식의 binary 파일로 저장 합니다.
+    '''
+    lexicon = positional_index.lexicon
+    if not isinstance(lexicon, FrozenTermDictionary):
+        lexicon = lexicon.freeze()
+    documents = positional_index.documents
+    if not isinstance(documents, DocumentTable):
+        documents = DocumentTable.from_names(documents)
+
+    write_sections(file_path, [
+        ("lexicon.blob", lexicon.blob),
+        ("lexicon.offsets", lexicon.offsets),
+        ("lexicon.ids", lexicon.ids),
+        ("lexicon.ranks", lexicon.ranks),
+        ("document.blob", documents.blob),
+        ("document.offsets", documents.offsets),
+        ("pos.offsets", positional_index.offsets),
+        ("pos.doc_ids", positional_index.doc_ids),
+        ("pos.tfs", positional_index.tfs),
+        ("pos.boffsets", positional_index.pos_offsets),
+        ("pos.data", positional_index.pos_data),
+    ])
+    print("{0} is saved.".format(file_path))
+
+
+def load_positional_index(file_path, tokenize=str.split):
+    '''
+    write_positional_index()로 저장한 위치 색인을 mmap으로 엽니다. (위치 data는 질의 시 필요한 부분만 읽힘)
+    '''
+    sections = read_sections(file_path)
+    lexicon = FrozenTermDictionary(sections["lexicon.blob"], sections["lexicon.offsets"],
+                                   sections["lexicon.ids"], sections["lexicon.ranks"])
+    documents = DocumentTable(sections["document.blob"], sections["document.offsets"])
+
+    return PositionalIndex(lexicon, documents, sections["pos.offsets"], sections["pos.doc_ids"],
+                           sections["pos.tfs"], sections["pos.boffsets"], sections["pos.data"],
+                           tokenize)
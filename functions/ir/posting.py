@@ -0,0 +1,138 @@
+'''
+posting.py : 색인(Inverted Index)의 posting 정보를 저장하는 Columnar Posting Store를 정의 합니다.
+
+기존 global_posting은 posting 1건을 [단어 idx, 문서 idx, 빈도, 다음주소] list로 저장하고
+다음주소(linked list)를 따라가며 조회했기 때문에, posting 1건당 약 100 bytes의 Python 객체
+overhead가 발생하고 메모리 접근도 연속적이지 않았습니다.
+
+PostingStore는 CSR(Compressed Sparse Row) 형태로 term 별 posting을 연속된 numpy array에 저장 합니다.
+    offsets => term idx 별 posting 시작 위치 (길이: term 수 + 1)
+        -> term_idx의 posting 범위는 offsets[term_idx] ~ offsets[term_idx + 1]
+    doc_ids => 문서 idx (term 별로 오름차순 정렬)
+    freqs   => 문서 내 term의 빈도 (raw tf)
+    weights => 문서 내 term의 빈도를 max_tf로 정규화 한 값 (기존 posting_data[2])
+    stats   => 색인 시 함께 계산한 단어 별 통계 (TermStatistics: df, cf, max_weight, block_max, functions/ir/term_stats.py 참고)
+'''
+from array import array
+
+import numpy as np
+
+from functions.ir.term_stats import TermStatistics
+
+
+class PostingStore():
+    '''
+    term idx 별 posting을 CSR 형태의 numpy array로 저장 합니다.
+
+    사용예)
+        doc_ids, weights = global_posting.postings(global_lexicon["아파트"])
+    '''
+
+    def __init__(self, offsets, doc_ids, freqs, weights, stats=None):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.freqs = np.asarray(freqs, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.stats = stats
+
+    def __len__(self):
+        '''
+        전체 posting 수를 반환 합니다. (기존 len(global_posting)과 동일)
+        '''
+        return len(self.doc_ids)
+
+    @property
+    def n_terms(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        '''
+        posting 저장에 사용된 numpy array의 전체 bytes 수를 반환 합니다.
+        '''
+        return self.offsets.nbytes + self.doc_ids.nbytes + self.freqs.nbytes + self.weights.nbytes
+
+    @classmethod
+    def from_postings(cls, term_ids, doc_ids, freqs, weights, n_terms):
+        '''
+        posting 별 (term idx, 문서 idx, 빈도, weight) array를 term idx 기준으로 정렬하여 PostingStore로 변환 합니다.
+        안정 정렬(stable sort)이므로 입력이 문서 idx 순서이면 term 별 doc_ids도 오름차순이 됩니다.
+        단어 별 통계(stats)도 함께 계산 합니다.
+        '''
+        term_ids = np.asarray(term_ids)
+        order = np.argsort(term_ids, kind="stable")
+
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=n_terms), out=offsets[1:])
+
+        global_posting = cls(offsets, np.asarray(doc_ids)[order], np.asarray(freqs)[order], np.asarray(weights)[order])
+        global_posting.stats = TermStatistics.from_store(global_posting)
+        return global_posting
+
+    def df(self):
+        '''
+        term idx 별 document frequency를 numpy array로 반환 합니다.
+        '''
+        return np.diff(self.offsets)
+
+    def term_ids(self):
+        '''
+        posting 별 term idx를 numpy array로 반환 합니다. (doc_ids, weights와 같은 길이)
+        '''
+        return np.repeat(np.arange(self.n_terms, dtype=np.int32), self.df())
+
+    def postings(self, term_idx):
+        '''
+        term_idx의 posting을 (doc_ids, weights) view로 반환 합니다. (복사 없음)
+        '''
+        start, end = self.offsets[term_idx], self.offsets[term_idx + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def freq_postings(self, term_idx):
+        '''
+        term_idx의 posting을 (doc_ids, freqs) view로 반환 합니다. (복사 없음)
+        '''
+        start, end = self.offsets[term_idx], self.offsets[term_idx + 1]
+        return self.doc_ids[start:end], self.freqs[start:end]
+
+
+class PostingBuilder():
+    '''
+    indexing 중에 생성되는 posting을 typed array(array.array)에 순서대로 추가한 후,
+    build()에서 term idx 기준으로 정렬하여 PostingStore(CSR)로 변환 합니다.
+
+    문서는 doc_idx 순서대로 추가되므로, 안정 정렬(stable sort) 후에도 term 별 doc_ids는 오름차순이 됩니다.
+    '''
+
+    def __init__(self):
+        self._term_ids = array("i")
+        self._doc_ids = array("i")
+        self._freqs = array("i")
+        self._weights = array("d")
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def add_document(self, doc_idx, term_ids, freqs, weights):
+        '''
+        문서 1건의 posting을 추가 합니다.
+        term_ids, freqs, weights는 같은 길이의 sequence 입니다.
+        '''
+        self._term_ids.extend(term_ids)
+        self._doc_ids.extend([doc_idx] * len(term_ids))
+        self._freqs.extend(freqs)
+        self._weights.extend(weights)
+
+    def arrays(self):
+        '''
+        추가된 순서의 posting 별 (term idx, 문서 idx, 빈도, weight) numpy array를 반환 합니다. (복사 없음)
+        '''
+        return (np.frombuffer(self._term_ids, dtype=np.int32), np.frombuffer(self._doc_ids, dtype=np.int32),
+                np.frombuffer(self._freqs, dtype=np.int32), np.frombuffer(self._weights, dtype=np.float64))
+
+    def build(self, n_terms):
+        '''
+        추가된 posting을 PostingStore로 변환 합니다.
+        n_terms: 전체 term 수 (global_lexicon의 크기)
+        '''
+        return PostingStore.from_postings(*self.arrays(), n_terms)
@@ -0,0 +1,181 @@
+'''
+ranking.py : 문서 순위를 정하는 ranking model(TF-IDF, BM25, BM25+)을 정의 합니다.
+
+기존 가중치는 tdm2twm(), evaluate_idf()에 max_tf x smoothig_idf로 고정되어 있습니다.
+RankingModel은 fit()에서 색인(global_posting)으로 부터 posting 별 impact(문서 내 term의 점수 기여도)를 미리 계산하여
+PostingStore(weights = impact)로 저장하고, ScoringEngine으로 채점 합니다.
+    -> 질의 시에는 posting 1건당 query weight x impact의 곱셈, 덧셈 한 번으로 점수를 계산
+
+# BM25
+    idf(t)    = log(1 + (N - df + 0.5) / (df + 0.5))
+    impact    = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+    score     = sum(query tf * impact)
+    (BM25+ 는 impact = idf(t) * (tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)) + delta))
+    문서 길이(dl), 평균 문서 길이(avgdl), term 별 idf는 fit()에서 한 번만 계산 합니다.
+
+사용예)
+    model = BM25(k1=1.2, b=0.75).fit(global_lexicon, global_posting, global_document)
+    result_list = model.search(query_index(query), k=3)
+
+    model = BM25().fit(*incremental_index.as_tuple()[:3])     # IncrementalIndex (functions/ir/segment.py)
+'''
+import numpy as np
+
+from functions.info_retrieval import eval_query_weight, evaluate_idf
+from functions.ir.posting import PostingStore
+from functions.ir.scoring import ScoringEngine
+
+
+class RankingModel():
+    '''
+    ranking model의 기본 클래스 입니다.
+    하위 클래스는 impacts()에서 posting 별 impact를, query_weight()에서 query term 별 weight를 계산 합니다.
+
+    engine => 색인의 impact로 만든 ScoringEngine (fit() 이후 사용 가능)
+    metric => ScoringEngine의 채점 방식 ("dot", "cosine")
+    '''
+    metric = "dot"
+
+    def __init__(self):
+        self.engine = None
+
+    @property
+    def name(self):
+        '''
+        model 이름과 parameter (질의 결과 cache의 key 등에 사용)
+        '''
+        return type(self).__name__
+
+    def __repr__(self):
+        return self.name
+
+    def fit(self, global_lexicon, global_posting, global_document):
+        '''
+        색인으로 부터 posting 별 impact를 계산하여 ScoringEngine을 만듭니다.
+        global_posting은 PostingStore, CompressedPostingStore, IncrementalIndex의 posting(as_tuple()) 모두 사용 가능하고,
+        IncrementalIndex는 fit() 시점의 삭제되지 않은 문서로 채점 합니다. (문서를 추가/삭제한 후에는 다시 fit() 필요)
+        '''
+        if hasattr(global_posting, "decompress"):
+            global_posting = global_posting.decompress()
+        elif hasattr(global_posting, "merged"):
+            global_posting, global_document = global_posting.merged()
+
+        impacts, global_document_weight = self.impacts(global_lexicon, global_posting, global_document)
+        impact_posting = PostingStore(global_posting.offsets, global_posting.doc_ids, global_posting.freqs, impacts)
+        self.engine = ScoringEngine.from_posting(global_lexicon, impact_posting, global_document, global_document_weight)
+
+        return self
+
+    def impacts(self, global_lexicon, global_posting, global_document):
+        '''
+        posting 별 impact array와 cosine 채점 시 분모로 사용할 {문서: document weight}(없으면 None)를 반환 합니다.
+        '''
+        raise NotImplementedError
+
+    def query_weight(self, query_repr):
+        '''
+        query_index()의 결과({"token": frequency})를 {단어: weight}로 변환 합니다.
+        '''
+        raise NotImplementedError
+
+    def search(self, query_repr, k=3):
+        '''
+        상위 k개 문서를 [(document, score), ...] 형태로 반환 합니다.
+        '''
+        return self.engine.search(self.query_weight(query_repr), k, self.metric)
+
+    def search_many(self, query_reprs, k=3):
+        '''
+        여러 query의 상위 k개 문서를 query 순서대로 반환 합니다.
+        '''
+        return self.engine.search_many([self.query_weight(query_repr) for query_repr in query_reprs], k, self.metric)
+
+
+class TfIdf(RankingModel):
+    '''
+    기존 가중치(max_tf x smoothig_idf)의 Cosine similarity 입니다. (candidate_list_by_cosine()과 같은 score)
+    '''
+    metric = "cosine"
+
+    def impacts(self, global_lexicon, global_posting, global_document):
+        self.global_lexicon_idf, global_document_weight = evaluate_idf(global_lexicon, global_posting, global_document)
+        return global_posting.weights, global_document_weight
+
+    def query_weight(self, query_repr):
+        if len(query_repr) == 0:
+            return dict()
+        return eval_query_weight(query_repr, self.global_lexicon_idf)
+
+
+class BM25(RankingModel):
+    '''
+    Okapi BM25 입니다.
+        k1 : tf 포화(saturation) 정도 (클수록 tf가 score에 오래 기여)
+        b  : 문서 길이 정규화 정도 (0이면 정규화 없음, 1이면 문서 길이에 비례하여 정규화)
+    '''
+
+    def __init__(self, k1=1.2, b=0.75):
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+
+    @property
+    def name(self):
+        return "{0}(k1={1}, b={2})".format(type(self).__name__, self.k1, self.b)
+
+    def idf(self, df, document_count):
+        '''
+        BM25 idf (항상 0 이상이 되도록 1을 더한 형태)
+        '''
+        return np.log(1 + (document_count - df + 0.5) / (df + 0.5))
+
+    def term_frequency(self, freqs, length_norm):
+        '''
+        tf 포화와 문서 길이 정규화를 적용한 tf
+        '''
+        return freqs * (self.k1 + 1) / (freqs + self.k1 * length_norm)
+
+    def impacts(self, global_lexicon, global_posting, global_document):
+        document_count = len(global_document)
+        df = global_posting.df()
+        freqs = global_posting.freqs.astype(np.float64)
+
+        # 문서 길이(dl) = 문서 내 term 빈도의 합, avgdl = 평균 문서 길이
+        self.document_length = np.bincount(global_posting.doc_ids, weights=freqs, minlength=document_count)
+        self.average_length = self.document_length.mean() if document_count else 0.0
+        self.term_idf = self.idf(df, document_count)
+
+        length_norm = 1 - self.b + self.b * self.document_length / (self.average_length or 1.0)
+        impacts = np.repeat(self.term_idf, df) * self.term_frequency(freqs, length_norm[global_posting.doc_ids])
+
+        return impacts, None
+
+    def query_weight(self, query_repr):
+        '''
+        BM25의 query weight는 query 내 term 빈도 입니다.
+        '''
+        return {token: float(freq) for token, freq in query_repr.items()}
+
+
+class BM25Plus(BM25):
+    '''
+    BM25+ 입니다. 긴 문서의 tf 기여가 0에 가까워지지 않도록 delta를 더합니다.
+    '''
+
+    def __init__(self, k1=1.2, b=0.75, delta=1.0):
+        super().__init__(k1, b)
+        self.delta = delta
+
+    @property
+    def name(self):
+        return "{0}(k1={1}, b={2}, delta={3})".format(type(self).__name__, self.k1, self.b, self.delta)
+
+    def term_frequency(self, freqs, length_norm):
+        return super().term_frequency(freqs, length_norm) + self.delta
+
+
+ranking_models = {
+    "tfidf": TfIdf,
+    "bm25": BM25,
+    "bm25+": BM25Plus,
+}
@@ -0,0 +1,313 @@
+'''
+results.py : 검색 결과 화면(순위, 문서 이름, score, metadata, snippet)을 만드는 DocumentStore를 정의 합니다.
+
+result_print()는 결과 1건 마다 global_document.index(document)로 문서 목록 전체를 훑어서 문서 idx를 찾고,
+collection의 원문 전체를 출력 합니다.
+DocumentStore는 collection을 한 번 읽어서
+    ids          => {문서 이름: 문서 idx} (O(1) 조회)
+    texts        => 문서 idx 별 공백을 정리한 content (어절 사이 공백 1개, 이미 정리된 content는 복사 없이 참조)
+    metadata     => 문서 idx 별 metadata (build(metadata=함수)로 만든 경우)
+    token_indptr => 문서 idx 별 어절 offset의 시작 위치 (CSR, 문서 수 + 1)
+    token_starts, token_ends => 어절(공백 분리, PositionalIndex의 위치와 같은 순번)의 content 내 문자 offset
+를 저장하고, 질의 단어가 나온 곳 주변의 길이가 제한된(max_chars) 강조(highlight) snippet을 만듭니다.
+    1. 질의 단어의 위치는 PositionalIndex가 있으면 저장된 위치(어절 순번) -> 어절 offset으로 바로 찾고,
+       없으면 content에서 어절 단위 검색(어절의 처음에서 시작하고 뒤에 조사만 붙은 경우, 단어 별 최대 max_matches개)으로 찾습니다.
+       (Kkma 형태소 분석 없음)
+    2. max_chars 이내에서 질의 단어를 가장 많이(단어 종류 수, 나온 횟수 순) 포함한 구간을 고르고,
+    3. 구간의 경계를 저장된 어절 경계에 맞춘 후 질의 단어를 강조 합니다.
+snippet 1건은 문서 1개에서 문자열 검색 몇 번과 어절 경계 binary search 2번으로 만들어지므로,
+결과 화면을 만드는 비용은 문서 수와 무관 합니다. (global_document.index()처럼 문서 수에 비례해서 늘어나지 않음)
+
+사용예)
+    store = DocumentStore.build(clean_collection(collection))
+    result_list = cosine_sort(candidate_list)
+    for result in store.results(result_list, query_repr.keys(), count=3):
+        print(result["rank"], result["document"], result["score"], result["snippet"])
+
+    result_print(query, result_list, global_document, store, terms=query_repr.keys())
+'''
+import re
+
+import numpy as np
+
+
+def normalize_text(text):
+    '''
+    줄바꿈 등 연속된 공백을 공백 1개로 바꿉니다. (어절은 str.split()과 같음)
+    '''
+    return " ".join(text.split())
+
+
+def _token_offsets(text):
+    '''
+    normalize_text()로 정리한 content의 어절 별 (시작 offset, 끝 offset) array를 반환 합니다.
+    어절 사이 공백이 1개이므로 어절 길이의 누적 합으로 계산 합니다.
+    '''
+    lengths = np.fromiter(map(len, text.split()), dtype=np.int32)
+    token_ends = np.cumsum(lengths + 1, dtype=np.int32) - 1
+    return token_ends - lengths, token_ends
+
+
+# 어절에서 질의 단어(형태소) 뒤에 붙어도 같은 단어로 보는 조사, 복수 접미사(들)와 서술격 조사
+_PARTICLES = ("이", "가", "은", "는", "을", "를", "의", "에", "에서", "에게", "께서", "한테", "으로", "로", "와", "과",
+              "도", "만", "까지", "부터", "보다", "처럼", "마다", "이나", "나", "이다", "이며", "이고", "인", "으로서",
+              "로서", "에는", "에도", "에서는", "으로는", "로는", "과의", "와의", "에서의", "으로의", "로의", "에의")
+_SUFFIX = "(?=(?:들)?(?:" + "|".join(sorted(_PARTICLES, key=len, reverse=True)) + ")?(?!\\S))"
+
+
+def _find_spans(text, terms, max_matches=32):
+    '''
+    content에서 질의 단어가 나온 (시작 offset, 끝 offset, 단어 순번) list를 찾습니다. (단어 별 최대 max_matches개)
+    text는 normalize_text()로 정리된 content이고, 단어가 어절의 처음에서 시작하고 어절의 끝까지 남은 글자가 없거나
+    조사(_PARTICLES)인 경우만 찾습니다. 강조 구간은 질의 단어 부분 입니다.
+        "주택"은 "주택을", "주택들의"에서 찾고, "주택시장", "상가주택" 안에서는 찾지 않음
+        ("주택가"처럼 나머지가 조사와 같은 글자이면 구분할 수 없어서 찾음)
+    '''
+    spans = list()
+
+    for term_no, term in enumerate(terms):
+        pattern = re.compile(r"(?<!\S)" + re.escape(normalize_text(term)) + _SUFFIX)
+        for n_matches, match in enumerate(pattern.finditer(text)):
+            if n_matches == max_matches:
+                break
+            spans.append((match.start(), match.end(), term_no))
+
+    return spans
+
+
+def _best_window(spans, max_chars):
+    '''
+    (시작 위치로 정렬된) spans에서 max_chars 이내에 단어 종류가 가장 많고, 같으면 더 많이 나온 구간 [left, right]를 찾습니다.
+    '''
+    counts = dict()
+    best, best_key = (0, 0), None
+    left = 0
+
+    for right, (_, end, term_no) in enumerate(spans):
+        counts[term_no] = counts.get(term_no, 0) + 1
+        while left < right and end - spans[left][0] > max_chars:
+            counts[spans[left][2]] -= 1
+            if counts[spans[left][2]] == 0:
+                del counts[spans[left][2]]
+            left += 1
+
+        key = (len(counts), right - left + 1)
+        if best_key is None or key > best_key:
+            best, best_key = (left, right), key
+
+    return best
+
+
+def make_snippet(text, terms, max_chars=160, highlight=("[", "]"), ellipsis="...",
+                 token_starts=None, token_ends=None, spans=None, max_matches=32):
+    '''
+    content에서 질의 단어(terms) 주변 max_chars 글자 이내의 snippet을 만들고, 질의 단어를 highlight로 감쌉니다.
+    token_starts, token_ends : 저장된 어절 offset (text는 normalize_text()로 정리된 content,
+                               None이면 text를 정리한 후 계산)
+    spans : 미리 찾은 (시작 offset, 끝 offset, 단어 순번) list (None이면 content에서 어절 단위 검색)
+    질의 단어가 없으면 content의 앞부분을 반환 합니다.
+    '''
+    if token_starts is None or token_ends is None:
+        text = normalize_text(text)
+        token_starts, token_ends = _token_offsets(text)
+    if spans is None:
+        spans = _find_spans(text, [term for term in terms if term], max_matches)
+    spans = sorted(spans)
+
+    if spans:
+        left, right = _best_window(spans, max_chars)
+        window = spans[left:right + 1]
+        first, last = window[0][0], max(end for _, end, _ in window)
+    else:
+        window, first, last = list(), 0, 0
+
+    # 질의 단어 구간을 가운데에 두고 max_chars 만큼 앞뒤로 넓힌 후, 구간을 줄이는 방향으로만 어절 경계에 맞춤
+    slack = max(max_chars - (last - first), 0)
+    start = max(0, first - slack // 2)
+    end = min(len(text), max(last, start + max_chars))
+    start = max(0, min(start, end - max_chars, first))
+
+    i = token_starts.searchsorted(start)
+    if i < len(token_starts) and token_starts[i] <= first:
+        start = int(token_starts[i])
+    j = token_ends.searchsorted(end, side="right") - 1
+    if j >= 0 and token_ends[j] >= last:
+        end = int(token_ends[j])
+
+    pieces = [ellipsis] if start > 0 else list()
+    cursor = start
+    for span_start, span_end, _ in window:
+        span_start, span_end = max(span_start, cursor), min(span_end, end)
+        if span_start >= span_end:
+            continue
+        pieces.append(text[cursor:span_start])
+        pieces.append(highlight[0] + text[span_start:span_end] + highlight[1])
+        cursor = span_end
+    pieces.append(text[cursor:end])
+    if end < len(text):
+        pieces.append(ellipsis)
+
+    return "".join(pieces).strip()
+
+
+def _unique_terms(terms):
+    '''
+    질의 단어 목록에서 빈 문자열과 중복을 제거 합니다. (순서 유지)
+    '''
+    return [term for term in dict.fromkeys(terms) if term]
+
+
+def lookup_ids(global_document, documents, ids=None):
+    '''
+    documents(문서 이름 목록)의 {문서 이름: 문서 idx}를 반환 합니다.
+    ids : {문서 이름: 문서 idx} (예: IncrementalIndex.doc_ids, None이면 global_document.ids)
+    global_document가 DocumentTable, DocumentStore이거나 ids가 있으면 O(1)로 조회하고,
+    list이면 documents를 모두 찾을 때까지만 훑습니다. (상위 count개 문서의 idx만 만듦)
+    '''
+    if ids is None:
+        ids = getattr(global_document, "ids", None)
+    if ids is not None:
+        return {document: ids[document] for document in documents}
+
+    wanted, found = set(documents), dict()
+    for doc_idx, document in enumerate(global_document):
+        if document in wanted:
+            found[document] = doc_idx
+            if len(found) == len(wanted):
+                break
+    return found
+
+
+class DocumentStore():
+    '''
+    문서 idx, 문서 이름으로 content, metadata를 O(1)에 조회하고, 저장된 어절 offset으로 snippet을 만듭니다.
+    build()에 전달한 collection 순서가 문서 idx 이므로, 색인(inverted_index_with_tf, PositionalIndex.build)과
+    같은 collection으로 만들면 global_document, PositionalIndex의 문서 idx와 같습니다.
+    '''
+
+    def __init__(self, names, texts, token_indptr, token_starts, token_ends, metadata=None):
+        self.names = names
+        self.texts = texts
+        self.token_indptr = np.asarray(token_indptr, dtype=np.int64)
+        self.token_starts = np.asarray(token_starts, dtype=np.int32)
+        self.token_ends = np.asarray(token_ends, dtype=np.int32)
+        self.metadata = metadata
+        self.ids = {name: doc_idx for doc_idx, name in enumerate(names)}
+
+    @classmethod
+    def build(cls, collection, metadata=None):
+        '''
+        [(document이름, content), ...]로 DocumentStore를 만듭니다. (clean_collection()의 결과 또는 원문)
+        metadata : metadata(document이름, content) -> 문서의 metadata (예: 제목, url, section)
+        '''
+        names, texts, records = list(), list(), list()
+        counts, starts, ends = list(), list(), list()
+
+        for name, content in collection:
+            text = normalize_text(content)
+            names.append(name)
+            texts.append(content if text == content else text)
+            token_starts, token_ends = _token_offsets(text)
+            counts.append(len(token_starts))
+            starts.append(token_starts)
+            ends.append(token_ends)
+            if metadata is not None:
+                records.append(metadata(name, content))
+
+        token_indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=token_indptr[1:])
+        empty = np.zeros(0, dtype=np.int32)
+
+        return cls(names, texts, token_indptr, np.concatenate(starts) if starts else empty,
+                   np.concatenate(ends) if ends else empty, records if metadata is not None else None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, doc_idx):
+        '''
+        문서 idx의 (document이름, 공백을 정리한 content)를 반환 합니다. (기존 collection[문서 idx]와 같은 형태)
+        '''
+        return self.names[doc_idx], self.texts[doc_idx]
+
+    @property
+    def nbytes(self):
+        '''
+        어절 offset array의 bytes 수 입니다. (content 문자열 제외)
+        '''
+        return self.token_indptr.nbytes + self.token_starts.nbytes + self.token_ends.nbytes
+
+    def doc_idx(self, document):
+        '''
+        문서 이름 또는 문서 idx로 문서 idx를 반환 합니다.
+        '''
+        if isinstance(document, (int, np.integer)):
+            return int(document)
+        return self.ids[document]
+
+    def tokens(self, doc_idx):
+        '''
+        문서의 어절 별 (시작 offset array, 끝 offset array)를 반환 합니다.
+        '''
+        start, end = self.token_indptr[doc_idx], self.token_indptr[doc_idx + 1]
+        return self.token_starts[start:end], self.token_ends[start:end]
+
+    def spans(self, doc_idx, terms, positional_index=None, max_matches=32):
+        '''
+        문서에서 질의 단어가 나온 (시작 offset, 끝 offset, 단어 순번) list를 반환 합니다.
+        positional_index가 있으면 저장된 위치(어절 순번)로 찾고, 위치가 없는 단어만 content에서 어절 단위로 검색 합니다.
+        '''
+        if positional_index is None:
+            return _find_spans(self.texts[doc_idx], terms, max_matches)
+
+        token_starts, token_ends = self.tokens(doc_idx)
+        spans, missing = list(), list()
+
+        for term_no, term in enumerate(terms):
+            positions = positional_index.positions(term, doc_idx)[:max_matches]
+            if len(positions) == 0:
+                missing.append((term_no, term))
+            spans += [(int(token_starts[position]), int(token_ends[position]), term_no) for position in positions]
+
+        if missing:
+            found = _find_spans(self.texts[doc_idx], [term for _, term in missing], max_matches)
+            spans += [(start, end, missing[term_no][0]) for start, end, term_no in found]
+
+        return spans
+
+    def snippet(self, document, terms, max_chars=160, highlight=("[", "]"), ellipsis="...",
+                positional_index=None, max_matches=32):
+        '''
+        문서(이름 또는 문서 idx)에서 질의 단어(terms) 주변 max_chars 글자 이내의 강조 snippet을 반환 합니다.
+        '''
+        return self._snippet(self.doc_idx(document), _unique_terms(terms), max_chars, highlight, ellipsis,
+                             positional_index, max_matches)
+
+    def _snippet(self, doc_idx, terms, max_chars=160, highlight=("[", "]"), ellipsis="...",
+                 positional_index=None, max_matches=32):
+        start, end = self.token_indptr[doc_idx], self.token_indptr[doc_idx + 1]
+        return make_snippet(self.texts[doc_idx], terms, max_chars, highlight, ellipsis,
+                            self.token_starts[start:end], self.token_ends[start:end],
+                            self.spans(doc_idx, terms, positional_index, max_matches))
+
+    def results(self, result_list, terms=(), count=3, **snippet_options):
+        '''
+        [(document, score), ...] 정렬 결과의 상위 count개를
+        [{"rank", "document", "doc_idx", "score", "metadata", "snippet"}, ...] 형태로 반환 합니다.
+        snippet_options : snippet()의 max_chars, highlight, ellipsis, positional_index, max_matches
+        '''
+        terms = _unique_terms(terms)
+        page = list()
+
+        for rank, (document, score) in enumerate(result_list[:count], 1):
+            doc_idx = self.doc_idx(document)
+            page.append({
+                "rank": rank,
+                "document": self.names[doc_idx],
+                "doc_idx": doc_idx,
+                "score": score,
+                "metadata": self.metadata[doc_idx] if self.metadata is not None else None,
+                "snippet": self._snippet(doc_idx, terms, **snippet_options),
+            })
+
+        return page
@@ -0,0 +1,350 @@
+'''
+scoring.py : TWM(Term-Weight Matrix)을 SciPy CSR 행렬로 변환하여, query를 sparse 행렬 곱으로 채점 합니다.
+
+tdm2twm()의 TWM은 dictionary 내에 dictionary를 포함하고 있는 구조이고,
+candidate_list_by_cosine(), candidate_list_by_euclidian()은 Python loop로 문서별 score를 누적 합니다.
+ScoringEngine은 TWM(또는 global_posting)과 document weight를 한 번 행렬로 변환(compile)한 후
+    query vector(1 x 단어 수) @ matrix(단어 수 x 문서 수)
+의 sparse 행렬 곱으로 query term의 행(posting)만 조회하여 문서별 score를 계산 합니다.
+search_many()는 여러 query를 한 번에 분석하여 query 행렬(query 수 x 단어 수)을 만들고,
+batch 단위의 sparse 행렬 곱 한 번으로 채점하여 query 별 상위 k개를 반환 합니다.
+
+    dot       : q · d
+    cosine    : q · d / document weight  (candidate_list_by_cosine()과 같은 정의)
+    euclidean : ||q||² + ||d||² - 2 q · d
+        -> cosine, dot과 같은 candidate(query term을 포함한 문서)의 q · d와 미리 계산한 ||d||²로 계산하고,
+           query term을 포함하지 않은 문서는 ||d||²가 작은 순서(norm_order)로 k개만 비교
+        -> candidate_list_by_euclidian()은 문서에 없는 query term의 (q - 0) ** 2를 더하지 않지만,
+           ScoringEngine은 query vector와 문서 vector 사이의 실제 euclidean distance(의 제곱)를 계산 합니다.
+
+사용예)
+    engine = ScoringEngine.from_posting(global_lexicon, global_posting, global_document, global_document_weight)
+    query_weight = eval_query_weight(query_index(query), global_lexicon_idf)
+    result_list = engine.search(query_weight, k=3, metric="cosine")
+    result_lists = engine.search_many(["서울시 아파트 전세값", "미세먼지 대책"], k=3, global_lexicon_idf=global_lexicon_idf)
+'''
+import numpy as np
+from scipy import sparse
+
+from functions.info_retrieval import eval_query_weight, query_index
+from functions.ir.lexicon import TermDictionary
+from functions.ir.matrix import MatrixView
+
+METRICS = ("cosine", "dot", "euclidean")
+# search_many()에서 한 번의 sparse 행렬 곱으로 채점하는 query term들의 posting 수 합
+BATCH_POSTINGS = 2 ** 19
+
+
+class ScoringEngine():
+    '''
+    matrix        => scipy.sparse CSR 행렬 (단어 수 x 문서 수), 행은 단어 idx, 열은 문서 idx
+    vocabulary    => {단어: 단어 idx} (global_lexicon)
+    documents     => 문서 idx 별 문서 이름 (global_document)
+    norms         => 문서 idx 별 document weight (cosine의 분모, evaluate_idf()의 document weight)
+    squared_norms => 문서 idx 별 ||d||² (matrix 열 별 weight ** 2의 합)
+    '''
+
+    def __init__(self, matrix, vocabulary, documents, norms=None):
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.vocabulary = vocabulary
+        self.documents = documents
+
+        n_docs = self.matrix.shape[1]
+        self.squared_norms = np.bincount(self.matrix.indices, weights=self.matrix.data ** 2, minlength=n_docs)
+        self.norms = self.squared_norms if norms is None else np.asarray(norms, dtype=np.float64)
+
+    @classmethod
+    def from_twm(cls, twm, global_document):
+        '''
+        tdm2twm()의 TWM({단어: {문서: weight}})으로 부터 ScoringEngine을 만듭니다.
+        document weight는 tdm2twm()이 반환하는 DVL(weight ** 2)의 문서별 합과 같습니다.
+        TWM이 Mapping view(functions/ir/matrix.py)이면 단어 기준 array를 복사 없이 행렬로 사용 합니다.
+        '''
+        if isinstance(twm, MatrixView) and twm.axis == "term":
+            matrix = sparse.csr_matrix((twm.matrix.data, twm.matrix.doc_ids, twm.matrix.term_indptr),
+                                       shape=(twm.matrix.shape[1], len(global_document)))
+            return cls(matrix, twm.matrix.terms, global_document)
+
+        vocabulary = TermDictionary()
+        doc_ids = {document: doc_idx for doc_idx, document in enumerate(global_document)}
+        offsets = np.zeros(len(twm) + 1, dtype=np.int64)
+        indices, data = list(), list()
+
+        for term, file_weight in twm.items():
+            term_idx = vocabulary.add(term)
+            indices.extend(doc_ids[filename] for filename in file_weight.keys())
+            data.extend(file_weight.values())
+            offsets[term_idx + 1] = len(indices)
+
+        matrix = sparse.csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), offsets),
+                                   shape=(len(vocabulary), len(global_document)))
+        matrix.sort_indices()
+
+        return cls(matrix, vocabulary, global_document)
+
+    @classmethod
+    def from_posting(cls, global_lexicon, global_posting, global_document, global_document_weight=None):
+        '''
+        global_posting(PostingStore, CompressedPostingStore)으로 부터 ScoringEngine을 만듭니다.
+        PostingStore의 CSR array(offsets, doc_ids, weights)를 복사 없이 행렬로 사용 합니다.
+        global_document_weight를 지정하면 cosine이 candidate_list_by_cosine()과 같은 score를 반환 합니다.
+        '''
+        if hasattr(global_posting, "decompress"):
+            global_posting = global_posting.decompress()
+
+        matrix = sparse.csr_matrix((global_posting.weights, global_posting.doc_ids, global_posting.offsets),
+                                   shape=(global_posting.n_terms, len(global_document)))
+        norms = None
+
+        if global_document_weight is not None:
+            norms = getattr(global_document_weight, "array", None)
+            if norms is None:
+                norms = [global_document_weight.get(document, np.inf) for document in global_document]
+
+        return cls(matrix, global_lexicon, global_document, norms)
+
+    @property
+    def n_terms(self):
+        return self.matrix.shape[0]
+
+    @property
+    def n_documents(self):
+        return self.matrix.shape[1]
+
+    def query_vector(self, query_weight):
+        '''
+        {단어: weight} 형태의 query_weight(eval_query_weight()의 결과)를 1 x 단어 수 CSR 행렬로 변환 합니다.
+        색인에 없는 단어는 제외 하고, 단어는 query 순서를 유지 합니다.
+        '''
+        return self.query_matrix([query_weight])
+
+    def query_matrix(self, query_weights):
+        '''
+        query_weight 목록을 query 수 x 단어 수 CSR 행렬로 변환 합니다. (행 i가 query i의 query vector)
+        여러 query에 반복되는 단어는 단어 idx를 한 번만 조회 합니다.
+        '''
+        indptr, term_ids, weights = [0], list(), list()
+        term_cache = dict()
+
+        for query_weight in query_weights:
+            for term, weight in query_weight.items():
+                term_idx = term_cache.get(term, -1)
+                if term_idx == -1:
+                    term_idx = term_cache[term] = self.vocabulary.get(term, None)
+
+                if term_idx is not None:
+                    term_ids.append(term_idx)
+                    weights.append(weight)
+            indptr.append(len(term_ids))
+
+        return sparse.csr_matrix((np.array(weights, dtype=np.float64), np.array(term_ids, dtype=np.int32),
+                                  np.array(indptr, dtype=np.int64)), shape=(len(query_weights), self.n_terms))
+
+    def _score_matrix(self, query_matrix, metric):
+        '''
+        query_matrix(query 수 x 단어 수) @ matrix(단어 수 x 문서 수)의 sparse 행렬 곱으로
+        query term을 포함한 문서(candidate)의 (query idx, 문서 idx, score) array를 반환 합니다.
+        cosine, dot, euclidean 모두 같은 candidate를 사용 합니다.
+
+        sparse 행렬 곱은 query 별로 query term의 행(posting)만 읽고, 한 문서의 q · d를 query 순서대로 더하므로
+        cosine은 candidate_list_by_cosine()과 값이 정확히 같습니다.
+        '''
+        if metric not in METRICS:
+            raise ValueError("metric은 {0} 중 하나 입니다: {1}".format(METRICS, metric))
+
+        product = query_matrix @ self.matrix
+        rows = np.repeat(np.arange(query_matrix.shape[0]), np.diff(product.indptr))
+        doc_ids, dot = product.indices, product.data
+
+        if metric == "dot":
+            return rows, doc_ids, dot
+        if metric == "cosine":
+            return rows, doc_ids, dot / self.norms[doc_ids]
+        return rows, doc_ids, self._query_norms(query_matrix)[rows] + self.squared_norms[doc_ids] - 2 * dot
+
+    def _query_norms(self, query_matrix):
+        '''
+        query 별 ||q||²를 반환 합니다.
+        '''
+        return np.bincount(np.repeat(np.arange(query_matrix.shape[0]), np.diff(query_matrix.indptr)),
+                           weights=query_matrix.data ** 2, minlength=query_matrix.shape[0])
+
+    @property
+    def norm_order(self):
+        '''
+        ||d||² 오름차순(같으면 문서 idx 순서)의 문서 idx array 입니다. (euclidean 상위 k개 선택에 사용, 처음 사용할 때 계산)
+        '''
+        if getattr(self, "_norm_order", None) is None:
+            self._norm_order = np.argsort(self.squared_norms, kind="stable")
+            self._sorted_norms = self.squared_norms[self._norm_order]
+        return self._norm_order
+
+    def score(self, query_weight, metric="cosine"):
+        '''
+        query의 문서별 score를 (문서 idx array, score array)로 반환 합니다.
+        dot, cosine은 query term을 포함한 문서만, euclidean은 전체 문서를 반환 합니다.
+        '''
+        query_vector = self.query_vector(query_weight)
+        _, doc_ids, scores = self._score_matrix(query_vector, metric)
+
+        if metric == "euclidean":
+            # query term을 포함하지 않은 문서의 distance는 ||q||² + ||d||²
+            distance = self._query_norms(query_vector)[0] + self.squared_norms
+            distance[doc_ids] = scores
+            return np.arange(self.n_documents), distance
+        return doc_ids, scores
+
+    def candidate_list(self, query_weight, metric="cosine"):
+        '''
+        candidate_list_by_cosine()과 같은 {"document": score} 형태로 반환 합니다.
+        '''
+        doc_ids, scores = self.score(query_weight, metric)
+        return {self.documents[doc_idx]: score for doc_idx, score in zip(doc_ids.tolist(), scores.tolist())}
+
+    def search(self, query_weight, k=3, metric="cosine"):
+        '''
+        상위 k개 문서를 [(document, score), ...] 형태로 반환 합니다.
+        cosine, dot은 내림차순(cosine_sort), euclidean은 오름차순(euclidian_sort)이고,
+        같은 score는 문서 idx 순서로 정렬 합니다.
+        '''
+        return self.search_many([query_weight], k, metric)[0]
+
+    def search_many(self, queries, k=3, metric="cosine", global_lexicon_idf=None, morphs=None, batch_size=None):
+        '''
+        여러 query의 상위 k개 문서를 query 순서대로 [[(document, score), ...], ...] 형태로 반환 합니다.
+        (query 별 search()와 결과가 같습니다)
+
+        queries : query 문자열 또는 query_weight({단어: weight}) 목록
+            -> 문자열은 query_index(), eval_query_weight()로 분석 (global_lexicon_idf 필요)
+            -> 형태소 분석기(morphs)는 한 번만 만들어서 모든 query에 사용
+        batch_size : 한 번의 sparse 행렬 곱으로 채점할 query 수
+            -> None이면 query term들의 posting 수 합이 BATCH_POSTINGS 정도가 되도록 나눔
+               (결과 행렬이 너무 커지면 메모리 접근이 느려지므로, 흔한 단어가 많은 query는 작은 batch로 채점)
+        '''
+        query_matrix = self.query_matrix(analyze_queries(queries, global_lexicon_idf, morphs))
+        result_lists = list()
+
+        batches = self._batches(query_matrix, batch_size)
+
+        for start, end in batches:
+            batch = query_matrix[start:end] if len(batches) > 1 else query_matrix
+            rows, doc_ids, scores = self._score_matrix(batch, metric)
+            row_starts = np.searchsorted(rows, np.arange(end - start + 1))
+            query_norms = self._query_norms(batch) if metric == "euclidean" else None
+
+            for row in range(end - start):
+                candidates = doc_ids[row_starts[row]:row_starts[row + 1]]
+                candidate_scores = scores[row_starts[row]:row_starts[row + 1]]
+
+                if metric == "euclidean":
+                    result_lists.append(self._top_k_euclidean(candidates, candidate_scores, query_norms[row], k))
+                else:
+                    result_lists.append(self._top_k(candidates, candidate_scores, k))
+
+        return result_lists
+
+    def _batches(self, query_matrix, batch_size=None):
+        '''
+        query_matrix의 행을 batch 단위의 (시작 행, 끝 행) 목록으로 나눕니다.
+        '''
+        n_queries = query_matrix.shape[0]
+
+        if n_queries <= 1:
+            return [(0, n_queries)]
+        if batch_size is not None:
+            return [(start, min(start + batch_size, n_queries)) for start in range(0, n_queries, batch_size)]
+
+        row_postings = np.bincount(np.repeat(np.arange(n_queries), np.diff(query_matrix.indptr)),
+                                   weights=np.diff(self.matrix.indptr)[query_matrix.indices], minlength=n_queries)
+        batches, start, postings = list(), 0, 0
+
+        for row, count in enumerate(row_postings.tolist()):
+            if row > start and postings + count > BATCH_POSTINGS:
+                batches.append((start, row))
+                start, postings = row, 0
+            postings += count
+
+        if start < n_queries:
+            batches.append((start, n_queries))
+        return batches
+
+    def _top_k(self, doc_ids, scores, k, ascending=False):
+        if k <= 0:
+            return list()
+
+        keys = scores if ascending else -scores
+
+        if len(keys) > k:
+            kth_key = np.partition(keys, k - 1)[k - 1]
+            selected = keys <= kth_key
+            doc_ids, keys = doc_ids[selected], keys[selected]
+
+        result_order = np.lexsort((doc_ids, keys))[:k]
+        sign = 1 if ascending else -1
+
+        return [(self.documents[doc_ids[idx]], sign * keys[idx]) for idx in result_order]
+
+    def _top_k_euclidean(self, candidates, distances, query_norm, k):
+        '''
+        euclidean distance 상위(오름차순) k개를 candidate와 나머지 문서에서 선택 합니다.
+        query term을 포함하지 않은 문서의 distance는 ||q||² + ||d||² 이므로,
+        norm_order의 앞쪽에서 candidate가 아닌 문서 k개(와 distance가 같은 문서)만 비교하면 됩니다.
+        비용은 전체 문서 수가 아니라 candidate 수 + k에 비례 합니다.
+        '''
+        if k <= 0:
+            return list()
+
+        norm_order = self.norm_order
+        # candidate 여부는 정렬한 candidate에서 binary search로 확인 (전체 문서 크기의 array를 만들지 않음)
+        sorted_candidates = np.sort(candidates)
+
+        def is_candidate(doc_ids):
+            if len(sorted_candidates) == 0:
+                return np.zeros(len(doc_ids), dtype=bool)
+            positions = np.minimum(np.searchsorted(sorted_candidates, doc_ids), len(sorted_candidates) - 1)
+            return sorted_candidates[positions] == doc_ids
+
+        # norm_order의 앞쪽에서 candidate가 아닌 문서 k개를 찾을 때까지 범위를 2배씩 늘림
+        # (candidate 수 + k개 안에는 반드시 포함됨)
+        prefix = 2 * k
+        while True:
+            others = norm_order[:prefix]
+            others = others[~is_candidate(others)][:k]
+            if len(others) == k or prefix >= len(candidates) + k:
+                break
+            prefix *= 2
+
+        if len(others):
+            # k번째와 distance가 같은 문서(||d||²가 달라도 ||q||²를 더할 때 반올림으로 같아질 수 있음)까지 포함
+            kth_distance = query_norm + self.squared_norms[others[-1]]
+            end = np.searchsorted(self._sorted_norms, kth_distance - query_norm, side="right")
+            while end < self.n_documents and query_norm + self._sorted_norms[end] <= kth_distance:
+                end += 1
+
+            others = norm_order[:end]
+            others = others[~is_candidate(others)]
+
+        doc_ids = np.concatenate([candidates, others])
+        distances = np.concatenate([distances, query_norm + self.squared_norms[others]])
+
+        return self._top_k(doc_ids, distances, k, ascending=True)
+
+
+def analyze_queries(queries, global_lexicon_idf=None, morphs=None):
+    '''
+    query 문자열은 query_index(), eval_query_weight()로 query_weight로 변환하고,
+    이미 query_weight(dictionary)인 query는 그대로 반환 합니다.
+    형태소 분석기는 morphs가 None이면 공유 Kkma 분석기(get_analyzer())를 사용 합니다.
+    '''
+    query_weights = list()
+
+    for query in queries:
+        if isinstance(query, str):
+            if global_lexicon_idf is None:
+                raise ValueError("query 문자열을 분석하려면 global_lexicon_idf가 필요 합니다.")
+            query_repr = query_index(query, morphs)
+            query = eval_query_weight(query_repr, global_lexicon_idf) if query_repr else dict()
+
+        query_weights.append(query)
+
+    return query_weights
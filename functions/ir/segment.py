@@ -0,0 +1,502 @@
+'''
+segment.py : 새로운 뉴스 기사 폴더(snapshot)를 전체 재색인 없이 추가/삭제할 수 있는 증분(incremental) 색인을 정의 합니다.
+
+NewsScraping.download()로 폴더가 추가될 때마다 inverted_index_with_tf(), get_tdm_from_dtm(),
+tdm2twm(), evaluate_idf()로 전체를 다시 색인하는 대신, IncrementalIndex는
+    - 추가된 문서들로 작은 segment(PostingStore)를 만들어 segment 목록에 붙이고
+    - 변경된 term의 df만 갱신 합니다. (추가/삭제 비용은 그 문서들의 posting 수에 비례)
+그 term을 포함한 기존 문서의 document weight는 다음 조회(document_weight()) 때 한 번에 갱신 합니다.
+segment 수가 max_segments를 넘으면 background thread에서 segment들을 하나로 병합(merge)하고,
+삭제된 문서를 제거한 후 남은 문서의 문서 idx를 앞에서 부터 다시 매깁니다.
+
+# document weight의 증분 계산
+    document weight = sum((w * idf) ** 2),  idf = smoothig_idf(df, n) = log10(n+1) - log10(df)
+    L = log10(n+1), l = log10(df) 라고 하면
+    document weight = L**2 * A - 2 * L * B + C
+        A = sum(w ** 2), B = sum(w ** 2 * l), C = sum(w ** 2 * l ** 2)
+    문서 수(n)가 바뀌어도 L만 바뀌므로 전체 문서를 다시 계산할 필요가 없고,
+    term의 df가 바뀌면 그 term을 포함한 문서의 B, C 만 갱신 합니다.
+    B, C에 반영된 l(_applied_l)과 현재 l이 다른 term을 dirty로 표시해 두었다가,
+    document weight를 조회할 때 dirty term의 posting에 대해서만 한 번에 갱신 합니다.
+    (문서 추가/삭제가 여러 번 이어져도 흔한 term의 기존 posting은 조회 전에 한 번만 갱신)
+
+사용예)
+    index = IncrementalIndex()
+    index.add_documents(extended_collection)          # 새로운 snapshot의 (document이름, lexicon) 목록
+    index.delete_documents(["2019-03-14_21-51/00-01-0000003574.txt"])
+    candidate_list = candidate_list_by_cosine(query_weight, *index.as_tuple())
+'''
+import threading
+from collections import defaultdict
+from collections.abc import Mapping
+
+import numpy as np
+
+from functions.info_retrieval import max_tf, smoothig_idf
+from functions.ir.lexicon import TermDictionary
+from functions.ir.posting import PostingBuilder, PostingStore
+
+
+def _grow(array, size):
+    '''
+    array의 크기가 size 보다 작으면 2배씩 늘린 새로운 array(0으로 채움)를 반환 합니다.
+    '''
+    if len(array) >= size:
+        return array
+
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _posting_ranges(offsets, term_ids):
+    '''
+    term_ids의 posting 위치(index)를 하나의 array로 반환 합니다. (posting 수에 비례하는 비용)
+    return: posting 위치, posting 별 term_ids 내의 순서
+    '''
+    owners = np.flatnonzero(term_ids < len(offsets) - 1)
+    starts, ends = offsets[term_ids[owners]], offsets[term_ids[owners] + 1]
+    counts = ends - starts
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    return positions, np.repeat(owners, counts)
+
+
+def _log_df(df):
+    return np.log10(np.where(df > 0, df, 1))
+
+
+class Segment():
+    '''
+    IncrementalIndex의 segment 입니다.
+    segment에 나온 단어만 PostingStore에 segment 안의 단어 순번으로 저장하므로, 크기는 전체 단어 수와 무관 합니다.
+        terms => segment 단어 순번 별 전체 색인 기준의 단어 idx (오름차순)
+        store => segment 단어 순번 별 posting (문서 idx는 전체 색인 기준)
+    '''
+
+    def __init__(self, store, terms):
+        self.store = store
+        self.terms = np.asarray(terms, dtype=np.int64)
+
+    @classmethod
+    def from_postings(cls, term_ids, doc_ids, freqs, weights):
+        '''
+        posting 별 (전체 단어 idx, 문서 idx, 빈도, weight) array로 segment를 만듭니다.
+        '''
+        terms, local_ids = np.unique(term_ids, return_inverse=True)
+        return cls(PostingStore.from_postings(local_ids.ravel(), doc_ids, freqs, weights, len(terms)), terms)
+
+    def term_ids(self):
+        '''
+        posting 별 전체 색인 기준의 단어 idx를 반환 합니다.
+        '''
+        return self.terms[self.store.term_ids()]
+
+    def find(self, term_ids):
+        '''
+        term_ids(전체 단어 idx) 중 segment에 있는 단어의 (segment 단어 순번, term_ids 내의 순서)를 반환 합니다.
+        '''
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        if len(self.terms) == 0:
+            return term_ids[:0], term_ids[:0]
+        local_ids = np.minimum(self.terms.searchsorted(term_ids), len(self.terms) - 1)
+        found = np.flatnonzero(self.terms[local_ids] == term_ids)
+        return local_ids[found], found
+
+    def postings(self, term_idx):
+        local_idx = self.terms.searchsorted(term_idx)
+        if local_idx == len(self.terms) or self.terms[local_idx] != term_idx:
+            return self.store.doc_ids[:0], self.store.weights[:0]
+        return self.store.postings(local_idx)
+
+    def remap(self, remap):
+        '''
+        remap이 -1인(삭제된) 문서의 posting을 제거하고, 문서 idx를 remap[문서 idx]로 바꾼 segment를 반환 합니다.
+        remap은 오름차순이므로 단어 별 doc_ids의 오름차순도 유지 됩니다.
+        '''
+        doc_ids = remap[self.store.doc_ids]
+        alive = doc_ids >= 0
+        return Segment.from_postings(self.term_ids()[alive], doc_ids[alive], self.store.freqs[alive],
+                                     self.store.weights[alive])
+
+
+class SegmentedPostings():
+    '''
+    IncrementalIndex의 segment 목록을 하나의 global_posting 처럼 조회 합니다.
+    삭제된 문서의 posting은 제외하고 반환 합니다.
+    '''
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        segments, _ = self._snapshot()
+        return sum(len(segment.store) for segment in segments)
+
+    def _snapshot(self):
+        '''
+        segment 목록과 live를 lock 안에서 함께 읽습니다.
+        background merge가 문서 idx를 다시 매기는(segment와 live를 바꾸는) 중에도 서로 맞는 쌍을 사용 합니다.
+        '''
+        with self._index._lock:
+            return list(self._index.segments), self._index.live
+
+    @property
+    def n_terms(self):
+        return len(self._index.lexicon)
+
+    def df(self):
+        return self._index.df[:len(self._index.lexicon)].copy()
+
+    def postings(self, term_idx):
+        segments, live = self._snapshot()
+        doc_ids, weights = zip(*[segment.postings(term_idx) for segment in segments]) if segments else ((), ())
+        doc_ids = np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int32)
+        weights = np.concatenate(weights) if weights else np.empty(0, dtype=np.float64)
+        live = live[doc_ids]
+
+        return doc_ids[live], weights[live]
+
+    def live_doc_ids(self):
+        '''
+        삭제되지 않은 문서 idx array(오름차순)를 반환 합니다.
+        '''
+        with self._index._lock:
+            live = self._index.live[:len(self._index.documents)].copy()
+        return np.flatnonzero(live)
+
+    def merged(self):
+        '''
+        삭제되지 않은 문서의 posting을 하나의 PostingStore로 합쳐서 (PostingStore, 문서 이름 list)로 반환 합니다.
+        문서 idx는 삭제된 문서를 제외하고 (순서를 유지하며) 다시 매긴 순번 입니다.
+        offsets, freqs 등 CSR array가 필요한 경우(ranking model의 fit() 등)에 사용 합니다.
+        '''
+        index = self._index
+        with index._lock:
+            segments, documents = list(index.segments), list(index.documents)
+            live = index.live[:len(documents)].copy()
+            n_terms = len(index.lexicon)
+
+        keep = np.flatnonzero(live)
+        remap = np.full(len(documents), -1, dtype=np.int32)
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+
+        if segments:
+            term_ids = np.concatenate([segment.term_ids() for segment in segments])
+            doc_ids = remap[np.concatenate([segment.store.doc_ids for segment in segments])]
+            freqs = np.concatenate([segment.store.freqs for segment in segments])
+            weights = np.concatenate([segment.store.weights for segment in segments])
+            alive = doc_ids >= 0
+            term_ids, doc_ids, freqs, weights = term_ids[alive], doc_ids[alive], freqs[alive], weights[alive]
+        else:
+            term_ids = doc_ids = freqs = np.zeros(0, dtype=np.int32)
+            weights = np.zeros(0, dtype=np.float64)
+
+        store = PostingStore.from_postings(term_ids, doc_ids, freqs, weights, n_terms)
+        return store, [documents[doc_idx] for doc_idx in keep.tolist()]
+
+
+class _IdfView(Mapping):
+    '''
+    {단어: idf} 형태로 현재 df, 문서 수에 대한 idf를 조회 합니다. (global_lexicon_idf 대체)
+    '''
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, term):
+        term_idx = self._index.lexicon[term]
+        df = self._index.df[term_idx]
+
+        if df == 0:
+            raise KeyError(term)
+        return smoothig_idf(df, self._index.document_count)
+
+    def __iter__(self):
+        for term_idx, term in enumerate(self._index.lexicon):
+            if self._index.df[term_idx] > 0:
+                yield term
+
+    def __len__(self):
+        return int(np.count_nonzero(self._index.df[:len(self._index.lexicon)]))
+
+
+class _DocumentWeightView(Mapping):
+    '''
+    {문서 이름: document weight} 형태로 현재 document weight를 조회 합니다. (global_document_weight 대체)
+    '''
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, document):
+        doc_idx = self._index.doc_ids[document]
+        return self._index.document_weight(doc_idx)
+
+    def __iter__(self):
+        return iter(self._index.doc_ids)
+
+    def __len__(self):
+        return len(self._index.doc_ids)
+
+
+class IncrementalIndex():
+    '''
+    segment 단위로 문서를 추가/삭제할 수 있는 색인 입니다.
+
+    lexicon   => TermDictionary (전체 segment가 공유하는 단어 idx)
+    documents => 문서 idx 별 문서 이름 (삭제된 문서도 merge 전까지 자리를 유지, merge 후 문서 idx를 다시 매김)
+    doc_ids   => {문서 이름: 문서 idx} (삭제되지 않은 문서)
+    live      => 문서 idx 별 삭제 여부 (True: 검색 대상)
+    df        => 단어 idx 별 document frequency (삭제되지 않은 문서 기준)
+    generation=> 색인이 바뀔 때마다 1씩 증가 (질의 결과 cache 무효화 등에 사용)
+    '''
+
+    def __init__(self, max_segments=8, background_merge=True):
+        self.max_segments = max_segments
+        self.background_merge = background_merge
+        self.generation = 0
+
+        self.lexicon = TermDictionary()
+        self.documents = list()
+        self.doc_ids = dict()
+        self.segments = list()
+        self._doc_terms = list()    # 문서 idx 별 단어 idx array (문서 삭제 시 df 갱신에 사용)
+
+        self.live = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int64)
+        self._applied_l = np.zeros(0, dtype=np.float64)    # 단어 idx 별 B, C에 반영된 log10(df)
+        self._dirty = np.zeros(0, dtype=bool)              # 단어 idx 별 B, C 갱신 필요 여부
+        self._stale = False
+        self._a = np.zeros(0, dtype=np.float64)
+        self._b = np.zeros(0, dtype=np.float64)
+        self._c = np.zeros(0, dtype=np.float64)
+
+        self._lock = threading.RLock()
+        self._merge_thread = None
+
+    @property
+    def document_count(self):
+        return len(self.doc_ids)
+
+    def document_weight(self, doc_idx):
+        '''
+        문서의 document weight(sum((tf * idf) ** 2))를 반환 합니다.
+        '''
+        if self._stale:
+            self._refresh_weights()
+        L = np.log10(self.document_count + 1)
+        return L * L * self._a[doc_idx] - 2 * L * self._b[doc_idx] + self._c[doc_idx]
+
+    def _update_df(self, term_ids, delta):
+        '''
+        term_ids(중복 없음)의 df를 delta 만큼 바꾸고 dirty로 표시 합니다. (term_ids 수에 비례)
+        기존 문서들의 B, C는 _refresh_weights()에서 갱신 합니다.
+        '''
+        self.df[term_ids] += delta
+        self._dirty[term_ids] = True
+        self._stale = True
+
+    def _refresh_weights(self):
+        '''
+        dirty term을 포함한 문서들의 B, C를 현재 df로 갱신 합니다. (dirty term의 posting 수에 비례)
+        '''
+        with self._lock:
+            if not self._stale:
+                return
+            term_ids = np.flatnonzero(self._dirty[:len(self.lexicon)])
+            new_l = _log_df(self.df[term_ids])
+            old_l = self._applied_l[term_ids]
+
+            # term_ids 순서 별 l, l**2 변화량
+            delta_l = new_l - old_l
+            delta_l2 = new_l ** 2 - old_l ** 2
+
+            for segment in self.segments:
+                local_ids, found = segment.find(term_ids)
+                positions, owners = _posting_ranges(segment.store.offsets, local_ids)
+                if len(positions) == 0:
+                    continue
+                owners = found[owners]
+
+                doc_ids = segment.store.doc_ids[positions]
+                w2 = segment.store.weights[positions] ** 2
+
+                np.add.at(self._b, doc_ids, w2 * delta_l[owners])
+                np.add.at(self._c, doc_ids, w2 * delta_l2[owners])
+
+            self._applied_l[term_ids] = new_l
+            self._dirty[term_ids] = False
+            self._stale = False
+
+    def add_documents(self, collection):
+        '''
+        (document이름, lexicon list) 목록을 새로운 segment로 추가 합니다.
+        이미 있는 문서 이름이면 기존 문서를 삭제한 후 다시 추가 합니다.
+        비용은 추가하는 문서의 posting 수에 비례 합니다. (기존 문서의 document weight는 조회 시 갱신)
+        '''
+        with self._lock:
+            collection = list(collection)
+            self.delete_documents([name for name, _ in collection if name in self.doc_ids])
+
+            builder = PostingBuilder()
+            first_doc_idx = len(self.documents)
+
+            for document_name, lexicon in collection:
+                local_posting = defaultdict(int)
+                for term in lexicon:
+                    local_posting[term] += 1
+
+                doc_idx = len(self.documents)
+                self.documents.append(document_name)
+                self.doc_ids[document_name] = doc_idx
+
+                term_ids = [self.lexicon.add(term) for term in local_posting.keys()]
+                freqs = np.fromiter(local_posting.values(), dtype=np.int32, count=len(local_posting))
+                builder.add_document(doc_idx, term_ids, freqs, max_tf(freqs, freqs.max(), 0))
+                self._doc_terms.append(np.array(term_ids, dtype=np.int32))
+
+            if len(builder) == 0:
+                return self
+
+            n_docs, n_terms = len(self.documents), len(self.lexicon)
+            self.live = _grow(self.live, n_docs)
+            self.live[first_doc_idx:n_docs] = True
+            self._a, self._b, self._c = [_grow(array, n_docs) for array in (self._a, self._b, self._c)]
+            self.df, self._applied_l, self._dirty = [_grow(array, n_terms)
+                                                     for array in (self.df, self._applied_l, self._dirty)]
+
+            segment = Segment.from_postings(*builder.arrays())
+            store, segment_df = segment.store, segment.store.df()
+
+            # 새로운 문서의 A, B, C는 B, C에 반영된 l(_applied_l)로 계산하고,
+            # df가 바뀐 term은 _refresh_weights()에서 기존 문서와 함께 갱신
+            posting_l = np.repeat(self._applied_l[segment.terms], segment_df)
+            w2 = store.weights ** 2
+            np.add.at(self._a, store.doc_ids, w2)
+            np.add.at(self._b, store.doc_ids, w2 * posting_l)
+            np.add.at(self._c, store.doc_ids, w2 * posting_l ** 2)
+            self._update_df(segment.terms, segment_df)
+
+            self.segments.append(segment)
+            self.generation += 1
+
+        print("{0}개 문서 추가 완료 (segment 수: {1})".format(len(collection), len(self.segments)))
+
+        if len(self.segments) > self.max_segments:
+            self.merge_segments(background=self.background_merge)
+
+        return self
+
+    def delete_documents(self, document_names):
+        '''
+        문서를 삭제 합니다. posting과 문서 idx는 다음 merge 때 제거되고, 그 전까지는 검색에서 제외 됩니다.
+        비용은 삭제하는 문서의 term 수에 비례 합니다.
+        '''
+        with self._lock:
+            doc_ids = [self.doc_ids.pop(name) for name in document_names if name in self.doc_ids]
+            if len(doc_ids) == 0:
+                return self
+
+            self.live[doc_ids] = False
+            self._a[doc_ids] = self._b[doc_ids] = self._c[doc_ids] = 0
+
+            term_ids, counts = np.unique(np.concatenate([self._doc_terms[doc_idx] for doc_idx in doc_ids]),
+                                         return_counts=True)
+            self._update_df(term_ids, -counts)
+            self.generation += 1
+
+        return self
+
+    def _merge(self, segments, live):
+        '''
+        segments를 하나의 segment로 병합 합니다. live(segments와 함께 lock 안에서 읽은 삭제 여부)로 삭제된 문서의 posting은 제거 합니다.
+        '''
+        term_ids = np.concatenate([segment.term_ids() for segment in segments])
+        doc_ids = np.concatenate([segment.store.doc_ids for segment in segments])
+        freqs = np.concatenate([segment.store.freqs for segment in segments])
+        weights = np.concatenate([segment.store.weights for segment in segments])
+
+        live = live[doc_ids]
+        term_ids, doc_ids, freqs, weights = term_ids[live], doc_ids[live], freqs[live], weights[live]
+
+        # segment 순서(= 문서 idx 순서)를 유지하도록 안정 정렬
+        return Segment.from_postings(term_ids, doc_ids, freqs, weights)
+
+    def _compact(self):
+        '''
+        삭제된 문서를 documents, doc_ids, live, _doc_terms, A, B, C에서 제거하고,
+        남은 문서의 문서 idx를 (순서를 유지하며) 0 부터 다시 매깁니다. segment의 posting도 새 문서 idx로 바꿉니다.
+        as_tuple()로 전달한 documents list, doc_ids dictionary는 그대로 갱신 합니다.
+        '''
+        n_docs = len(self.documents)
+        keep = np.flatnonzero(self.live[:n_docs])
+        if len(keep) == n_docs:
+            return
+
+        remap = np.full(n_docs, -1, dtype=np.int32)
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+        self.segments = [segment.remap(remap) for segment in self.segments]
+
+        self.documents[:] = [self.documents[doc_idx] for doc_idx in keep.tolist()]
+        self.doc_ids.clear()
+        self.doc_ids.update((document, doc_idx) for doc_idx, document in enumerate(self.documents))
+        self._doc_terms = [self._doc_terms[doc_idx] for doc_idx in keep.tolist()]
+        self.live = np.ones(len(keep), dtype=bool)
+        self._a, self._b, self._c = [array[keep] for array in (self._a, self._b, self._c)]
+        self.generation += 1
+
+    def _merge_and_swap(self):
+        with self._lock:
+            segments = list(self.segments)
+            live = self.live[:len(self.documents)].copy()
+
+        if len(segments) < 2 and live.all():
+            return
+
+        merged = self._merge(segments, live) if len(segments) > 1 else segments[0]
+
+        with self._lock:
+            # merge 하는 동안 추가된 segment는 그대로 유지
+            self.segments = [merged] + self.segments[len(segments):]
+            # merge 하는 동안 삭제된 문서도 포함해서 제거
+            self._compact()
+
+    def merge_segments(self, background=False):
+        '''
+        모든 segment를 하나로 병합하고, 삭제된 문서를 제거한 후 문서 idx를 다시 매깁니다.
+        background=True이면 thread에서 병합 합니다. 병합 중에도 검색과 문서 추가/삭제를 할 수 있습니다.
+        (문서 idx를 다시 매기는 동안에는 lock을 잡으므로, 문서 idx를 저장해 둔 결과는 generation으로 확인 합니다.)
+        '''
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return self
+
+        if background:
+            self._merge_thread = threading.Thread(target=self._merge_and_swap, daemon=True)
+            self._merge_thread.start()
+        else:
+            self._merge_and_swap()
+
+        return self
+
+    def wait_merge(self):
+        '''
+        background merge가 끝날 때까지 기다립니다.
+        '''
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+        return self
+
+    def as_tuple(self):
+        '''
+        질의 함수(candidate_list_by_cosine 등)에 전달할 수 있는 객체들을 반환 합니다.
+            return: global_lexicon, global_posting, global_document, global_document_weight
+        '''
+        return self.lexicon, SegmentedPostings(self), self.documents, _DocumentWeightView(self)
+
+    @property
+    def global_lexicon_idf(self):
+        '''
+        eval_query_weight()에 전달할 {단어: idf} Mapping을 반환 합니다.
+        '''
+        return _IdfView(self)
@@ -0,0 +1,150 @@
+'''
+spimi.py : SPIMI(Single-Pass In-Memory Indexing) 방식의 색인 함수를 정의 합니다.
+
+inverted_index_with_tf()는 전체 collection의 posting과 dtm을 메모리에 모두 올려놓고 색인 합니다.
+spimi_index()는 (document이름, lexicon)을 하나씩 읽으면서 block 단위로 posting을 만들고,
+block의 크기가 memory_budget에 도달하면 term idx 순으로 정렬된 run 파일로 disk에 저장(spill) 합니다.
+마지막에 run 파일들을 k-way merge 해서 최종 색인(PostingStore)을 만듭니다.
+
+    collection -> block(메모리) -> run 파일(disk) -> k-way merge -> global_posting
+
+단어 사전(TermDictionary)은 block 사이에 공유하므로, 단어 idx와 posting 순서는
+inverted_index_with_tf()의 결과와 동일 합니다.
+'''
+import os
+import heapq
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+from functions.info_retrieval import max_tf
+from functions.ir.lexicon import TermDictionary
+from functions.ir.matrix import DocumentTermMatrix
+from functions.ir.posting import PostingBuilder, PostingStore
+from functions.ir.term_stats import TermStatistics
+
+# block 메모리 사용량 계산 시 posting 1건의 크기 (term idx, 문서 idx, 빈도: int32, weight: float64)
+POSTING_BYTES = 20
+
+_RUN_COLUMNS = ("offsets", "doc_ids", "freqs", "weights")
+
+
+def _write_run(block, n_terms, run_dir, run_no):
+    '''
+    block의 posting을 term idx 순으로 정렬해서 run 디렉토리에 column 별 .npy 파일로 저장 합니다.
+    '''
+    run_path = os.path.join(run_dir, "run-{0:05d}".format(run_no))
+    os.makedirs(run_path)
+    store = block.build(n_terms)
+
+    for column in _RUN_COLUMNS:
+        np.save(os.path.join(run_path, column + ".npy"), getattr(store, column))
+
+    print("{0}번째 block 저장 완료 ({1}개 posting)".format(run_no + 1, len(store)))
+    return run_path
+
+
+def _open_run(run_path):
+    '''
+    run 파일을 memory-map으로 열어서 PostingStore로 반환 합니다.
+    '''
+    return PostingStore(*[np.load(os.path.join(run_path, column + ".npy"), mmap_mode="r")
+                          for column in _RUN_COLUMNS])
+
+
+def _iter_run_terms(run, run_no):
+    '''
+    run에 posting이 있는 term idx를 오름차순으로 (term idx, run 번호) 형태로 반환 합니다.
+    '''
+    for term_idx in np.flatnonzero(run.df()):
+        yield int(term_idx), run_no
+
+
+def merge_runs(run_paths, n_terms):
+    '''
+    term idx 순으로 정렬된 run 파일들을 k-way merge 해서 하나의 PostingStore를 만듭니다.
+    같은 term idx는 run 번호 순(= 문서 idx 순)으로 이어 붙입니다.
+    '''
+    runs = [_open_run(run_path) for run_path in run_paths]
+    total = sum(len(run) for run in runs)
+
+    doc_ids = np.empty(total, dtype=np.int32)
+    freqs = np.empty(total, dtype=np.int32)
+    weights = np.empty(total, dtype=np.float64)
+    df = np.zeros(n_terms, dtype=np.int64)
+    position = 0
+
+    for term_idx, run_no in heapq.merge(*[_iter_run_terms(run, run_no) for run_no, run in enumerate(runs)]):
+        run = runs[run_no]
+        start, end = run.offsets[term_idx], run.offsets[term_idx + 1]
+        count = end - start
+
+        doc_ids[position:position + count] = run.doc_ids[start:end]
+        freqs[position:position + count] = run.freqs[start:end]
+        weights[position:position + count] = run.weights[start:end]
+        df[term_idx] += count
+        position += count
+
+    offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(df, out=offsets[1:])
+
+    global_posting = PostingStore(offsets, doc_ids, freqs, weights)
+    global_posting.stats = TermStatistics.from_store(global_posting)
+    return global_posting
+
+
+def get_dtm_from_posting(global_lexicon, global_posting, global_document):
+    '''
+    global_posting의 raw tf로 부터 dtm(Document-Term Matrix)을 만듭니다.
+    inverted_index_with_tf()가 반환하는 dtm과 같은 {"document": {"term": freq}} 형태의 Mapping view 입니다.
+    '''
+    return DocumentTermMatrix.from_posting(global_lexicon, global_posting, global_document).dtm()
+
+
+def spimi_index(collection, memory_budget=64 * 1024 ** 2, tmp_dir=None, with_dtm=True):
+    '''
+    SPIMI 방식으로 색인 합니다. 반환값은 inverted_index_with_tf()와 같습니다.
+        return: global_lexicon, global_posting, global_document, dtm_dict
+
+    collection   : (document이름, lexicon list)를 차례로 반환하는 iterable (generator 사용 가능)
+    memory_budget: block 하나가 사용할 수 있는 posting 메모리 (bytes)
+    tmp_dir      : run 파일을 저장할 임시 디렉토리의 상위 경로 (None이면 시스템 임시 디렉토리)
+    with_dtm     : False이면 dtm_dict를 만들지 않고 None을 반환 합니다.
+    '''
+    global_lexicon = TermDictionary()
+    global_document = list()
+    block = PostingBuilder()
+    run_paths = list()
+    doc_idx = -1
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+        for doc_idx, (document_name, lexicon) in enumerate(collection):
+            global_document.append(document_name)
+
+            local_posting = defaultdict(int)
+            for term in lexicon:
+                local_posting[term] += 1
+
+            term_ids = [global_lexicon.add(term) for term in local_posting.keys()]
+            freqs = np.fromiter(local_posting.values(), dtype=np.int32, count=len(local_posting))
+            block.add_document(doc_idx, term_ids, freqs, max_tf(freqs, freqs.max(), 0))
+
+            if len(block) * POSTING_BYTES >= memory_budget:
+                run_paths.append(_write_run(block, len(global_lexicon), run_dir, len(run_paths)))
+                block = PostingBuilder()
+
+            if doc_idx % 50 == 49:
+                print("{0}개 뉴스 기사 indexing 완료".format(doc_idx+1))
+
+        if len(block) > 0:
+            run_paths.append(_write_run(block, len(global_lexicon), run_dir, len(run_paths)))
+
+        global_posting = merge_runs(run_paths, len(global_lexicon))
+
+    dtm_dict = None
+    if with_dtm:
+        dtm_dict = get_dtm_from_posting(global_lexicon, global_posting, global_document)
+
+    print("전체 {0}개 뉴스 기사 indexing 완료".format(doc_idx+1))
+    return global_lexicon, global_posting, global_document, dtm_dict
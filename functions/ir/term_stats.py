@@ -0,0 +1,93 @@
+'''
+term_stats.py : 색인 시 함께 만드는 단어 별 통계(TermStatistics)를 정의 합니다.
+
+evaluate_idf()의 이전 형식(linked list)은 단어 별 posting을 두 번(df 계산, document weight 누적) 따라가고,
+tdm2twm()은 dictionary에서 df를 다시 셉니다. TermStatistics는 posting을 만들 때 한 번에
+    df         => 단어 idx 별 document frequency
+    cf         => 단어 idx 별 collection frequency (전체 문서에서의 빈도 합)
+    max_weight => 단어 idx 별 posting weight의 최댓값 (질의 시 score 상한, pruning에 사용)
+    block_max  => BLOCK_SIZE개 posting 단위 block 별 weight의 최댓값 (CompressedPostingStore의 block과 같은 단위)
+    term_blocks => 단어 idx 별 첫 block 위치 (길이: 단어 수 + 1)
+를 numpy array로 계산해서 global_posting.stats로 저장 합니다. (write_index()로 색인 파일에도 저장)
+
+사용예)
+    stats = term_statistics(global_posting)
+    idf = smoothig_idf(stats.df, len(global_document))
+'''
+import numpy as np
+
+# compress.py의 BLOCK_SIZE와 같은 값 (block_max를 압축 block 단위로 맞춤)
+BLOCK_SIZE = 128
+
+
+def _term_blocks(df, block_size):
+    term_blocks = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(-(-df // block_size), out=term_blocks[1:])
+    return term_blocks
+
+
+class TermStatistics():
+    '''
+    단어 idx 별 df, cf, max_weight와 block 별 block_max를 저장 합니다.
+    '''
+
+    def __init__(self, df, cf, max_weight, block_max, block_size=BLOCK_SIZE):
+        self.df = np.asarray(df, dtype=np.int64)
+        self.cf = np.asarray(cf, dtype=np.int64)
+        self.max_weight = np.asarray(max_weight, dtype=np.float64)
+        self.block_max = np.asarray(block_max, dtype=np.float64)
+        self.block_size = block_size
+        self.term_blocks = _term_blocks(self.df, block_size)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def nbytes(self):
+        return self.df.nbytes + self.cf.nbytes + self.max_weight.nbytes + self.block_max.nbytes
+
+    @classmethod
+    def from_store(cls, global_posting, block_size=BLOCK_SIZE):
+        '''
+        PostingStore(offsets, freqs, weights)로 부터 통계를 계산 합니다. (posting 수에 비례, 한 번의 numpy 연산)
+        '''
+        offsets = np.asarray(global_posting.offsets)
+        df = np.diff(offsets)
+        n_terms = len(df)
+        non_empty = np.flatnonzero(df)
+
+        cf = np.zeros(n_terms, dtype=np.int64)
+        max_weight = np.zeros(n_terms, dtype=np.float64)
+        if len(non_empty):
+            # 비어 있지 않은 단어의 posting 시작 위치는 오름차순이고, 마지막 단어의 posting은 array 끝까지 이어짐
+            starts = offsets[non_empty]
+            cf[non_empty] = np.add.reduceat(np.asarray(global_posting.freqs, dtype=np.int64), starts)
+            max_weight[non_empty] = np.maximum.reduceat(np.asarray(global_posting.weights), starts)
+
+        term_blocks = _term_blocks(df, block_size)
+        n_blocks = int(term_blocks[-1])
+        block_terms = np.repeat(np.arange(n_terms), np.diff(term_blocks))
+        block_starts = offsets[block_terms] + (np.arange(n_blocks) - term_blocks[block_terms]) * block_size
+        block_max = np.maximum.reduceat(np.asarray(global_posting.weights), block_starts) \
+            if n_blocks else np.zeros(0, dtype=np.float64)
+
+        return cls(df, cf, max_weight, block_max, block_size)
+
+    def term_block_max(self, term_idx):
+        '''
+        term_idx의 block 별 weight 최댓값 array를 반환 합니다.
+        '''
+        return self.block_max[self.term_blocks[term_idx]:self.term_blocks[term_idx + 1]]
+
+
+def term_statistics(global_posting):
+    '''
+    global_posting의 단어 통계를 반환 합니다.
+    색인 시 만든 통계(global_posting.stats)가 있으면 그대로 사용하고, 없으면(이전 형식의 색인 파일 등) 계산 합니다.
+    '''
+    stats = getattr(global_posting, "stats", None)
+    if stats is not None:
+        return stats
+    if hasattr(global_posting, "decompress"):
+        global_posting = global_posting.decompress()
+    return TermStatistics.from_store(global_posting)
@@ -0,0 +1,181 @@
+'''
+topk.py : 상위 k개 문서만 조회하는 Cosine similarity 질의(Top-k retrieval)를 정의 합니다.
+
+candidate_list_by_cosine()은 query term을 하나라도 포함한 모든 문서의 score를 계산하고,
+cosine_sort()는 전체 candidate_list를 정렬 합니다. (result_print()는 상위 3개만 출력)
+top_k_by_cosine()은 MaxScore 방식으로 상위 k개에 들어갈 수 없는 문서를 건너뜁니다.
+
+# MaxScore
+    term t의 score 상한 : ub(t) = query weight(t) * max(weight / document weight)  (cosine_upper_bounds())
+    1. query term을 ub 내림차순으로 처리하면서, term의 posting에 새로 나온 문서(candidate)의 전체 score를 계산
+       (다른 query term의 posting은 binary search로 조회하므로, 긴 posting 전체를 누적하지 않음)
+    2. 지금까지 계산한 k번째 score(threshold) 보다 남은 term들의 ub 합이 작으면 중단
+       -> 남은 term들에만 포함된 문서는 score가 threshold 보다 작으므로 상위 k개에 들어갈 수 없음
+    df가 큰 흔한 단어는 idf가 작아 ub도 작으므로, 보통 posting 전체를 누적하지 않고 건너뜁니다.
+
+score는 candidate_list_by_cosine()과 같은 순서(query 순서)로 누적하므로 값이 정확히 같고,
+같은 score는 cosine_sort()와 같이 문서 idx 순서로 정렬 합니다.
+
+사용예)
+    upper_bounds = cosine_upper_bounds(global_posting, global_document, global_document_weight)   # 색인 당 1회
+    result_list = top_k_by_cosine(query_weight, global_lexicon, global_posting, global_document,
+                                  global_document_weight, k=3, upper_bounds=upper_bounds)
+'''
+import numpy as np
+
+from functions.info_retrieval import candidate_list_by_cosine, cosine_sort
+
+# 부동소수점 합산 순서 차이로 ub 합이 실제 score 상한 보다 조금 작게 계산되는 경우를 위한 여유
+_BOUND_MARGIN = 1e-9
+
+
+def _document_weights(global_document, global_document_weight, doc_ids):
+    '''
+    문서 idx array에 해당하는 document weight를 array로 반환 합니다.
+    '''
+    document_weight_array = getattr(global_document_weight, "array", None)
+
+    if document_weight_array is not None:
+        return document_weight_array[doc_ids]
+    return np.array([global_document_weight[global_document[doc_idx]] for doc_idx in doc_ids], dtype=np.float64)
+
+
+def cosine_upper_bounds(global_posting, global_document, global_document_weight):
+    '''
+    단어 idx 별 max(weight / document weight)를 numpy array로 반환 합니다.
+    query weight를 곱하면 그 term이 문서의 Cosine similarity에 더할 수 있는 최대값이 됩니다.
+    색인이 바뀌지 않으면 한 번만 계산해서 top_k_by_cosine()에 전달 합니다.
+    '''
+    if hasattr(global_posting, "decompress"):
+        global_posting = global_posting.decompress()
+
+    document_weight_array = getattr(global_document_weight, "array", None)
+    if document_weight_array is None:
+        # 삭제된 문서(IncrementalIndex)는 상한 계산에서 제외 (weight / inf = 0)
+        document_weight_array = np.array([global_document_weight.get(document, np.inf)
+                                          for document in global_document], dtype=np.float64)
+
+    upper_bounds = np.zeros(global_posting.n_terms, dtype=np.float64)
+
+    if hasattr(global_posting, "offsets"):
+        normalized = global_posting.weights / document_weight_array[global_posting.doc_ids]
+        df = global_posting.df()
+        non_empty = np.flatnonzero(df)
+        if len(non_empty):
+            upper_bounds[non_empty] = np.maximum.reduceat(normalized, global_posting.offsets[non_empty])
+    else:
+        for term_idx in range(global_posting.n_terms):
+            doc_ids, weights = global_posting.postings(term_idx)
+            if len(doc_ids):
+                upper_bounds[term_idx] = (weights / document_weight_array[doc_ids]).max()
+
+    return upper_bounds
+
+
+def _contains(sorted_ids, ids):
+    '''
+    ids 별로 sorted_ids(오름차순)에 있는지 여부를 binary search로 찾습니다.
+    '''
+    if len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=bool)
+
+    positions = np.searchsorted(sorted_ids, ids)
+    positions[positions == len(sorted_ids)] = 0
+    return sorted_ids[positions] == ids
+
+
+def _score_candidates(candidates, query_terms):
+    '''
+    candidate 문서들의 score(query weight * weight의 합)를 query 순서대로 누적 합니다.
+    term 별 posting에서 candidate의 위치는 binary search로 찾습니다. (doc_ids는 오름차순)
+    '''
+    scores = np.zeros(len(candidates), dtype=np.float64)
+
+    for q_weight, doc_ids, weights, _ in query_terms:
+        if len(doc_ids) == 0:
+            continue
+
+        positions = np.searchsorted(doc_ids, candidates)
+        positions[positions == len(doc_ids)] = 0
+        found = doc_ids[positions] == candidates
+        scores[found] += q_weight * weights[positions[found]]
+
+    return scores
+
+
+def top_k_by_cosine(query_weight, global_lexicon, global_posting, global_document, global_document_weight,
+                    k=3, upper_bounds=None):
+    '''
+    Cosine similarity 상위 k개 문서를 [(document, similarity), ...] 형태로 반환 합니다.
+    cosine_sort(candidate_list_by_cosine(...))[:k]와 결과가 같습니다.
+
+    upper_bounds: cosine_upper_bounds()의 결과 (None이면 query term 별로 계산)
+    '''
+    if isinstance(global_posting, list):
+        return cosine_sort(candidate_list_by_cosine(query_weight, global_lexicon, global_posting,
+                                                    global_document, global_document_weight))[:k]
+
+    # query_terms => [(query weight, doc_ids, weights, score 상한), ...] (query 순서)
+    query_terms = list()
+
+    for index_term, q_weight in query_weight.items():
+        term_idx = global_lexicon.get(index_term, None)
+
+        if term_idx is not None:
+            doc_ids, weights = global_posting.postings(term_idx)
+
+            if upper_bounds is not None:
+                max_weight = upper_bounds[term_idx]
+            elif len(doc_ids):
+                max_weight = (weights / _document_weights(global_document, global_document_weight, doc_ids)).max()
+            else:
+                max_weight = 0.0
+            query_terms.append((q_weight, doc_ids, weights, max(q_weight, 0) * max_weight))
+
+    if k <= 0 or len(query_terms) == 0:
+        return list()
+
+    # score 상한이 큰 term 부터 처리, remaining[i] = i번째 이후 term들의 score 상한 합
+    order = sorted(range(len(query_terms)), key=lambda i: query_terms[i][3], reverse=True)
+    remaining = np.cumsum([query_terms[i][3] for i in order][::-1])[::-1]
+
+    candidate_ids, candidate_scores = list(), list()
+    n_scored, threshold = 0, -np.inf
+
+    for i, term_order in enumerate(order):
+        if n_scored >= k and remaining[i] * (1 + _BOUND_MARGIN) < threshold:
+            break
+
+        # 앞에서 처리한 term의 posting에 있던 문서는 이미 score를 계산했으므로 제외 (전체 문서 수와 무관)
+        candidates = query_terms[term_order][1]
+        for previous in order[:i]:
+            if len(candidates) == 0:
+                break
+            candidates = candidates[~_contains(query_terms[previous][1], candidates)]
+        if len(candidates) == 0:
+            continue
+
+        scores = _score_candidates(candidates, query_terms)
+        scores = scores / _document_weights(global_document, global_document_weight, candidates)
+        candidate_ids.append(candidates)
+        candidate_scores.append(scores)
+        n_scored += len(candidates)
+
+        if n_scored >= k:
+            all_scores = np.concatenate(candidate_scores)
+            threshold = np.partition(all_scores, n_scored - k)[n_scored - k]
+
+    if n_scored == 0:
+        return list()
+
+    doc_ids, scores = np.concatenate(candidate_ids), np.concatenate(candidate_scores)
+
+    if n_scored > k:
+        # k번째 score와 같은 문서까지 남긴 후 (score 내림차순, 문서 idx 오름차순)으로 정렬
+        kth_score = np.partition(scores, n_scored - k)[n_scored - k]
+        selected = scores >= kth_score
+        doc_ids, scores = doc_ids[selected], scores[selected]
+
+    result_order = np.lexsort((doc_ids, -scores))[:k]
+
+    return [(global_document[doc_ids[idx]], scores[idx]) for idx in result_order]
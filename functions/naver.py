@@ -15,6 +15,7 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 from functions.download import get_download
+from functions.profiling import profiler
 
 
 class NewsScraping():
@@ -106,6 +107,7 @@ class NewsScraping():
             print("(%s) 디렉토리를 만들 수 없습니다!" % (self._path))
             return None
 
+    @profiler.profiled()
     def download(self, default_path="naver_news"):
         '''
         기사 다운로드 후 본문을 저장하고, 기사 랭크, 제목, url을 csv 파일로 저장합니다.
@@ -130,23 +132,29 @@ class NewsScraping():
             for sec in section:
                 # sec[0]에 rank, sec[1]에 기사 제목, sec[2]에 기사 링크가 있음
                 html = get_download(sec[2])
-                dom = BeautifulSoup(html.text, "html.parser")
-                contents = dom.select("#articleBodyContents")[0]
 
-                # content에 <script> 태그 내의 내용이 포함되어 있음 
-                # (삭제할 필요는 없음. 삭제하지 않으려면 위에 코멘트 처리된 부분을 사용)
-                contents_ = contents.text.replace(
-                    "// flash 오류를 우회하기 위한 함수 추가\nfunction _flash_removeCallback() {}",
-                    "")
+                # 다운로드(get_download 단계)를 제외한 parsing, 저장 시간과 기사 본문 bytes 수를 측정
+                with profiler.stage("NewsScraping.article", documents=1) as stage:
+                    dom = BeautifulSoup(html.text, "html.parser")
+                    contents = dom.select("#articleBodyContents")[0]
 
-                # 기사 url에 포함된 article ID(aid) 값을 추출해서 file명에 사용
-                aid = re.findall(r"aid=\d+", sec[2])[0].split("=")[1]
-                rank = sec[0]
-                fileName = cat_code + "-" + self._ranks[rank] + "-" + aid + ".txt"
-                fullPath = os.path.join(self._path, fileName)
+                    # content에 <script> 태그 내의 내용이 포함되어 있음 
+                    # (삭제할 필요는 없음. 삭제하지 않으려면 위에 코멘트 처리된 부분을 사용)
+                    contents_ = contents.text.replace(
+                        "// flash 오류를 우회하기 위한 함수 추가\nfunction _flash_removeCallback() {}",
+                        "")
 
-                with open(fullPath, "w") as f:
-                    f.write(contents_)
+                    # 기사 url에 포함된 article ID(aid) 값을 추출해서 file명에 사용
+                    aid = re.findall(r"aid=\d+", sec[2])[0].split("=")[1]
+                    rank = sec[0]
+                    fileName = cat_code + "-" + self._ranks[rank] + "-" + aid + ".txt"
+                    fullPath = os.path.join(self._path, fileName)
+
+                    with open(fullPath, "w") as f:
+                        f.write(contents_)
+
+                    if stage.enabled:
+                        stage.add(nbytes=len(contents_.encode("utf-8")))
 
         csvFileName = os.path.join(default_path, 
                       "newslist-" + self._path.split("/")[-1] + ".csv")
@@ -316,12 +324,14 @@ class MovieReview():
 
         for page in range(1, max_page + 1):
             dom = self.get_site(page)
+            profiler.count("MovieReview.pages")
             for tag in dom.select(".list_netizen tbody tr"):
                 point = tag.select_one(".point").text.strip()
                 movie_title = tag.select_one(".title a").text.strip()
                 review = tag.select_one(".title").contents[4].strip()
                 review_day = tag.select_one(".author").next_sibling.next_sibling.strip()
                 self.movie_review.append([movie_title, point, review_day, review])
+                profiler.count("MovieReview.reviews")
 
             if page % 100 == 0 and page != 0:
                 print("{0} pages scrapped".format(page))
@@ -0,0 +1,125 @@
+'''
+analyzer.py : 한 번 만들어서 계속 사용하는 형태소 분석기(AnalyzerService)를 정의 합니다.
+
+query_index()는 질의마다, get_extended_lexicon()은 문서마다 Kkma()를 새로 만들고,
+Kkma() 생성은 JVM 위에서 사전을 읽어들이는 초기화를 거칩니다.
+AnalyzerService는
+    1. 형태소 분석기를 pool_size개 만들고 한 번씩 분석(warm-up)해 둔 후
+    2. morphs(), pos(), nouns()를 호출할 때마다 pool에서 분석기 1개를 빌려서 사용하므로, thread pool에서 호출해도 안전하고
+    3. morphs_many(), pos_many(), nouns_many()로 여러 문자열을 한 번에 분석 합니다. (pool_size > 1 이면 여러 thread에서 분석)
+get_analyzer()는 분석기 이름 별로 AnalyzerService를 하나만 만들어서 공유 합니다.
+Kkma 대신 더 빠른 KoNLPy 분석기(Okt, Hannanum, Komoran)도 같은 interface로 사용할 수 있습니다.
+
+사용예)
+    analyzer = get_analyzer("okt")
+    query_repr = query_index(query, morphs=analyzer.morphs)
+    pos_lists = analyzer.pos_many(contents)
+'''
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from konlpy.tag import Hannanum, Kkma, Komoran, Okt
+
+taggers = {
+    "kkma": Kkma,
+    "okt": Okt,
+    "hannanum": Hannanum,
+    "komoran": Komoran,
+}
+
+_services = dict()
+_services_lock = threading.Lock()
+
+
+class AnalyzerService():
+    '''
+    형태소 분석기 pool 입니다.
+        tagger    : taggers의 이름("kkma", "okt", "hannanum", "komoran") 또는 분석기를 만드는 함수(class)
+        pool_size : 만들어 둘 분석기 수 (동시에 분석할 수 있는 thread 수)
+        warmup    : 분석기를 만든 후 분석할 문자열 (None이면 warm-up 하지 않음)
+    '''
+
+    def __init__(self, tagger="kkma", pool_size=1, warmup="형태소 분석기를 준비 합니다."):
+        self.name = tagger if isinstance(tagger, str) else getattr(tagger, "__name__", repr(tagger))
+        self.pool_size = pool_size
+
+        factory = taggers[tagger.lower()] if isinstance(tagger, str) else tagger
+        self._pool = queue.Queue()
+
+        for _ in range(pool_size):
+            instance = factory()
+            if warmup is not None:
+                instance.pos(warmup)
+            self._pool.put(instance)
+
+    def __repr__(self):
+        return "AnalyzerService({0}, pool_size={1})".format(self.name, self.pool_size)
+
+    def _analyze(self, mode, texts):
+        '''
+        pool에서 분석기 1개를 빌려서 texts를 순서대로 분석 합니다.
+        '''
+        instance = self._pool.get()
+
+        try:
+            analyze = getattr(instance, mode)
+            return [analyze(text) for text in texts]
+        finally:
+            self._pool.put(instance)
+
+    def _analyze_many(self, mode, texts):
+        texts = list(texts)
+
+        if self.pool_size == 1 or len(texts) <= 1:
+            return self._analyze(mode, texts)
+
+        # pool_size개의 연속된 묶음으로 나누어 분석한 후 입력 순서대로 합침
+        chunk_size = -(-len(texts) // self.pool_size)
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return [result for results in executor.map(lambda chunk: self._analyze(mode, chunk), chunks)
+                    for result in results]
+
+    def morphs(self, text):
+        return self._analyze("morphs", [text])[0]
+
+    def pos(self, text):
+        return self._analyze("pos", [text])[0]
+
+    def nouns(self, text):
+        return self._analyze("nouns", [text])[0]
+
+    def morphs_many(self, texts):
+        '''
+        여러 문자열의 형태소 list를 입력 순서대로 반환 합니다.
+        '''
+        return self._analyze_many("morphs", texts)
+
+    def pos_many(self, texts):
+        '''
+        여러 문자열의 [(형태소, 품사), ...]를 입력 순서대로 반환 합니다.
+        '''
+        return self._analyze_many("pos", texts)
+
+    def nouns_many(self, texts):
+        '''
+        여러 문자열의 명사 list를 입력 순서대로 반환 합니다.
+        '''
+        return self._analyze_many("nouns", texts)
+
+
+def get_analyzer(tagger="kkma", pool_size=1):
+    '''
+    tagger 별로 하나만 만든 AnalyzerService를 반환 합니다. (process 내에서 공유)
+    같은 tagger를 더 큰 pool_size로 요청하면 새로 만들어서 교체 합니다.
+    '''
+    key = tagger.lower()
+
+    with _services_lock:
+        service = _services.get(key, None)
+        if service is None or service.pool_size < pool_size:
+            service = _services[key] = AnalyzerService(key, pool_size)
+
+    return service
@@ -0,0 +1,77 @@
+'''
+corpus.py : corpus의 문서를 한 번에 모두 읽지 않고, 하나씩(또는 chunk 단위로) 읽어 주는 함수를 정의 합니다.
+
+get_lexicon(), get_tfidf_from_konlpy(), get_tfidf_from_nltk()는 문서를 읽을 때마다 np.append()로
+numpy array를 다시 만들어서(매번 전체 복사) corpus 크기의 제곱에 비례하는 시간이 걸리고,
+vectorize 하기 전에 모든 문서의 content를 memory에 올려 둡니다.
+iter_documents(), iter_chunks()는 corpus를 generator로 읽으므로, 한 번에 memory에 올라가는 문서는
+1개(또는 chunk_size개) 입니다.
+
+corpus는 fileids(), open(fileid) 함수를 가진 객체 입니다.
+    - KoNLPy corpus (kobill, kolaw), NLTK corpus (gutenberg 등)
+    - FolderCorpus : naver_news, spam_mail 처럼 폴더 아래에 저장한 문서
+
+사용예)
+    for chunk in iter_chunks(FolderCorpus("naver_news"), chunk_size=100):
+        collection = clean_collection(chunk)
+        ...
+'''
+import os
+from itertools import islice
+
+
+class FolderCorpus():
+    '''
+    root 폴더 아래(하위 폴더 포함)의 suffix로 끝나는 파일을 문서로 하는 corpus 입니다.
+    fileid는 root 기준 상대 경로 입니다.
+    '''
+
+    def __init__(self, root, suffix=".txt", encoding="utf-8"):
+        self.root = root
+        self.suffix = suffix
+        self.encoding = encoding
+
+    def __repr__(self):
+        return "FolderCorpus({0!r})".format(self.root)
+
+    def fileids(self):
+        return sorted(os.path.relpath(os.path.join(path, filename), self.root)
+                      for path, _, filenames in os.walk(self.root)
+                      for filename in filenames if filename.endswith(self.suffix))
+
+    def abspath(self, fileid):
+        return os.path.join(self.root, fileid)
+
+    def open(self, fileid):
+        return open(self.abspath(fileid), encoding=self.encoding)
+
+
+def iter_documents(corpus, fileids=None):
+    '''
+    corpus의 문서를 (fileid, content) 형태로 하나씩 반환하는 generator 입니다.
+        fileids : 읽을 문서 목록 (None이면 corpus.fileids())
+    '''
+    if fileids is None:
+        fileids = corpus.fileids()
+
+    for fileid in fileids:
+        stream = corpus.open(fileid)
+        try:
+            content = stream.read()
+        finally:
+            stream.close()
+
+        yield fileid, content
+
+
+def iter_chunks(corpus, chunk_size=100, fileids=None):
+    '''
+    corpus의 문서를 chunk_size개씩 [(fileid, content), ...] list로 반환하는 generator 입니다.
+    '''
+    documents = iter_documents(corpus, fileids)
+
+    while True:
+        chunk = list(islice(documents, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
@@ -0,0 +1,187 @@
+'''
+morph_cache.py : 어절 단위 형태소 분석 결과를 저장(memoization)하는 MorphCache를 정의 합니다.
+
+query_index(), get_extended_lexicon()은 매번 Kkma로 형태소 분석을 하는데,
+Kkma는 색인 과정에서 가장 느린 단계이고 같은 어절이 여러 기사와 질의에 반복해서 나옵니다.
+MorphCache는 (분석 mode, 어절) -> 분석 결과를
+    1. process 내의 LRU cache (memory)
+    2. sqlite 파일 (disk, path를 지정한 경우) -> 여러 실행, 여러 worker process가 공유
+순서로 조회하고, 둘 다 없을 때만 형태소 분석기를 호출 합니다.
+새로 분석한 결과는 morphs(), pos(), nouns()로 text 1개를 분석할 때마다 sqlite 파일에 저장하므로,
+clean_collection(processes=...), AnalyzerService의 worker process가 종료되어도 분석 결과가 유실되지 않습니다.
+(analyze()로 어절을 하나씩 분석한 결과는 flush_size개 마다, 그리고 process 종료(atexit) 시 저장)
+
+문장 전체가 아니라 어절 단위로 분석하므로, 문맥에 따라 Kkma의 분석 결과가 문장 전체를 분석할 때와 조금 다를 수 있습니다.
+(query_index()는 원래 어절 단위로 분석하므로 결과가 같습니다.)
+
+사용예)
+    morph_cache = MorphCache(path="naver_news/morph_cache.sqlite")
+    lexicon = get_extended_lexicon(content, pos=morph_cache.pos)
+    query_repr = query_index(query, morphs=morph_cache.morphs)
+    morph_cache.flush()
+    print(morph_cache.stats())
+'''
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import weakref
+
+from functions.ir.cache import LRUCache
+from functions.nlp.analyzer import get_analyzer
+
+MODES = ("morphs", "pos", "nouns")
+
+# process 종료 시 저장하지 않은 분석 결과를 저장할 MorphCache 목록
+_instances = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    for morph_cache in list(_instances):
+        morph_cache.flush()
+
+
+class MorphCache():
+    '''
+    어절 단위 형태소 분석 cache 입니다.
+        analyzer   : morphs(), pos(), nouns() 함수를 가진 형태소 분석기 (None이면 처음 사용할 때 get_analyzer()의 공유 Kkma 분석기)
+        path       : sqlite 파일 경로 (None이면 memory cache만 사용)
+        maxsize    : memory(LRU) cache의 최대 항목 수
+        flush_size : analyze()로 분석한 결과 중 disk에 저장하지 않은 결과가 flush_size개가 되면 한 번에 저장
+                     (morphs(), pos(), nouns()는 text 1개를 분석한 후 저장)
+    '''
+
+    def __init__(self, analyzer=None, path=None, maxsize=100000, flush_size=1000):
+        self.analyzer = analyzer
+        self.path = path
+        self.maxsize = maxsize
+        self.flush_size = flush_size
+        self.disk_hits = self.analyzed = 0
+
+        self.memory = LRUCache(maxsize)
+        self._pending = list()    # disk에 아직 저장하지 않은 (mode, 어절, 결과 json)
+        self._connection = None
+        self._pid = None
+        self._lock = threading.RLock()
+        _instances.add(self)
+
+    def __getstate__(self):
+        # worker process로 전달할 때는 설정만 복사 (connection, 분석기, memory cache는 process 별로 새로 만듦)
+        self.flush()
+        return {"analyzer": None, "path": self.path, "maxsize": self.maxsize, "flush_size": self.flush_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _get_analyzer(self):
+        if self.analyzer is None:
+            self.analyzer = get_analyzer()
+        return self.analyzer
+
+    def _get_connection(self):
+        '''
+        sqlite connection을 반환 합니다. (fork된 process에서는 새로 연결)
+        '''
+        if self.path is None:
+            return None
+
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS morph_cache "
+                                     "(mode TEXT, eojeol TEXT, result TEXT, PRIMARY KEY (mode, eojeol))")
+            self._pid = os.getpid()
+
+        return self._connection
+
+    def analyze(self, eojeol, mode="morphs"):
+        '''
+        어절 1개의 형태소 분석 결과(list)를 반환 합니다.
+            mode : "morphs"(형태소 list), "pos"([(형태소, 품사), ...]), "nouns"(명사 list)
+        '''
+        key = (mode, eojeol)
+        result = self.memory.get(key, None)
+        if result is not None:
+            return result
+
+        with self._lock:
+            connection = self._get_connection()
+            row = None
+            if connection is not None:
+                row = connection.execute("SELECT result FROM morph_cache WHERE mode=? AND eojeol=?", key).fetchone()
+
+            if row is not None:
+                result = json.loads(row[0])
+                if mode == "pos":
+                    result = [tuple(morph) for morph in result]
+                self.disk_hits += 1
+            else:
+                result = list(getattr(self._get_analyzer(), mode)(eojeol))
+                self.analyzed += 1
+                if connection is not None:
+                    self._pending.append((mode, eojeol, json.dumps(result, ensure_ascii=False)))
+                    if len(self._pending) >= self.flush_size:
+                        self.flush()
+
+        self.memory.put(key, result)
+        return result
+
+    def _analyze_text(self, text, mode):
+        result = [morph for eojeol in text.split() for morph in self.analyze(eojeol, mode)]
+        if self._pending:
+            # worker process는 종료 시 flush()를 호출하지 않을 수 있으므로 text(문서) 단위로 저장
+            self.flush()
+        return result
+
+    def morphs(self, text):
+        '''
+        text를 어절 단위로 나누어 형태소 list를 반환 합니다. (Kkma().morphs 대신 사용)
+        '''
+        return self._analyze_text(text, "morphs")
+
+    def pos(self, text):
+        '''
+        text를 어절 단위로 나누어 [(형태소, 품사), ...]를 반환 합니다. (Kkma().pos 대신 사용)
+        '''
+        return self._analyze_text(text, "pos")
+
+    def nouns(self, text):
+        '''
+        text를 어절 단위로 나누어 명사 list를 반환 합니다. (Kkma().nouns 대신 사용)
+        '''
+        return self._analyze_text(text, "nouns")
+
+    def flush(self):
+        '''
+        disk에 저장하지 않은 분석 결과를 sqlite 파일에 저장 합니다.
+        '''
+        with self._lock:
+            if len(self._pending) == 0 or self._get_connection() is None:
+                return
+            with self._connection:
+                self._connection.executemany("INSERT OR IGNORE INTO morph_cache VALUES (?, ?, ?)", self._pending)
+            self._pending = list()
+
+    def close(self):
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        '''
+        memory, disk 적중 횟수와 전체 조회 대비 적중률(hit rate)을 반환 합니다.
+        '''
+        lookups = self.memory.hits + self.memory.misses
+        return {"lookups": lookups, "memory_hits": self.memory.hits, "disk_hits": self.disk_hits,
+                "analyzed": self.analyzed,
+                "memory_hit_rate": self.memory.hits / lookups if lookups else 0.0,
+                "hit_rate": (self.memory.hits + self.disk_hits) / lookups if lookups else 0.0}
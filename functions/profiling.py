@@ -0,0 +1,264 @@
+'''
+profiling.py : 색인/질의, scraping 단계(stage) 별 실행 시간, 처리량(문서/초, bytes/초), counter를 측정 합니다.
+
+info_retrieval, download, naver의 각 단계는 profiler.stage()로 감싸져 있고,
+환경변수 NLP_PROFILE로 코드 수정 없이 측정을 켭니다. (쉼표로 여러 개 지정 가능)
+    NLP_PROFILE=1              => 측정만 (profiler.report(), profiler.to_json()으로 조회)
+    NLP_PROFILE=log            => 단계가 끝날 때 마다 logging(logger "functions.profiling")으로 한 줄 출력
+    NLP_PROFILE=profile.json   => process 종료 시 JSON 파일로 저장
+    NLP_PROFILE=log,profile.json
+측정이 꺼져 있으면(기본값) stage()는 아무것도 하지 않는 공유 객체를 반환하고 count()는 바로 반환하므로,
+단계 1번에 함수 호출 1번 정도의 비용만 추가 됩니다.
+단계 안에서 실행한 다른 단계(예: inverted_index_with_tf가 읽는 generator 안의 get_extended_lexicon)의 시간은
+바깥 단계의 시간에도 포함 됩니다.
+(여러 process에서 실행한 단계(clean_collection(processes=...), parallel_inverted_index()의 worker)는 각 process에서 따로 측정 됩니다.)
+
+사용예)
+    from functions.profiling import profiler
+
+    with profiler.stage("clean_collection") as stage:
+        collection = normalizer.clean(stage.track(collection, document_bytes))   # 문서 수, bytes 수를 함께 누적
+    with profiler.stage("get_extended_lexicon", documents=1) as stage:
+        if stage.enabled:                                                         # 측정할 때만 bytes 계산
+            stage.add(nbytes=len(corpus.encode("utf-8")))
+    profiler.count("inverted_index_with_tf.tokens", n_tokens)
+
+    @profiler.profiled()
+    def evaluate_idf(...):
+
+    profiler.enable(log=True)                              # 코드에서 켜기
+    print(profiler.report()["stages"]["clean_collection"]["docs_per_sec"])
+'''
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+ENV = "NLP_PROFILE"
+
+logger = logging.getLogger(__name__)
+
+
+def document_bytes(document):
+    '''
+    (document이름, content) 문서의 content UTF-8 bytes 수를 반환 합니다. (bytes/초 계산용)
+    '''
+    return len(document[1].encode("utf-8"))
+
+
+class _Stage():
+    '''
+    측정 중인 단계 1회 입니다. with 문이 끝날 때 profiler에 시간, 문서 수, bytes 수를 누적 합니다.
+    '''
+    __slots__ = ("profiler", "name", "documents", "nbytes", "start")
+    enabled = True
+
+    def __init__(self, profiler, name, documents=0, nbytes=0):
+        self.profiler = profiler
+        self.name = name
+        self.documents = documents
+        self.nbytes = nbytes
+
+    def add(self, documents=0, nbytes=0):
+        '''
+        단계 안에서 처리한 문서 수, bytes 수를 더합니다. (단계 시작 시 알 수 없는 경우)
+        '''
+        self.documents += documents
+        self.nbytes += nbytes
+
+    def track(self, documents, size=None):
+        '''
+        documents를 하나씩 반환하면서 문서 수(와 size(문서)로 계산한 bytes 수)를 더합니다. (generator도 그대로 사용)
+        '''
+        for document in documents:
+            self.documents += 1
+            if size is not None:
+                self.nbytes += size(document)
+            yield document
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._record(self.name, time.perf_counter() - self.start, self.documents, self.nbytes)
+        return False
+
+
+class _NullStage():
+    '''
+    측정이 꺼져 있을 때 stage()가 반환하는 공유 객체 입니다. (아무것도 하지 않음)
+    '''
+    __slots__ = ()
+    enabled = False
+
+    def add(self, documents=0, nbytes=0):
+        pass
+
+    def track(self, documents, size=None):
+        return documents
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler():
+    '''
+    단계 별 [호출 수, 누적 시간, 최대 시간, 문서 수, bytes 수]와 counter를 누적 합니다. (thread safe)
+        enabled   => 측정 여부
+        log       => 단계가 끝날 때 마다 logging으로 출력
+        json_path => process 종료 시 저장할 JSON 파일 경로
+    '''
+
+    def __init__(self, enabled=False, log=False, json_path=None):
+        self.stages = dict()
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._atexit = False
+        self.enabled = False
+        self.log = False
+        self.json_path = None
+        if enabled or log or json_path is not None:
+            self.enable(log, json_path)
+
+    @classmethod
+    def from_env(cls, value=None):
+        '''
+        환경변수 NLP_PROFILE 값("1", "log", "*.json"을 쉼표로 연결)으로 Profiler를 만듭니다.
+        '''
+        value = os.environ.get(ENV, "") if value is None else value
+        options = [option.strip() for option in value.split(",") if option.strip()]
+        options = [option for option in options if option.lower() not in ("0", "off", "false")]
+
+        json_paths = [option for option in options if option.lower().endswith(".json")]
+        return cls(enabled=len(options) > 0, log="log" in [option.lower() for option in options],
+                   json_path=json_paths[-1] if json_paths else None)
+
+    def enable(self, log=False, json_path=None):
+        '''
+        측정을 켭니다. json_path를 지정하면 process 종료 시 to_json()으로 저장 합니다.
+        '''
+        self.enabled = True
+        self.log = log
+        self.json_path = json_path
+
+        if log and not logger.hasHandlers():
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        if json_path is not None and not self._atexit:
+            atexit.register(self._dump)
+            self._atexit = True
+
+        return self
+
+    def disable(self):
+        self.enabled = False
+        return self
+
+    def reset(self):
+        with self._lock:
+            self.stages = dict()
+            self.counters = defaultdict(int)
+        return self
+
+    def stage(self, name, documents=0, nbytes=0):
+        '''
+        with 문으로 감싼 단계의 실행 시간을 측정하는 context manager를 반환 합니다.
+        documents, nbytes : 단계에서 처리하는 문서 수, bytes 수 (단계 안에서 stage.add()로 더할 수도 있음)
+        '''
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, documents, nbytes)
+
+    def count(self, name, value=1):
+        '''
+        counter name에 value를 더합니다.
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += value
+
+    def profiled(self, name=None):
+        '''
+        함수 전체를 단계 하나로 측정하는 decorator 입니다. (name을 지정하지 않으면 함수의 qualified name)
+        '''
+        def decorator(func):
+            stage_name = func.__qualname__ if name is None else name
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Stage(self, stage_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _record(self, name, seconds, documents, nbytes):
+        with self._lock:
+            stats = self.stages.get(name, None)
+            if stats is None:
+                self.stages[name] = [1, seconds, seconds, documents, nbytes]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+                stats[3] += documents
+                stats[4] += nbytes
+
+        if self.log:
+            logger.info(" ".join("{0}={1}".format(key, value)
+                                 for key, value in self._summary(name, 1, seconds, seconds, documents, nbytes).items()))
+
+    @staticmethod
+    def _summary(name, calls, seconds, max_seconds, documents, nbytes):
+        return {
+            "stage": name,
+            "calls": calls,
+            "seconds": round(seconds, 6),
+            "max_seconds": round(max_seconds, 6),
+            "documents": documents,
+            "bytes": nbytes,
+            "docs_per_sec": round(documents / seconds, 3) if documents and seconds > 0 else None,
+            "bytes_per_sec": round(nbytes / seconds, 3) if nbytes and seconds > 0 else None,
+        }
+
+    def report(self):
+        '''
+        {"stages": {단계: {calls, seconds, max_seconds, documents, bytes, docs_per_sec, bytes_per_sec}},
+         "counters": {counter: 값}} 형태로 반환 합니다.
+        '''
+        with self._lock:
+            stages = {name: self._summary(name, *stats) for name, stats in self.stages.items()}
+            counters = dict(self.counters)
+
+        for summary in stages.values():
+            del summary["stage"]
+        return {"stages": stages, "counters": counters}
+
+    def to_json(self, file_path):
+        '''
+        report()를 JSON 파일로 저장 합니다.
+        '''
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def _dump(self):
+        if self.json_path is not None and (self.stages or self.counters):
+            self.to_json(self.json_path)
+
+
+profiler = Profiler.from_env()